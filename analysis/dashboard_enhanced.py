@@ -14,10 +14,18 @@ import os
 import subprocess
 import time
 import threading
+import queue
+import atexit
+import copy
 from datetime import datetime
 from collections import deque
 import socket
 import re
+import math
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scenarios'))
+from research_scenarios import BoundedLogQueue
 
 # Set template and static folders to parent directory (project root)
 template_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates')
@@ -98,9 +106,303 @@ class DashboardData:
             'power_verified': 0,
             'power_failed': 0
         }
+        
+        # Socket.IO emission settings (see EventBatcher)
+        self.emit_config = {
+            'frame_rate': 10,            # batches per second
+            'max_pending': 5000,         # events held between frames before dropping oldest
+            'max_frames_in_flight': 20   # unacknowledged frames before a client is paused
+        }
+        
+        # Command log writer settings (see GroupCommitLogWriter)
+        self.log_config = {
+            'fsync': 'interval',         # 'none', 'interval' or 'batch'
+            'fsync_interval': 1.0,       # seconds between fsyncs in 'interval' mode
+            'flush_interval': 0.05,      # longest a queued line waits before being written
+            'max_batch': 1000,           # lines written per group commit
+            'max_queue': 100000,         # queued lines before the overload policy applies
+            'overload_policy': 'block',  # 'block', 'drop_oldest' or 'sample'
+            'sample_rate': 10            # keep every Nth overflowing line when sampling
+        }
 
 dashboard_data = DashboardData()
 
+
+class EventBatcher:
+    """Coalesce Socket.IO events into frames emitted at a fixed rate.
+    
+    High-volume events are queued and sent as one `event_batch` per frame
+    instead of one emit per command. Clients that acknowledge frames with
+    `batch_ack` get backpressure: with too many unacknowledged frames they
+    are taken out of the live room and, once caught up, receive a single
+    `event_summary` of what they missed rather than the backlog itself.
+    Clients that never acknowledge are never paused.
+    """
+    
+    LIVE_ROOM = 'live_events'
+    
+    def __init__(self, socketio, config, statistics_source):
+        self.socketio = socketio
+        self.config = config
+        self.statistics_source = statistics_source
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.overflow = 0
+        self.dropped = 0
+        self.frame = 0
+        self.totals = {}
+        self.clients = {}
+        self.last_statistics = {}
+        self.task = None
+    
+    def queue(self, event, payload):
+        """Queue an event for the next frame"""
+        with self.lock:
+            if len(self.pending) >= self.config['max_pending']:
+                self.pending.popleft()
+                self.overflow += 1
+                self.dropped += 1
+            self.pending.append((event, payload))
+            if self.task is None:
+                self.task = self.socketio.start_background_task(self._run)
+    
+    def metrics(self):
+        return {
+            'depth': len(self.pending),
+            'capacity': self.config['max_pending'],
+            'dropped': self.dropped,
+            'frames': self.frame,
+            'clients': len(self.clients),
+            'paused_clients': sum(1 for state in self.clients.values() if state['missed_from'] is not None)
+        }
+    
+    def _run(self):
+        while True:
+            self.socketio.sleep(1.0 / max(self.config['frame_rate'], 1))
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Event batch emit failed: {e}")
+    
+    def flush(self):
+        """Emit everything queued since the last frame as one batch"""
+        with self.lock:
+            if not self.pending:
+                return
+            items = list(self.pending)
+            self.pending.clear()
+            dropped = self.overflow
+            self.overflow = 0
+        
+        # Pause slow clients before counting, so this frame shows up as missed
+        self._apply_backpressure()
+        
+        events = {}
+        for event, payload in items:
+            events.setdefault(event, []).append(payload)
+            self.totals[event] = self.totals.get(event, 0) + 1
+        
+        self.frame += 1
+        batch = {'frame': self.frame, 'events': events}
+        
+        statistics = self.statistics_source()
+        changed = {k: v for k, v in statistics.items() if self.last_statistics.get(k) != v}
+        if changed:
+            batch['statistics'] = changed
+            self.last_statistics = copy.deepcopy(statistics)
+        if dropped:
+            batch['dropped'] = dropped
+        
+        self.socketio.emit('event_batch', batch, to=self.LIVE_ROOM)
+    
+    def _apply_backpressure(self):
+        limit = self.config['max_frames_in_flight']
+        for sid, state in list(self.clients.items()):
+            if not state['acking'] or state['missed_from'] is not None:
+                continue
+            if self.frame - state['last_ack'] >= limit:
+                state['missed_from'] = dict(self.totals)
+                state['resume_at'] = self.frame
+                self.socketio.server.leave_room(sid, self.LIVE_ROOM, namespace='/')
+    
+    def register(self, sid):
+        self.clients[sid] = {'last_ack': self.frame, 'acking': False, 'missed_from': None, 'resume_at': 0}
+        self.socketio.server.enter_room(sid, self.LIVE_ROOM, namespace='/')
+    
+    def unregister(self, sid):
+        self.clients.pop(sid, None)
+    
+    def ack(self, sid, frame):
+        """Record a client acknowledgement and resume it once it has caught up"""
+        state = self.clients.get(sid)
+        if state is None:
+            return
+        state['acking'] = True
+        state['last_ack'] = max(state['last_ack'], frame)
+        if state['missed_from'] is None or state['last_ack'] < state['resume_at']:
+            return
+        
+        missed = {
+            event: count - state['missed_from'].get(event, 0)
+            for event, count in self.totals.items()
+            if count > state['missed_from'].get(event, 0)
+        }
+        state['missed_from'] = None
+        state['last_ack'] = self.frame
+        self.socketio.emit('event_summary', {
+            'frame': self.frame,
+            'missed': missed,
+            'statistics': self.statistics_source()
+        }, to=sid)
+        self.socketio.server.enter_room(sid, self.LIVE_ROOM, namespace='/')
+
+
+event_batcher = EventBatcher(socketio, dashboard_data.emit_config, lambda: dashboard_data.statistics)
+
+
+class GroupCommitLogWriter:
+    """Append daily log files from a background thread in batches.
+    
+    Callers only enqueue lines. The writer thread keeps one handle open per
+    file, writes everything queued since the last pass with a single write
+    and flush per file, fsyncs according to the configured policy and
+    closes the previous day's handles when the date rolls over. Lines go
+    through a BoundedLogQueue, so the configured overload policy either
+    blocks the caller, drops the oldest line or keeps a sample.
+    """
+    
+    FSYNC_POLICIES = ('none', 'interval', 'batch')
+    OVERLOAD_POLICIES = BoundedLogQueue.POLICIES
+    
+    def __init__(self, config, directory='.'):
+        self.config = config
+        self.directory = directory
+        self.queue = BoundedLogQueue(config['max_queue'], config['overload_policy'], config['sample_rate'])
+        self.written = 0
+        self.handles = {}
+        self.last_fsync = time.monotonic()
+        self.thread = None
+        self.lock = threading.Lock()
+    
+    def configure(self):
+        """Apply queue settings changed in the config to the live queue"""
+        self.queue.configure(self.config['max_queue'], self.config['overload_policy'], self.config['sample_rate'])
+    
+    def write(self, prefix, suffix, text, when=None):
+        """Queue `text` for `<prefix>_YYYYMMDD<suffix>` (dated by `when`)"""
+        if self.thread is None:
+            self.start()
+        self.queue.put((when or datetime.now(), prefix, suffix, text))
+    
+    def write_json(self, prefix, suffix, record, when=None):
+        """Queue `record` as one JSON line; json.dumps runs on the writer thread"""
+        self.write(prefix, suffix, record, when)
+    
+    def metrics(self):
+        """Queue depth, drop counts and age of the oldest unwritten line"""
+        metrics = self.queue.metrics()
+        metrics['written'] = self.written
+        return metrics
+    
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+    
+    def close(self):
+        """Write out anything still queued and close all files"""
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+    
+    def _run(self):
+        running = True
+        while running:
+            try:
+                batch = [self.queue.get(timeout=self.config['flush_interval'])]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.config['max_batch']:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [item for item in batch if item is not None]
+            try:
+                if batch:
+                    self._write_batch(batch)
+                self._maybe_fsync(bool(batch))
+            except Exception as e:
+                print(f"Log writer error: {e}")
+        
+        for _, handle in self.handles.values():
+            handle.close()
+        self.handles.clear()
+    
+    def _write_batch(self, batch):
+        chunks = {}
+        for when, prefix, suffix, text in batch:
+            if not isinstance(text, str):
+                text = json.dumps(text, default=str) + '\n'
+            day = when.strftime('%Y%m%d')
+            chunks.setdefault((day, f"{prefix}_{day}{suffix}"), []).append(text)
+        
+        for (day, filename), texts in chunks.items():
+            entry = self.handles.get(filename)
+            if entry is None:
+                entry = self.handles[filename] = (day, open(os.path.join(self.directory, filename), 'a'))
+            entry[1].write(''.join(texts))
+            entry[1].flush()
+            self.written += len(texts)
+        
+        # Daily rotation: drop handles for days older than the newest one seen
+        latest = max(day for day, _ in chunks)
+        for filename, (day, handle) in list(self.handles.items()):
+            if day < latest:
+                self._fsync(handle)
+                handle.close()
+                del self.handles[filename]
+    
+    def _maybe_fsync(self, wrote):
+        policy = self.config['fsync']
+        if policy == 'batch' and wrote:
+            self._fsync_all()
+        elif policy == 'interval' and time.monotonic() - self.last_fsync >= self.config['fsync_interval']:
+            self._fsync_all()
+    
+    def _fsync_all(self):
+        for _, handle in self.handles.values():
+            self._fsync(handle)
+        self.last_fsync = time.monotonic()
+    
+    def _fsync(self, handle):
+        if self.config['fsync'] != 'none':
+            os.fsync(handle.fileno())
+
+
+command_log_writer = GroupCommitLogWriter(dashboard_data.log_config)
+
+
+def compact_command_entry(log_entry):
+    """Reduce a command log entry to the fields a live view needs"""
+    compact = {
+        'id': log_entry['id'],
+        't': log_entry['timestamp_ms'],
+        'o': log_entry['original'],
+        'r': log_entry['response'],
+        'lat': round(log_entry['latency'], 2),
+        'v': log_entry['verification']
+    }
+    if log_entry['modified'] != log_entry['original']:
+        compact['m'] = log_entry['modified']
+    if log_entry['attacks']:
+        compact['a'] = log_entry['attacks']
+    return compact
+
 @app.route('/')
 def index():
     """Main dashboard page"""
@@ -340,8 +642,8 @@ def send_command():
         # Update statistics
         update_statistics(log_entry)
         
-        # Emit to all clients
-        socketio.emit('command_executed', log_entry)
+        # Queue compact delta for the next batch to all clients
+        event_batcher.queue('command_executed', compact_command_entry(log_entry))
         
         return jsonify({
             'success': True,
@@ -368,8 +670,7 @@ def attack_config():
             add_log_entry(log_msg, "config")
             
             # Log to file
-            with open(f"attack_config_{datetime.now().strftime('%Y%m%d')}.log", 'a') as f:
-                f.write(log_msg + '\n')
+            command_log_writer.write('attack_config', '.log', log_msg + '\n')
             
             socketio.emit('attack_config_update', dashboard_data.attack_configs)
             
@@ -380,25 +681,111 @@ def attack_config():
     else:
         return jsonify(dashboard_data.attack_configs)
 
+def parse_config_value(key, current, value):
+    """Convert a JSON value to the type of the current setting, or raise ValueError"""
+    if isinstance(current, bool):
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.lower() in ('true', 'false', '1', '0', 'yes', 'no'):
+            return value.lower() in ('true', '1', 'yes')
+        raise ValueError(f"{key} must be a boolean")
+    if isinstance(current, (int, float)):
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"{key} must be a number")
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"{key} must be a number") from None
+        if not math.isfinite(number) or number < 0:
+            raise ValueError(f"{key} must be a non-negative number")
+        if isinstance(current, int):
+            if not number.is_integer():
+                raise ValueError(f"{key} must be an integer")
+            return int(number)
+        return number
+    if not isinstance(value, str):
+        raise ValueError(f"{key} must be a string")
+    return value
+
+@app.route('/api/emit_config', methods=['GET', 'POST'])
+def emit_config():
+    """Get or update Socket.IO batching configuration"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'error': 'Expected a JSON object'}), 400
+        try:
+            updates = {key: max(1, parse_config_value(key, dashboard_data.emit_config[key], data[key]))
+                       for key in dashboard_data.emit_config if key in data}
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        dashboard_data.emit_config.update(updates)
+        return jsonify({
+            'success': True,
+            'config': dashboard_data.emit_config
+        })
+    else:
+        return jsonify(dashboard_data.emit_config)
+
+@app.route('/api/log_config', methods=['GET', 'POST'])
+def log_config():
+    """Get or update command log writer configuration"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'error': 'Expected a JSON object'}), 400
+        allowed = {
+            'fsync': GroupCommitLogWriter.FSYNC_POLICIES,
+            'overload_policy': GroupCommitLogWriter.OVERLOAD_POLICIES
+        }
+        # Validate everything before applying anything
+        updates = {}
+        try:
+            for key, value in data.items():
+                if key not in dashboard_data.log_config:
+                    raise ValueError(f"Unknown setting '{key}'")
+                updates[key] = parse_config_value(key, dashboard_data.log_config[key], value)
+                if key in allowed and updates[key] not in allowed[key]:
+                    raise ValueError(f"{key} must be one of {', '.join(allowed[key])}")
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        dashboard_data.log_config.update(updates)
+        for key in ('max_batch', 'max_queue', 'sample_rate'):
+            dashboard_data.log_config[key] = max(1, dashboard_data.log_config[key])
+        command_log_writer.configure()
+        return jsonify({
+            'success': True,
+            'config': dashboard_data.log_config
+        })
+    else:
+        return jsonify(dashboard_data.log_config)
+
+@app.route('/api/logging_metrics')
+def logging_metrics():
+    """Queue depth, drops and writer lag for the log writer and event batcher"""
+    return jsonify({
+        'command_log': command_log_writer.metrics(),
+        'socket_events': event_batcher.metrics()
+    })
+
 def log_to_file(log_entry):
-    """Write timestamped log entry to file"""
-    log_filename = f"cnc_commands_{datetime.now().strftime('%Y%m%d')}.log"
-    
-    with open(log_filename, 'a') as f:
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-        f.write(f"[{timestamp}] ")
-        f.write(f"ID:{log_entry['id']} ")
-        f.write(f"ORIG:{log_entry['original']} ")
-        f.write(f"MOD:{log_entry['modified']} ")
-        f.write(f"RESP:{log_entry['response']} ")
-        f.write(f"LAT:{log_entry['latency']:.2f}ms ")
-        f.write(f"VERIFY:{log_entry.get('verification', 'N/A')} ")
-        f.write(f"ATTACKS:{','.join(log_entry.get('attacks', []))}\n")
-    
-    # Also write to JSON log for structured data
-    json_filename = f"cnc_commands_{datetime.now().strftime('%Y%m%d')}.jsonl"
-    with open(json_filename, 'a') as f:
-        f.write(json.dumps(log_entry) + '\n')
+    """Queue timestamped log entry for the background log writer"""
+    now = datetime.now()
+    timestamp = now.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    line = (
+        f"[{timestamp}] "
+        f"ID:{log_entry['id']} "
+        f"ORIG:{log_entry['original']} "
+        f"MOD:{log_entry['modified']} "
+        f"RESP:{log_entry['response']} "
+        f"LAT:{log_entry['latency']:.2f}ms "
+        f"VERIFY:{log_entry.get('verification', 'N/A')} "
+        f"ATTACKS:{','.join(log_entry.get('attacks', []))}\n"
+    )
+    command_log_writer.write('cnc_commands', '.log', line, now)
+    
+    # Also write to JSON log for structured data; serialised by the writer
+    command_log_writer.write_json('cnc_commands', '.jsonl', dict(log_entry), now)
 
 def generate_iptables_script():
     """Generate the IPTables configuration script"""
@@ -660,7 +1047,7 @@ def add_log_entry(message, log_type='info'):
         'type': log_type
     }
     dashboard_data.attack_log.append(entry)
-    socketio.emit('log_update', entry)
+    event_batcher.queue('log_update', {'t': entry['timestamp'], 'msg': message, 'type': log_type})
 
 @app.route('/api/status')
 def get_status():
@@ -699,6 +1086,17 @@ def handle_connect():
     emit('connection_status', {'connected': dashboard_data.cnc_connected})
     emit('network_config_update', dashboard_data.network_config)
     emit('statistics_update', dashboard_data.statistics)
+    event_batcher.register(request.sid)
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    """Forget batching state for a departed client"""
+    event_batcher.unregister(request.sid)
+
+@socketio.on('batch_ack')
+def handle_batch_ack(data):
+    """Client has processed event batches up to the given frame"""
+    event_batcher.ack(request.sid, int((data or {}).get('frame', 0)))
 
 @socketio.on('configure_attack')
 def handle_attack_config(data):
@@ -11,6 +11,8 @@ import time
 import re
 import json
 import csv
+import shutil
+import tempfile
 from datetime import datetime
 from dataclasses import dataclass, asdict
 from typing import List, Dict, Tuple, Optional
@@ -26,12 +28,260 @@ class CommandResult:
     attack_type: str
     parameters: Dict
 
+# Top-level keys that hold per-command arrays and are streamed, not loaded
+STREAMED_SECTIONS = ('command_history', 'comparison_data')
+COMPARISON_PHASES = ('with_attacks', 'without_attacks')
+
+class AttackDataStream:
+    """Incremental reader over a monolithic attack_data_*.json export.
+
+    Walks the document with a small sliding buffer, decoding one array
+    element at a time and skipping unwanted values without building them,
+    so memory stays bounded by the largest single record.
+    """
+
+    CHUNK_SIZE = 1 << 16
+    _STRUCTURAL = re.compile(r'["\\\[\]{}]')
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos} of buffer")
+        self.pos += 1
+
+    def value(self):
+        """Decode and return the next complete JSON value"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+                # A number ending exactly at the buffer edge may be cut short
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def skip(self):
+        """Advance past the next JSON value without decoding it"""
+        if self._peek() not in '[{"':
+            self.value()
+            return
+        depth = 0
+        in_string = False
+        while True:
+            match = self._STRUCTURAL.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("Unexpected end of document")
+                continue
+            char = match.group()
+            self.pos = match.end()
+            if in_string:
+                if char == '\\':
+                    # Escaped character may sit in the next chunk
+                    if self.pos >= len(self.buf) and not self._fill():
+                        raise ValueError("Unexpected end of document")
+                    self.pos += 1
+                elif char == '"':
+                    in_string = False
+                    if depth == 0:
+                        return
+            elif char == '"':
+                in_string = True
+            elif char in '[{':
+                depth += 1
+            elif char in ']}':
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def items(self):
+        """Yield the elements of the next JSON array one at a time"""
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self._peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"Malformed array near offset {self.pos}")
+
+    def keys(self):
+        """Yield the keys of the next JSON object; the caller must consume
+        (value/skip/items/keys) each key's value before resuming"""
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(':')
+            yield key
+            char = self._peek()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f"Malformed object near offset {self.pos}")
+
+    def peek(self):
+        return self._peek()
+
+def iter_command_records(filename, phases=None):
+    """Lazily yield command records from an attack_data export.
+
+    Accepts both the monolithic .json export and the .ndjson export. Each
+    record is a dict tagged with 'phase': 'history' for command_history
+    entries, or 'with_attacks'/'without_attacks' for comparison runs.
+    """
+    if str(filename).endswith('.ndjson'):
+        with open(filename, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.pop('record', None) != 'command':
+                    continue
+                if phases is None or record.get('phase') in phases:
+                    yield record
+        return
+
+    with open(filename, 'r') as f:
+        stream = AttackDataStream(f)
+        for key in stream.keys():
+            if key == 'command_history' and (phases is None or 'history' in phases):
+                for entry in stream.items():
+                    yield {'phase': 'history', **entry}
+            elif key == 'comparison_data':
+                # Older exports stored a bare list here
+                if stream.peek() == '[':
+                    sections = [('with_attacks', stream)]
+                else:
+                    sections = ((phase, stream) for phase in stream.keys())
+                for phase, section in sections:
+                    if phases is None or phase in phases:
+                        for entry in section.items():
+                            yield {'phase': phase, **entry}
+                    else:
+                        section.skip()
+            else:
+                stream.skip()
+
+def read_session_header(filename):
+    """Return the session metadata of an attack_data export without
+    loading its command history or comparison runs"""
+    if str(filename).endswith('.ndjson'):
+        with open(filename, 'r') as f:
+            header = json.loads(f.readline())
+        header.pop('record', None)
+        return header
+
+    header = {}
+    with open(filename, 'r') as f:
+        stream = AttackDataStream(f)
+        for key in stream.keys():
+            if key in STREAMED_SECTIONS:
+                stream.skip()
+            elif key == 'statistics':
+                # statistics carries a second copy of comparison_data
+                header[key] = {}
+                for stat in stream.keys():
+                    if stat in STREAMED_SECTIONS:
+                        stream.skip()
+                    else:
+                        header[key][stat] = stream.value()
+            else:
+                header[key] = stream.value()
+    return header
+
+class CommandHistorySpool:
+    """Append-only command history kept on disk as NDJSON records.
+
+    Each command is written out as it completes, in the line format of the
+    .ndjson export, so a long session never holds its history in memory
+    and the NDJSON export is a copy of the spool.
+    """
+
+    def __init__(self):
+        self.f = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self.count = 0
+        self.last = None
+
+    def append(self, cmd, response, latency):
+        self.f.write(json.dumps({
+            'record': 'command',
+            'phase': 'history',
+            'command': cmd,
+            'firmware_response': response,
+            'latency_ms': latency
+        }) + '\n')
+        self.count += 1
+        self.last = (cmd, response, latency)
+
+    def __len__(self):
+        return self.count
+
+    def copy_to(self, dest):
+        """Write every spooled record line to the open file `dest`"""
+        self.f.flush()
+        self.f.seek(0)
+        shutil.copyfileobj(self.f, dest)
+        self.f.seek(0, 2)
+
+    def __iter__(self):
+        """Yield (command, response, latency_ms) tuples in send order"""
+        self.f.flush()
+        self.f.seek(0)
+        try:
+            for line in self.f:
+                record = json.loads(line)
+                yield record['command'], record['firmware_response'], record['latency_ms']
+        finally:
+            self.f.seek(0, 2)
+
+    def close(self):
+        self.f.close()
+
 class AdvancedGCodeAttackSimulator:
     def __init__(self, cnc_ip="192.168.0.170", cnc_port=8080):
         self.cnc_ip = cnc_ip
         self.cnc_port = cnc_port
         self.sock = None
-        self.command_history = []
+        self.command_history = CommandHistorySpool()
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # Attack parameters (configurable)
@@ -140,7 +390,7 @@ class AdvancedGCodeAttackSimulator:
                 self.stats['firmware_responses'][response.strip()] = 0
             self.stats['firmware_responses'][response.strip()] += 1
             
-            self.command_history.append((cmd, response.strip(), latency))
+            self.command_history.append(cmd, response.strip(), latency)
             return response.strip()
             
         except Exception as e:
@@ -303,7 +553,7 @@ class AdvancedGCodeAttackSimulator:
                 command=cmd,
                 modified_command=modified_cmd,
                 firmware_response=response or "",
-                latency_ms=self.command_history[-1][2] if self.command_history else 0,
+                latency_ms=self.command_history.last[2] if self.command_history else 0,
                 attack_type='|'.join(attack_log) if attack_log else 'none',
                 parameters=self.attack_params.copy() if with_attacks else {}
             )
@@ -357,8 +607,15 @@ class AdvancedGCodeAttackSimulator:
         
         return attack_results, normal_results
     
-    def export_data(self):
-        """Export all data including firmware responses"""
+    def export_data(self, output_format='json'):
+        """Export all data including firmware responses
+
+        output_format 'ndjson' writes a session header line followed by one
+        line per command record, readable with iter_command_records().
+        """
+        if output_format == 'ndjson':
+            return self._export_ndjson()
+
         filename = f"attack_data_{self.session_id}.json"
         
         export_data = {
@@ -383,6 +640,34 @@ class AdvancedGCodeAttackSimulator:
         print(f"\n[+] Data exported to: {filename}")
         return filename
     
+    def _export_ndjson(self):
+        """Write the session as newline-delimited records, one command per line"""
+        filename = f"attack_data_{self.session_id}.ndjson"
+        
+        comparison = self.stats.get('comparison_data') or {}
+        if isinstance(comparison, list):
+            comparison = {'with_attacks': comparison}
+        
+        with open(filename, 'w') as f:
+            header = {
+                'record': 'session',
+                'session_id': self.session_id,
+                'cnc_target': f"{self.cnc_ip}:{self.cnc_port}",
+                'attack_parameters': self.attack_params,
+                'statistics': {k: v for k, v in self.stats.items() if k != 'comparison_data'}
+            }
+            f.write(json.dumps(header) + '\n')
+            
+            # History records were spooled in export format as they arrived
+            self.command_history.copy_to(f)
+            
+            for phase in COMPARISON_PHASES:
+                for entry in comparison.get(phase, []):
+                    f.write(json.dumps({'record': 'command', 'phase': phase, **entry}) + '\n')
+        
+        print(f"\n[+] Data exported to: {filename}")
+        return filename
+    
     def interactive_mode(self):
         """Interactive mode with parameter control"""
         print("\n[*] Interactive mode - Commands:")
@@ -390,7 +675,7 @@ class AdvancedGCodeAttackSimulator:
         print("  test - Run test sequence with current settings")
         print("  compare - Run comparison test")
         print("  stats - Show statistics")
-        print("  export - Export data")
+        print("  export - Export data (export ndjson - one record per line)")
         print("  quit - Exit")
         
         while True:
@@ -409,6 +694,8 @@ class AdvancedGCodeAttackSimulator:
                     self.print_statistics()
                 elif cmd.lower() == 'export':
                     self.export_data()
+                elif cmd.lower() == 'export ndjson':
+                    self.export_data(output_format='ndjson')
                 elif cmd:
                     # Apply attacks if any are enabled
                     if any(p['enabled'] for p in self.attack_params.values()):
@@ -9,23 +9,56 @@ import hashlib
 import hmac
 import json
 import time
+import math
 import numpy as np
 from datetime import datetime, timedelta
-from collections import deque
+from collections import deque, OrderedDict
 from typing import Dict, List, Tuple, Optional
 import threading
 import re
+import bisect
+import ipaddress
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+import struct
 import os
 
 
 class DefenseSystem:
     """Comprehensive defense system against G-code attacks"""
     
-    def __init__(self):
+    # Static relative cost of each module used for scheduling; cheap
+    # stateless checks first, heavy crypto/history work last
+    COST_HINTS = {
+        'isolation': 1,
+        'rate_limiting': 2,
+        'integrity': 3,
+        'authentication': 4,
+        'anomaly_detection': 5,
+        'encryption': 6,
+        'rollback': 7,
+        'audit': 8
+    }
+
+    # What to do with a module that cannot run within the command deadline:
+    # 'open' skips it and lets the command through, 'closed' blocks the command
+    FAILURE_POLICIES = ('open', 'closed')
+    DEFAULT_FAILURE_POLICIES = {
+        'authentication': 'closed',
+        'integrity': 'closed',
+        'isolation': 'closed'
+    }
+
+    ESTIMATE_SAMPLES = 100  # recent calls behind each module's p99 estimate
+    SKIP_DECAY = 0.995      # estimate shrink per skip, so skipped modules get re-probed
+
+    def __init__(self, reorder_interval=100, latency_window=1000, min_samples=20,
+                 deadline_ms=None, default_policy='open'):
         self.defense_modules = {
             'authentication': AuthenticationModule(),
             'encryption': EncryptionModule(),
@@ -40,24 +73,155 @@ class DefenseSystem:
         self.active_defenses = set()
         self.defense_stats = {}
         
+        # Evaluation order is recomputed from static cost and observed
+        # rejection rate every reorder_interval commands
+        self.pipeline = []
+        self.reorder_interval = reorder_interval
+        self.latency_window = latency_window
+        self.min_samples = min_samples
+        self._commands_since_reorder = 0
+
+        # Per-command latency budget; None disables deadline enforcement
+        self.deadline_ms = deadline_ms
+        if default_policy not in self.FAILURE_POLICIES:
+            raise ValueError(f"default_policy must be one of {self.FAILURE_POLICIES}")
+        self.failure_policies = {name: self.DEFAULT_FAILURE_POLICIES.get(name, default_policy)
+                                 for name in self.defense_modules}
+        self.deadline_stats = {
+            'commands': 0,
+            'deadline_misses': 0,
+            'failed_open': 0,
+            'failed_closed': 0
+        }
+
+    def set_failure_policy(self, defense_type, policy):
+        """Choose fail-open or fail-closed handling for a module under deadline"""
+        if defense_type not in self.defense_modules or policy not in self.FAILURE_POLICIES:
+            return False
+        self.failure_policies[defense_type] = policy
+        return True
+
     def enable_defense(self, defense_type):
         """Enable a specific defense mechanism"""
         if defense_type in self.defense_modules:
             self.active_defenses.add(defense_type)
+            self.defense_stats.setdefault(defense_type, {
+                'calls': 0,
+                'rejections': 0,
+                'total_time': 0.0,
+                'latencies': deque(maxlen=self.latency_window),
+                'p99_estimate': 0.0,  # seconds, refreshed on reorder
+                'estimated_at': 0,    # calls when p99_estimate was computed
+                'overruns': 0,        # ran past the command deadline
+                'skipped': 0          # not run because it would not fit
+            })
+            self._reorder_pipeline()
+            return True
+        return False
+
+    def disable_defense(self, defense_type):
+        """Disable a defense mechanism, keeping its measured statistics"""
+        if defense_type in self.active_defenses:
+            self.active_defenses.discard(defense_type)
+            self._reorder_pipeline()
             return True
         return False
         
-    def process_command(self, command, context=None):
-        """Process command through active defense layers"""
+    def _schedule_cost(self, defense_name):
+        """Expected cost per rejection: cheap, frequently rejecting modules sort first
+
+        Cost comes from COST_HINTS rather than measured time, so the order
+        depends only on which commands were rejected and is the same from
+        run to run; measured latencies are kept for reporting and deadlines.
+        Ties fall back to the module name.
+        """
+        stats = self.defense_stats[defense_name]
+        cost = self.COST_HINTS.get(defense_name, len(self.COST_HINTS) + 1)
+        if stats['calls'] < self.min_samples:
+            return (1, cost, defense_name)
+        rejection_rate = stats['rejections'] / stats['calls']
+        if rejection_rate == 0:
+            # Never rejects: run after every module that might, cheapest first
+            return (2, cost, defense_name)
+        return (0, cost / rejection_rate, defense_name)
+
+    def _reorder_pipeline(self):
+        self.pipeline = sorted(self.active_defenses, key=self._schedule_cost)
+        self._commands_since_reorder = 0
+        for defense_name in self.pipeline:
+            stats = self.defense_stats[defense_name]
+            # Only re-estimate from fresh samples; a module that keeps being
+            # skipped instead decays its estimate until it gets probed again
+            fresh = stats['calls'] > stats['estimated_at']
+            if len(stats['latencies']) >= self.min_samples and fresh:
+                recent = list(stats['latencies'])[-self.ESTIMATE_SAMPLES:]
+                stats['p99_estimate'] = float(np.percentile(recent, 99))
+                stats['estimated_at'] = stats['calls']
+
+    def process_command(self, command, context=None, deadline_ms=None):
+        """Process command through active defense layers
+
+        With a deadline (deadline_ms here or on the system), a module whose
+        p99 cost no longer fits in the remaining budget is not started and
+        its failure policy applies instead. Python cannot pre-empt a module
+        once running, so worst-case latency is the budget plus one module's
+        overrun; overruns are counted per module.
+        """
         defense_results = {}
         
-        for defense_name in self.active_defenses:
+        self._commands_since_reorder += 1
+        if self._commands_since_reorder >= self.reorder_interval:
+            self._reorder_pipeline()
+
+        budget_ms = deadline_ms if deadline_ms is not None else self.deadline_ms
+        deadline = None
+        if budget_ms is not None:
+            deadline = time.perf_counter() + budget_ms / 1000
+            self.deadline_stats['commands'] += 1
+        missed = False
+
+        for defense_name in self.pipeline:
             module = self.defense_modules[defense_name]
+            stats = self.defense_stats[defense_name]
+            start = time.perf_counter()
+
+            if deadline is not None and start + stats['p99_estimate'] > deadline:
+                stats['skipped'] += 1
+                stats['p99_estimate'] *= self.SKIP_DECAY
+                if not missed:
+                    missed = True
+                    self.deadline_stats['deadline_misses'] += 1
+                if self.failure_policies[defense_name] == 'closed':
+                    self.deadline_stats['failed_closed'] += 1
+                    return {
+                        'allowed': False,
+                        'blocked_by': defense_name,
+                        'reason': 'Defense deadline exceeded (fail-closed)',
+                        'deadline_exceeded': True,
+                        'details': defense_results
+                    }
+                self.deadline_stats['failed_open'] += 1
+                defense_results[defense_name] = {
+                    'allowed': True,
+                    'skipped': True,
+                    'reason': 'Defense deadline exceeded (fail-open)'
+                }
+                continue
+
             result = module.process(command, context)
+            end = time.perf_counter()
+            elapsed = end - start
             defense_results[defense_name] = result
             
+            stats['calls'] += 1
+            stats['total_time'] += elapsed
+            stats['latencies'].append(elapsed)
+            if deadline is not None and end > deadline:
+                stats['overruns'] += 1
+
             # If any defense blocks the command, stop processing
             if not result['allowed']:
+                stats['rejections'] += 1
                 return {
                     'allowed': False,
                     'blocked_by': defense_name,
@@ -71,14 +235,234 @@ class DefenseSystem:
             'defense_results': defense_results
         }
 
+    def process_batch(self, commands, contexts=None, details=True):
+        """Evaluate a batch of commands, module by module
+
+        Each module sees exactly the commands that passed the modules before
+        it, in order, so verdicts match calling process_command on each
+        command in turn. Modules with a process_batch method handle their
+        slice in one call. With details=False only allowed/blocked_by/reason
+        are returned for each command.
+
+        Batches are offline work and ignore deadline_ms.
+        """
+        total = len(commands)
+        if contexts is None:
+            contexts = [None] * total
+        verdicts = [None] * total
+        defense_results = [{} for _ in range(total)] if details else None
+
+        start = 0
+        while start < total:
+            # Replay the reorder check process_command makes per command, and
+            # keep the order fixed up to the next point it would change
+            self._commands_since_reorder += 1
+            if self._commands_since_reorder >= self.reorder_interval:
+                self._reorder_pipeline()
+            size = min(total - start, self.reorder_interval - self._commands_since_reorder)
+            self._commands_since_reorder += size - 1
+
+            alive = list(range(start, start + size))
+            for defense_name in self.pipeline:
+                if not alive:
+                    break
+                results = self._run_module_batch(defense_name, [commands[i] for i in alive],
+                                                 [contexts[i] for i in alive])
+                alive = self._apply_module_results(defense_name, alive, results, verdicts,
+                                                   defense_results)
+
+            for index in alive:
+                verdicts[index] = self._allowed_verdict(
+                    commands[index], defense_results[index] if details else None)
+            start += size
+
+        return verdicts
+
+    def _apply_module_results(self, defense_name, alive, results, verdicts, defense_results):
+        """Record one module's results for the commands still alive; blocked
+        commands get their verdict, and the indices that passed are returned"""
+        stats = self.defense_stats[defense_name]
+        passed = []
+        for index, result in zip(alive, results):
+            if defense_results is not None:
+                defense_results[index][defense_name] = result
+            if result['allowed']:
+                passed.append(index)
+                continue
+            stats['rejections'] += 1
+            verdicts[index] = {
+                'allowed': False,
+                'blocked_by': defense_name,
+                'reason': result.get('reason', 'Security policy violation')
+            }
+            if defense_results is not None:
+                verdicts[index]['details'] = defense_results[index]
+        return passed
+
+    @staticmethod
+    def _allowed_verdict(command, defense_results):
+        """Verdict for a command every module passed; short form without details"""
+        if defense_results is None:
+            return {'allowed': True, 'blocked_by': None, 'reason': None}
+        return {
+            'allowed': True,
+            'command': command,
+            'defense_results': defense_results
+        }
+
+    def _run_module_batch(self, defense_name, commands, contexts):
+        """Run one module over a chunk of commands, recording its timings"""
+        module = self.defense_modules[defense_name]
+        stats = self.defense_stats[defense_name]
+        process_batch = getattr(module, 'process_batch', None)
+        if process_batch is not None:
+            # Only the chunk total is known; record its per-command average
+            # as one sample so percentiles and deadline estimates see batch
+            # work too
+            begin = time.perf_counter()
+            results = process_batch(commands, contexts)
+            elapsed = time.perf_counter() - begin
+            stats['latencies'].append(elapsed / len(commands))
+        else:
+            results = []
+            elapsed = 0.0
+            for command, context in zip(commands, contexts):
+                begin = time.perf_counter()
+                results.append(module.process(command, context))
+                latency = time.perf_counter() - begin
+                stats['latencies'].append(latency)
+                elapsed += latency
+
+        stats['calls'] += len(commands)
+        stats['total_time'] += elapsed
+        return results
+
+    def get_pipeline_report(self):
+        """Per-module evaluation order, rejection rate and latency percentiles"""
+        report = {}
+        for position, defense_name in enumerate(self.pipeline):
+            stats = self.defense_stats[defense_name]
+            latencies = np.array(stats['latencies']) * 1000 if stats['latencies'] else None
+            report[defense_name] = {
+                'order': position,
+                'calls': stats['calls'],
+                'rejections': stats['rejections'],
+                'rejection_rate': stats['rejections'] / stats['calls'] if stats['calls'] else 0.0,
+                'mean_ms': stats['total_time'] / stats['calls'] * 1000 if stats['calls'] else 0.0,
+                'p50_ms': float(np.percentile(latencies, 50)) if latencies is not None else None,
+                'p99_ms': float(np.percentile(latencies, 99)) if latencies is not None else None,
+                'failure_policy': self.failure_policies[defense_name],
+                'overruns': stats['overruns'],
+                'skipped': stats['skipped']
+            }
+        return report
+
+    def update_machine_status(self, report, acknowledged=None):
+        """Feed a GRBL status report to the defenses that use machine feedback"""
+        if 'rate_limiting' in self.active_defenses:
+            return self.defense_modules['rate_limiting'].update_machine_status(report, acknowledged)
+        return None
+
+    def get_deadline_report(self):
+        """Deadline enforcement counters, overall and per module"""
+        return {
+            'deadline_ms': self.deadline_ms,
+            **self.deadline_stats,
+            'modules': {
+                defense_name: {
+                    'policy': self.failure_policies[defense_name],
+                    'overruns': stats['overruns'],
+                    'skipped': stats['skipped'],
+                    'p99_estimate_ms': stats['p99_estimate'] * 1000
+                }
+                for defense_name, stats in self.defense_stats.items()
+            }
+        }
+
+
+class NonceStore:
+    """Replay cache of seen nonces, bucketed by their signed timestamp
+
+    A nonce is only accepted while its timestamp is within time_window of
+    now, and a replay has to reuse the signed timestamp, so each lookup
+    touches a single bucket. Buckets are dropped whole once every timestamp
+    they cover is too old to pass the freshness check.
+    """
+
+    def __init__(self, time_window=30):
+        self.time_window = time_window
+        self.buckets = {}  # timestamp // time_window -> {nonce: timestamp}
+        self._cutoff = None
+
+    def _bucket(self, timestamp):
+        return int(timestamp // self.time_window)
+
+    def seen(self, nonce, timestamp):
+        bucket = self.buckets.get(self._bucket(timestamp))
+        return bucket is not None and nonce in bucket
+
+    def add(self, nonce, timestamp):
+        bucket_id = self._bucket(timestamp)
+        bucket = self.buckets.get(bucket_id)
+        if bucket is None:
+            bucket = self.buckets[bucket_id] = {}
+        bucket[nonce] = timestamp
+
+    def expire(self, now):
+        """Drop buckets whose timestamps all fall outside the window"""
+        cutoff = self._bucket(now - self.time_window)
+        if cutoff == self._cutoff:
+            return
+        self._cutoff = cutoff
+        for bucket_id in [b for b in self.buckets if b < cutoff]:
+            del self.buckets[bucket_id]
+
+    def resize(self, time_window):
+        """Change the window, moving every cached nonce to its new bucket"""
+        entries = [entry for bucket in self.buckets.values() for entry in bucket.items()]
+        self.time_window = time_window
+        self.clear()
+        for nonce, timestamp in entries:
+            self.add(nonce, timestamp)
+
+    def clear(self):
+        self.buckets = {}
+        self._cutoff = None
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
+
 
 class AuthenticationModule:
     """Command authentication using HMAC"""
     
-    def __init__(self):
+    def __init__(self, time_window=30):
+        self.nonce_cache = NonceStore(time_window)  # Prevent replay attacks
         self.shared_secret = os.urandom(32)  # In production, use secure key exchange
-        self.nonce_cache = deque(maxlen=1000)  # Prevent replay attacks
-        self.time_window = 30  # seconds
+
+    @property
+    def shared_secret(self):
+        return self._shared_secret
+
+    @shared_secret.setter
+    def shared_secret(self, key):
+        # Keyed once; each message MACs a copy instead of re-keying
+        self._shared_secret = key
+        self._keyed_mac = hmac.new(key, digestmod=hashlib.sha256)
+
+    @property
+    def time_window(self):
+        return self.nonce_cache.time_window
+
+    @time_window.setter
+    def time_window(self, seconds):
+        # Bucket boundaries move with the window; keep the seen nonces
+        self.nonce_cache.resize(seconds)
+
+    def _sign(self, message):
+        h = self._keyed_mac.copy()
+        h.update(message)
+        return h.hexdigest()
         
     def generate_authenticated_command(self, command):
         """Generate authenticated G-code command"""
@@ -89,8 +473,7 @@ class AuthenticationModule:
         message = f"{command}|{timestamp}|{nonce}".encode()
         
         # Generate HMAC
-        h = hmac.new(self.shared_secret, message, hashlib.sha256)
-        signature = h.hexdigest()
+        signature = self._sign(message)
         
         return {
             'command': command,
@@ -113,19 +496,19 @@ class AuthenticationModule:
                 return {'allowed': False, 'reason': 'Command expired'}
                 
             # Check nonce for replay attack
-            if nonce in self.nonce_cache:
+            self.nonce_cache.expire(current_time)
+            if self.nonce_cache.seen(nonce, timestamp):
                 return {'allowed': False, 'reason': 'Replay attack detected'}
                 
             # Verify HMAC
             message = f"{command}|{timestamp}|{nonce}".encode()
-            h = hmac.new(self.shared_secret, message, hashlib.sha256)
-            expected_signature = h.hexdigest()
+            expected_signature = self._sign(message)
             
             if not hmac.compare_digest(signature, expected_signature):
                 return {'allowed': False, 'reason': 'Invalid signature'}
                 
             # Add nonce to cache
-            self.nonce_cache.append(nonce)
+            self.nonce_cache.add(nonce, timestamp)
             
             return {'allowed': True, 'verified': True}
             
@@ -142,19 +525,319 @@ class AuthenticationModule:
         auth_cmd = self.generate_authenticated_command(command)
         return self.verify_command(auth_cmd)
 
+    def _chunk_signature(self, stream_id, index, timestamp, count, running_hash):
+        message = f"{stream_id}|{index}|{timestamp}|{count}|".encode() + running_hash.digest()
+        return self._sign(message)
+
+    def chunk_signer(self, window_size=64):
+        """Sender side of chunked authentication for one job stream"""
+        return ChunkSigner(self, window_size)
+
+    def chunk_verifier(self, window_size=64):
+        """Receiver side of chunked authentication for one job stream"""
+        return ChunkVerifier(self, window_size)
+
+
+class ChunkSigner:
+    """Authenticate a command stream one window of lines at a time
+
+    Lines are folded into a running SHA-256 as they are sent, and every
+    window_size lines (or on flush) a single tag MACs the stream id, chunk
+    index, timestamp, line count and running hash. Larger windows mean
+    fewer MACs but a longer wait before the verifier releases lines.
+    """
+
+    def __init__(self, auth_module, window_size=64):
+        if window_size < 1:
+            raise ValueError("window_size must be at least 1")
+        self.auth = auth_module
+        self.window_size = window_size
+        self.stream_id = os.urandom(16).hex()
+        self.index = 0
+        self._hash = hashlib.sha256()
+        self._count = 0
+
+    def add(self, command):
+        """Add a line; returns the chunk tag when it completes a window"""
+        self._hash.update(command.encode() + b'\n')
+        self._count += 1
+        if self._count >= self.window_size:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Tag the lines added since the last tag, if any"""
+        if not self._count:
+            return None
+        timestamp = int(time.time())
+        tag = {
+            'stream_id': self.stream_id,
+            'index': self.index,
+            'timestamp': timestamp,
+            'count': self._count,
+            'signature': self.auth._chunk_signature(self.stream_id, self.index, timestamp,
+                                                    self._count, self._hash)
+        }
+        self.index += 1
+        self._hash = hashlib.sha256()
+        self._count = 0
+        return tag
+
+
+class ChunkVerifier:
+    """Buffer streamed lines until their chunk tag arrives, then release them
+
+    Nothing past a window boundary is accepted before the tag for that
+    window, so at most window_size lines are ever held back. Chunks must
+    arrive in index order, and the stream id goes through the module's
+    nonce store so a whole stream cannot be replayed.
+    """
+
+    def __init__(self, auth_module, window_size=64):
+        self.auth = auth_module
+        self.window_size = window_size
+        self.stream_id = None
+        self.expected_index = 0
+        self.buffer = []
+        self._hash = hashlib.sha256()
+
+    def feed(self, command):
+        """Buffer a line pending its chunk tag
+
+        A line past the window boundary means the sender skipped a tag, so
+        the whole pending chunk is dropped along with it; the late tag then
+        fails its line count.
+        """
+        if len(self.buffer) >= self.window_size:
+            self.buffer.append(command)
+            return self._reject('Chunk window full, awaiting tag')
+        self.buffer.append(command)
+        self._hash.update(command.encode() + b'\n')
+        return {'allowed': True, 'buffered': len(self.buffer)}
+
+    def _reject(self, reason):
+        dropped = len(self.buffer)
+        self.buffer = []
+        self._hash = hashlib.sha256()
+        return {'allowed': False, 'reason': reason, 'dropped': dropped}
+
+    def verify(self, tag):
+        """Check a chunk tag against the buffered lines
+
+        On success the buffered lines are returned under 'commands'; on any
+        failure they are dropped.
+        """
+        try:
+            stream_id = tag['stream_id']
+            index = tag['index']
+            timestamp = tag['timestamp']
+            count = tag['count']
+            signature = tag['signature']
+        except (KeyError, TypeError) as e:
+            return self._reject(f'Verification failed: {e}')
+
+        current_time = int(time.time())
+        if abs(current_time - timestamp) > self.auth.time_window:
+            return self._reject('Chunk expired')
+        if count != len(self.buffer):
+            return self._reject('Chunk line count mismatch')
+        if index != self.expected_index or (self.stream_id is not None and
+                                            stream_id != self.stream_id):
+            return self._reject('Chunk out of sequence')
+
+        nonce_cache = self.auth.nonce_cache
+        if self.stream_id is None:
+            nonce_cache.expire(current_time)
+            if nonce_cache.seen(stream_id, timestamp):
+                return self._reject('Replay attack detected')
+
+        expected_signature = self.auth._chunk_signature(stream_id, index, timestamp,
+                                                        count, self._hash)
+        if not hmac.compare_digest(signature, expected_signature):
+            return self._reject('Invalid signature')
+
+        if self.stream_id is None:
+            self.stream_id = stream_id
+            nonce_cache.add(stream_id, timestamp)
+        self.expected_index += 1
+        commands = self.buffer
+        self.buffer = []
+        self._hash = hashlib.sha256()
+        return {'allowed': True, 'verified': True, 'commands': commands}
+
+
+class EncryptedSession:
+    """AES-GCM channel for one connection
+
+    Each end picks a fresh random salt and sends it to the other in the
+    clear; both then derive a pair of directional keys from the module key
+    and the two salts with HKDF, once. Neither end can be made to reuse a
+    salt, so keys (and with them counter nonces) are never repeated across
+    sessions. Each line then becomes a binary frame: 4-byte length, 8-byte
+    counter, ciphertext and 16-byte tag. The counter is the GCM nonce (keys
+    are never shared between directions, so it never repeats under one key)
+    and the header is authenticated as associated data. Frames must arrive
+    in order, so replayed, dropped or reordered frames fail.
+    """
+
+    HEADER = struct.Struct('>IQ')
+    TAG_SIZE = 16
+    SALT_SIZE = 16
+    MAX_FRAME_SIZE = 65536  # bytes after the header; G-code lines are far shorter
+
+    def __init__(self, master_key, role='client'):
+        if role not in ('client', 'server'):
+            raise ValueError("role must be 'client' or 'server'")
+        self.role = role
+        self.salt = os.urandom(self.SALT_SIZE)
+        self._master_key = master_key
+        self._sealer = None
+        self._opener = None
+        self.send_counter = 0
+        self.recv_counter = 0
+        self.closed = False
+        self._buffer = bytearray()
+
+    @property
+    def established(self):
+        return self._sealer is not None
+
+    def establish(self, peer_salt):
+        """Derive the session keys once the peer's salt has arrived"""
+        if self.established:
+            raise ValueError("session already established")
+        if len(peer_salt) != self.SALT_SIZE:
+            raise ValueError(f"peer salt must be {self.SALT_SIZE} bytes")
+        if self.role == 'client':
+            salts = self.salt + peer_salt
+        else:
+            salts = peer_salt + self.salt
+        key_material = HKDF(
+            algorithm=hashes.SHA256(),
+            length=64,
+            salt=salts,
+            info=b'gcode-session-v2',
+            backend=default_backend()
+        ).derive(self._master_key)
+        self._master_key = None
+        client_key, server_key = key_material[:32], key_material[32:]
+        if self.role == 'client':
+            send_key, recv_key = client_key, server_key
+        else:
+            send_key, recv_key = server_key, client_key
+        self._sealer = AESGCM(send_key)
+        self._opener = AESGCM(recv_key)
+
+    def seal(self, command):
+        """Encrypt one line into a frame"""
+        if not self.established:
+            raise ValueError("session not established")
+        data = command.encode() if isinstance(command, str) else command
+        if len(data) + self.TAG_SIZE > self.MAX_FRAME_SIZE:
+            raise ValueError(f"line longer than {self.MAX_FRAME_SIZE - self.TAG_SIZE} bytes")
+        header = self.HEADER.pack(len(data) + self.TAG_SIZE, self.send_counter)
+        nonce = self.send_counter.to_bytes(12, 'big')
+        self.send_counter += 1
+        return header + self._sealer.encrypt(nonce, data, header)
+
+    def open(self, frame):
+        """Decrypt a single complete frame"""
+        if not self.established:
+            return {'allowed': False, 'reason': 'Session not established'}
+        try:
+            length, counter = self.HEADER.unpack_from(frame)
+            if length != len(frame) - self.HEADER.size:
+                return {'allowed': False, 'reason': 'Malformed frame'}
+            if counter != self.recv_counter:
+                return {'allowed': False, 'reason': 'Frame out of sequence (possible replay)',
+                        'expected': self.recv_counter, 'received': counter}
+            header = frame[:self.HEADER.size]
+            body = frame[self.HEADER.size:]
+            data = self._opener.decrypt(counter.to_bytes(12, 'big'), body, header)
+        except InvalidTag:
+            return {'allowed': False, 'reason': 'Frame authentication failed'}
+        except Exception as e:
+            return {'allowed': False, 'reason': f'Decryption failed: {e}'}
+        self.recv_counter += 1
+        return {'allowed': True, 'command': data.decode()}
+
+    def feed(self, data):
+        """Accept stream bytes and return results for every complete frame
+
+        A length prefix over MAX_FRAME_SIZE cannot be a valid frame and would
+        make the buffer grow without bound, so it closes the session: frame
+        boundaries are lost from then on and every later read is rejected.
+        """
+        if self.closed:
+            if not data:
+                return []
+            return [{'allowed': False, 'reason': 'Session closed after framing error'}]
+        buffer = self._buffer
+        buffer += data
+        results = []
+        offset = 0
+        header_size = self.HEADER.size
+        with memoryview(buffer) as view:
+            size = len(view)
+            while size - offset >= header_size:
+                length, _ = self.HEADER.unpack_from(view, offset)
+                if length > self.MAX_FRAME_SIZE:
+                    results.append({'allowed': False, 'reason': 'Frame length exceeds limit',
+                                    'length': length})
+                    self.closed = True
+                    offset = size
+                    break
+                end = offset + header_size + length
+                if end > size:
+                    break
+                results.append(self.open(view[offset:end]))
+                offset = end
+        del buffer[:offset]
+        return results
+
 
 class EncryptionModule:
     """End-to-end encryption for G-code transmission"""
     
-    def __init__(self):
-        self.key = os.urandom(32)  # AES-256 key
+    MODES = ('command', 'session')
+    PBKDF2_ITERATIONS = 200000
+
+    def __init__(self, mode='command', passphrase=None, salt=None):
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}")
+        self.mode = mode
+        if passphrase is not None:
+            # Stretch a shared passphrase once; sessions only run HKDF on top
+            self.salt = salt or os.urandom(16)
+            self.key = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=self.salt,
+                iterations=self.PBKDF2_ITERATIONS,
+                backend=default_backend()
+            ).derive(passphrase.encode())
+        else:
+            self.key = os.urandom(32)  # AES-256 key
         self.cipher_suite = None
+        self._loopback = None
         self.setup_encryption()
         
     def setup_encryption(self):
         """Initialize encryption suite"""
         self.backend = default_backend()
         
+    def open_session(self, role='client', peer_salt=None):
+        """Start an encrypted session for one connection
+
+        The client opens its side and sends session.salt; the server opens
+        with role='server' and that salt, and replies with its own salt,
+        which the client passes to session.establish().
+        """
+        session = EncryptedSession(self.key, role)
+        if peer_salt is not None:
+            session.establish(peer_salt)
+        return session
+
     def encrypt_command(self, command):
         """Encrypt G-code command"""
         # Generate IV for this message
@@ -209,6 +892,22 @@ class EncryptionModule:
             
     def process(self, command, context=None):
         """Process command encryption/decryption"""
+        if self.mode == 'session':
+            # Demonstrate over a client/server pair that lives as long as the module
+            if self._loopback is None:
+                client = self.open_session('client')
+                server = self.open_session('server', client.salt)
+                client.establish(server.salt)
+                self._loopback = (client, server)
+            client, server = self._loopback
+            frame = client.seal(command)
+            decrypted = server.open(frame)
+            return {
+                'allowed': decrypted['allowed'],
+                'encrypted_size': len(frame),
+                'encryption_overhead': len(frame) - len(command)
+            }
+
         # Demonstrate encryption and decryption
         encrypted = self.encrypt_command(command)
         decrypted = self.decrypt_command(encrypted)
@@ -220,12 +919,124 @@ class EncryptionModule:
         }
 
 
+class RunningStats:
+    """Exponentially weighted mean and variance, updated in O(1)
+
+    Can be seeded with a prior mean/std; until warmup samples have been seen
+    `ready` is False unless a prior was given. The std used for z-scores is
+    floored at a fraction of the mean and an absolute minimum so a perfectly
+    regular job does not turn every small change into an outlier.
+    """
+
+    __slots__ = ('alpha', 'mean', 'var', 'count', 'warmup', 'min_std', 'relative_std', 'seeded')
+
+    def __init__(self, alpha=0.05, mean=None, std=None, warmup=10, min_std=1e-6, relative_std=0.1):
+        self.alpha = alpha
+        self.seeded = mean is not None
+        self.mean = float(mean) if mean is not None else 0.0
+        self.var = float(std) ** 2 if std is not None else 0.0
+        self.count = 0
+        self.warmup = warmup
+        self.min_std = min_std
+        self.relative_std = relative_std
+
+    @property
+    def ready(self):
+        return self.seeded or self.count >= self.warmup
+
+    @property
+    def std(self):
+        return max(math.sqrt(self.var), self.relative_std * abs(self.mean), self.min_std)
+
+    def update(self, value):
+        self.count += 1
+        if not self.seeded and self.count == 1:
+            self.mean = value
+            return
+        # Welford's cumulative update until the EWMA horizon is filled,
+        # exponentially weighted after that
+        alpha = max(self.alpha, 1.0 / self.count) if not self.seeded else self.alpha
+        diff = value - self.mean
+        increment = alpha * diff
+        self.mean += increment
+        self.var = (1 - alpha) * (self.var + diff * increment)
+
+    def z_score(self, value):
+        return (value - self.mean) / self.std
+
+    def summary(self):
+        return {'mean': self.mean, 'std': self.std, 'count': self.count}
+
+    def scan(self, values):
+        """z-score of each value against the statistics as update() would
+        leave them after every value before it, without changing anything
+
+        Returns (z_scores, trajectory): a NumPy array, NaN where the
+        statistics are not yet ready, and the state after each prefix for
+        advance(). The recurrence is the arithmetic of update(), so the
+        scores equal those of alternating z_score() and update().
+        """
+        alpha_min, seeded = self.alpha, self.seeded
+        mean, var, count = self.mean, self.var, self.count
+        means, variances = [mean], [var]
+
+        # Unseeded statistics start with cumulative weights...
+        index = 0
+        while index < len(values) and not seeded and (count == 0 or 1.0 / (count + 1) > alpha_min):
+            value = values[index]
+            index += 1
+            count += 1
+            if count == 1:
+                mean = value
+            else:
+                alpha = max(alpha_min, 1.0 / count)
+                diff = value - mean
+                increment = alpha * diff
+                mean += increment
+                var = (1 - alpha) * (var + diff * increment)
+            means.append(mean)
+            variances.append(var)
+
+        # ...and the weight is constant from there on
+        keep = 1 - alpha_min
+        append_mean, append_variance = means.append, variances.append
+        for value in values[index:] if index else values:
+            diff = value - mean
+            increment = alpha_min * diff
+            mean += increment
+            var = keep * (var + diff * increment)
+            append_mean(mean)
+            append_variance(var)
+
+        before_mean = np.array(means[:-1])
+        std = np.maximum(np.sqrt(variances[:-1]), self.relative_std * np.abs(before_mean))
+        std = np.maximum(std, self.min_std)
+        z_scores = (np.asarray(values, dtype=float) - before_mean) / std
+        if not seeded:
+            z_scores[self.count + np.arange(len(values)) < self.warmup] = np.nan
+        return z_scores, (means, variances)
+
+    def advance(self, trajectory, k):
+        """Apply the first k updates of a scan()"""
+        means, variances = trajectory
+        self.mean, self.var = means[k], variances[k]
+        self.count += k
+
+
 class AnomalyDetectionModule:
     """Machine learning-based anomaly detection"""
     
-    def __init__(self):
-        self.command_history = deque(maxlen=100)
-        self.position_history = deque(maxlen=100)
+    AXES = ('x', 'y', 'z')
+    WORD_PATTERN = re.compile(r'([FSXYZ])([-+]?(?:\d+\.?\d*|\.\d+))')
+
+    # Commands scored together by process_batch, shrinking to
+    # MIN_BATCH_WINDOW while commands keep being flagged
+    BATCH_WINDOW = 512
+    MIN_BATCH_WINDOW = 8
+    TABLE_COLUMNS = {'F': 0, 'S': 1, 'X': 2, 'Y': 3, 'Z': 4}
+
+    def __init__(self, history_size=100, alpha=0.05):
+        self.command_history = deque(maxlen=history_size)
         self.baseline_stats = {
             'avg_feed_rate': 1500,
             'std_feed_rate': 200,
@@ -238,6 +1049,25 @@ class AnomalyDetectionModule:
         self.anomaly_threshold = 3.0  # Standard deviations
         self.ml_model = self._initialize_ml_model()
         
+        # Live statistics of accepted commands: feed and power start from the
+        # baseline above, motion statistics learn from the first moves
+        self.stats = {
+            'feed_rate': RunningStats(alpha, self.baseline_stats['avg_feed_rate'],
+                                      self.baseline_stats['std_feed_rate']),
+            'power': RunningStats(alpha, self.baseline_stats['avg_power'],
+                                  self.baseline_stats['std_power']),
+            'segment_length': RunningStats(alpha, min_std=0.01, relative_std=1.0)
+        }
+        for axis in self.AXES:
+            # Distance moved per command along each axis
+            self.stats[f'displacement_{axis}'] = RunningStats(alpha, min_std=0.01, relative_std=1.0)
+
+        # Modal positions: where the program has sent the tool (every command)
+        # and where the machine was last sent (accepted commands only)
+        self.position = {axis: None for axis in self.AXES}
+        self.machine_position = {axis: None for axis in self.AXES}
+        self._since_g1 = 0  # consecutive history commands without G1
+
     def _initialize_ml_model(self):
         """Initialize simple anomaly detection model"""
         # In production, use proper ML model (isolation forest, LSTM, etc.)
@@ -261,74 +1091,98 @@ class AnomalyDetectionModule:
             'z_coord': None
         }
         
-        # Extract numerical values
-        feed_match = re.search(r'F(\d+)', command)
-        if feed_match:
-            features['feed_rate'] = int(feed_match.group(1))
-            
-        power_match = re.search(r'S(\d+)', command)
-        if power_match:
-            features['power'] = int(power_match.group(1))
-            
-        for axis in ['X', 'Y', 'Z']:
-            coord_match = re.search(f'{axis}([\\-\\d.]+)', command)
-            if coord_match:
-                features[f'{axis.lower()}_coord'] = float(coord_match.group(1))
-                
+        # One pass over the numeric words; the first occurrence of each wins
+        for letter, value in self.WORD_PATTERN.findall(command):
+            if letter == 'F':
+                if features['feed_rate'] is None:
+                    features['feed_rate'] = float(value)
+            elif letter == 'S':
+                if features['power'] is None:
+                    features['power'] = float(value)
+            else:
+                key = f'{letter.lower()}_coord'
+                if features[key] is None:
+                    features[key] = float(value)
+
         return features
         
-    def detect_anomalies(self, command):
+    def _displacements_from(self, reference, features):
+        moves = {}
+        for axis in self.AXES:
+            target = features[f'{axis}_coord']
+            previous = reference[axis]
+            if target is not None and previous is not None:
+                moves[axis] = abs(target - previous)
+        length = math.sqrt(sum(d * d for d in moves.values())) if moves else None
+        return moves, length
+
+    def _displacements(self, features):
+        """Per-axis distance and segment length of a move
+
+        Measured from the program position and from the machine position,
+        keeping the shorter. The two differ only after a blocked move: the
+        program may then carry on from the blocked target or from where the
+        machine really is, and neither should look like a jump, while a move
+        far from both still does.
+        """
+        moves, length = self._displacements_from(self.position, features)
+        if self.machine_position != self.position:
+            machine_moves, machine_length = self._displacements_from(self.machine_position,
+                                                                     features)
+            if length is None or (machine_length is not None and machine_length < length):
+                return machine_moves, machine_length
+        return moves, length
+
+    def _outlier(self, name, value, two_sided=True):
+        stats = self.stats[name]
+        if not stats.ready:
+            return None
+        z_score = stats.z_score(value)
+        if (abs(z_score) if two_sided else z_score) > self.anomaly_threshold:
+            return z_score
+        return None
+
+    def detect_anomalies(self, command, features=None, motion=None):
         """Detect anomalies in command"""
-        features = self.extract_features(command)
+        if features is None:
+            features = self.extract_features(command)
         anomalies = []
         
-        # Statistical anomaly detection
-        if features['feed_rate']:
-            z_score = abs((features['feed_rate'] - self.baseline_stats['avg_feed_rate']) / 
-                         self.baseline_stats['std_feed_rate'])
-            if z_score > self.anomaly_threshold:
+        # Statistical anomaly detection against live statistics
+        for name, anomaly_type in (('feed_rate', 'feed_rate_anomaly'), ('power', 'power_anomaly')):
+            value = features[name]
+            z_score = self._outlier(name, value) if value else None
+            if z_score is not None:
                 anomalies.append({
-                    'type': 'feed_rate_anomaly',
-                    'value': features['feed_rate'],
-                    'z_score': z_score
+                    'type': anomaly_type,
+                    'value': value,
+                    'z_score': abs(z_score)
                 })
                 
-        if features['power']:
-            z_score = abs((features['power'] - self.baseline_stats['avg_power']) / 
-                         self.baseline_stats['std_power'])
-            if z_score > self.anomaly_threshold:
+        # Position jumps: per-axis displacement and segment length far above
+        # what recent accepted moves look like (in production, use LSTM prediction)
+        moves, length = motion if motion is not None else self._displacements(features)
+        for axis, distance in moves.items():
+            name = f'displacement_{axis}'
+            if distance and self._outlier(name, distance, two_sided=False) is not None:
                 anomalies.append({
-                    'type': 'power_anomaly',
-                    'value': features['power'],
-                    'z_score': z_score
+                    'type': 'position_jump',
+                    'axis': axis.upper(),
+                    'expected_displacement': self.stats[name].mean,
+                    'actual_displacement': distance
                 })
-                
-        # Position prediction anomaly
-        if len(self.position_history) > 10:
-            last_positions = list(self.position_history)[-10:]
-            
-            # Simple velocity check (in production, use LSTM prediction)
-            if features['x_coord'] is not None:
-                velocities = [abs(last_positions[i+1].get('x', 0) - last_positions[i].get('x', 0))
-                             for i in range(len(last_positions)-1)]
-                avg_velocity = np.mean(velocities) if velocities else 0
-                current_velocity = abs(features['x_coord'] - last_positions[-1].get('x', 0))
-                
-                if avg_velocity > 0 and current_velocity > avg_velocity * 3:
-                    anomalies.append({
-                        'type': 'position_jump',
-                        'axis': 'X',
-                        'expected_velocity': avg_velocity,
-                        'actual_velocity': current_velocity
-                    })
+        if length is not None and self._outlier('segment_length', length,
+                                                two_sided=False) is not None:
+            anomalies.append({
+                'type': 'segment_length_anomaly',
+                'expected_length': self.stats['segment_length'].mean,
+                'actual_length': length
+            })
                     
         # Command sequence anomaly
         if len(self.command_history) > 5:
-            # Check for unusual command sequences
-            recent_commands = list(self.command_history)[-5:]
-            
-            # Example: M3 (laser on) without G1 (movement) is suspicious
-            if features['has_m3'] and not any('G1' in cmd for cmd in recent_commands):
+            # Example: M3 (laser on) without G1 (movement) in the last 5 commands is suspicious
+            if features['has_m3'] and self._since_g1 >= 5:
                 anomalies.append({
                     'type': 'sequence_anomaly',
                     'description': 'Laser activation without movement'
@@ -336,31 +1190,54 @@ class AnomalyDetectionModule:
                 
         return anomalies
         
-    def update_baseline(self, command):
+    def update_baseline(self, command, features=None, motion=None):
         """Update baseline statistics with legitimate commands"""
-        features = self.extract_features(command)
+        if features is None:
+            features = self.extract_features(command)
         
-        # Update rolling statistics (simplified)
         if features['feed_rate']:
-            # In production, use proper online statistics update
-            self.baseline_stats['avg_feed_rate'] = (
-                0.95 * self.baseline_stats['avg_feed_rate'] +
-                0.05 * features['feed_rate']
-            )
+            self.stats['feed_rate'].update(features['feed_rate'])
+        if features['power']:
+            self.stats['power'].update(features['power'])
             
-    def process(self, command, context=None):
+        moves, length = motion if motion is not None else self._displacements(features)
+        # An axis that does not move contributes no displacement sample;
+        # otherwise the long runs of zeros on idle axes would make any step
+        # an outlier
+        for axis, distance in moves.items():
+            if distance > 0:
+                self.stats[f'displacement_{axis}'].update(distance)
+        if length:
+            self.stats['segment_length'].update(length)
+
+        position = self.machine_position
+        for axis in self.AXES:
+            if features[f'{axis}_coord'] is not None:
+                position[axis] = features[f'{axis}_coord']
+
+    def get_statistics(self):
+        """Current live statistics per feature"""
+        return {name: stats.summary() for name, stats in self.stats.items()}
+
+    def process(self, command, context=None, features=None):
         """Process command for anomaly detection"""
-        anomalies = self.detect_anomalies(command)
+        if features is None:
+            features = self.extract_features(command)
+        motion = self._displacements(features)
+        anomalies = self.detect_anomalies(command, features, motion)
         
         # Add to history
         self.command_history.append(command)
-        features = self.extract_features(command)
-        self.position_history.append({
-            'x': features.get('x_coord'),
-            'y': features.get('y_coord'),
-            'z': features.get('z_coord')
-        })
-        
+        self._since_g1 = 0 if features['has_g1'] else self._since_g1 + 1
+        
+        if not anomalies:
+            # Statistics and machine position learn only from accepted
+            # commands, since blocked ones never reach the machine
+            self.update_baseline(command, features, motion)
+        for axis in self.AXES:
+            if features[f'{axis}_coord'] is not None:
+                self.position[axis] = features[f'{axis}_coord']
+
         if anomalies:
             return {
                 'allowed': False,
@@ -369,27 +1246,469 @@ class AnomalyDetectionModule:
                 'risk_score': len(anomalies) / 10.0  # Simple risk scoring
             }
             
-        # Update baseline if no anomalies
-        self.update_baseline(command)
-        
         return {
             'allowed': True,
             'anomalies': [],
             'risk_score': 0.0
         }
 
+    def process_batch(self, commands, contexts=None):
+        """Batch form of process with z-scores computed as NumPy arrays
+
+        Every accepted command moves the statistics the next one is judged
+        against, so commands are scored speculatively in runs: each
+        statistic is replayed as if the whole run were accepted, the run's
+        z-scores are compared with the threshold at once, and the run is
+        accepted up to the first command that would be flagged. That command
+        goes through process() and scoring resumes after it. Verdicts and
+        final state match calling process() on each command in turn.
+        """
+        table, has_g1, has_m3 = self._feature_table(commands)
+        results = []
+        start = 0
+        window = self.BATCH_WINDOW
+        while start < len(commands):
+            stop = min(len(commands), start + window)
+            flagged = self._accept_run(commands, table[start:stop], has_g1[start:stop],
+                                       has_m3[start:stop], start)
+            results.extend({'allowed': True, 'anomalies': [], 'risk_score': 0.0}
+                           for _ in range(start, flagged))
+            if flagged < stop:
+                results.append(self.process(commands[flagged]))
+                # Shorter runs waste less work while commands keep being flagged
+                window = max(self.MIN_BATCH_WINDOW, window // 2)
+                start = flagged + 1
+            else:
+                window = min(self.BATCH_WINDOW, window * 2)
+                start = stop
+        return results
+
+    def _feature_table(self, commands):
+        """extract_features for many commands as arrays: F, S, X, Y, Z
+        values per row (NaN where absent) and the G1 and M3 flags"""
+        findall = self.WORD_PATTERN.findall
+        columns = self.TABLE_COLUMNS
+        nan = math.nan
+        rows = []
+        for command in commands:
+            row = [nan] * 5
+            for letter, value in findall(command):
+                column = columns[letter]
+                if row[column] != row[column]:  # still NaN: first occurrence wins
+                    row[column] = float(value)
+            rows.append(row)
+        count = len(commands)
+        table = np.array(rows, dtype=float).reshape(count, 5)
+        has_g1 = np.fromiter(('G1' in command for command in commands), dtype=bool, count=count)
+        has_m3 = np.fromiter(('M3' in command for command in commands), dtype=bool, count=count)
+        return table, has_g1, has_m3
+
+    def _accept_run(self, commands, table, has_g1, has_m3, start):
+        """Accept commands from `start` up to the first one process() would
+        flag, updating state as process() would; returns the index of that
+        command, or the end of the run if none is flagged"""
+        size = len(table)
+        rows = np.arange(size)
+
+        # Program position before each command: the last coordinate given
+        # in the run so far, else the current position. Until a blocked
+        # move the machine position follows it, so it only differs on axes
+        # the run has not touched yet
+        coords = table[:, 2:]
+        given = ~np.isnan(coords)
+        last = np.maximum.accumulate(np.where(given, rows[:, None], -1), axis=0)
+        before = np.vstack((np.full((1, len(self.AXES)), -1), last[:-1]))
+        touched = before >= 0
+        carried = np.take_along_axis(coords, np.maximum(before, 0), axis=0)
+        program = np.where(touched, carried,
+                           np.array([self.position[a] for a in self.AXES], dtype=float))
+        machine = np.where(touched, carried,
+                           np.array([self.machine_position[a] for a in self.AXES], dtype=float))
+
+        def motion(reference):
+            moves = np.abs(coords - reference)
+            squares = np.where(np.isnan(moves), 0.0, moves * moves)
+            length = np.sqrt(squares[:, 0] + squares[:, 1] + squares[:, 2])
+            length[np.isnan(moves).all(axis=1)] = np.nan
+            return moves, length
+
+        # Same choice as _displacements: the shorter of the two moves
+        moves, length = motion(program)
+        same = (program == machine) | (np.isnan(program) & np.isnan(machine))
+        diverged = ~same.all(axis=1)
+        if diverged.any():
+            machine_moves, machine_length = motion(machine)
+            use_machine = diverged & (np.isnan(length) | (machine_length < length))
+            moves = np.where(use_machine[:, None], machine_moves, moves)
+            length = np.where(use_machine, machine_length, length)
+
+        # (statistic, values, two-sided); NaN and zero values are not checked
+        checks = [('feed_rate', table[:, 0], True), ('power', table[:, 1], True)]
+        checks += [(f'displacement_{axis}', moves[:, column], False)
+                   for column, axis in enumerate(self.AXES)]
+        checks.append(('segment_length', length, False))
+
+        flagged = size
+        scans = []
+        for name, values, two_sided in checks:
+            present = np.flatnonzero(~np.isnan(values) & (values != 0))
+            z_scores, trajectory = self.stats[name].scan(values[present].tolist())
+            outliers = (np.abs(z_scores) if two_sided else z_scores) > self.anomaly_threshold
+            if outliers.any():
+                flagged = min(flagged, int(present[np.argmax(outliers)]))
+            scans.append((name, present, trajectory))
+
+        # Laser on without G1 in the last 5 commands
+        last_g1 = np.maximum.accumulate(np.where(has_g1, rows, -1))
+        last_g1_before = np.concatenate(([-1], last_g1[:-1]))
+        since_g1 = np.where(last_g1_before >= 0, rows - 1 - last_g1_before, self._since_g1 + rows)
+        history = np.minimum(len(self.command_history) + rows, self.command_history.maxlen)
+        sequence = np.flatnonzero(has_m3 & (since_g1 >= 5) & (history > 5))
+        if len(sequence):
+            flagged = min(flagged, int(sequence[0]))
+
+        # Commit the accepted prefix
+        if flagged:
+            for name, present, trajectory in scans:
+                self.stats[name].advance(trajectory, int(np.searchsorted(present, flagged)))
+            for column, axis in enumerate(self.AXES):
+                row = last[flagged - 1, column]
+                if row >= 0:
+                    self.position[axis] = self.machine_position[axis] = float(coords[row, column])
+            self.command_history.extend(commands[start:start + flagged])
+            g1 = last_g1[flagged - 1]
+            self._since_g1 = int(flagged - 1 - g1) if g1 >= 0 else self._since_g1 + flagged
+        return start + flagged
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter keyed by uniformly distributed digest bytes"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, digest):
+        """Bit positions for a digest; filters of equal size share them"""
+        # Double hashing over two 64-bit words of the digest
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+
+    def add(self, digest, positions=None):
+        bits = self.bits
+        for position in positions or self.positions(digest):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def contains_positions(self, positions):
+        bits = self.bits
+        for position in positions:
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __contains__(self, digest):
+        return self.contains_positions(self.positions(digest))
+
+
+def _merkle_leaf(leaf):
+    """RFC 6962 leaf hash; the 0x00 prefix keeps leaves and nodes apart"""
+    return hashlib.sha256(b'\x00' + leaf).digest()
+
+
+def _merkle_parent(left, right):
+    """RFC 6962 interior node hash"""
+    return hashlib.sha256(b'\x01' + left + right).digest()
+
+
+class MerkleAccumulator:
+    """Append-only SHA-256 Merkle tree that grows one leaf at a time
+
+    Hashing follows RFC 6962: leaves are hashed as H(0x00 || leaf) and
+    interior nodes as H(0x01 || left || right), so a node can never be
+    presented as a leaf. Only nodes whose subtree is complete are stored,
+    each level packed into a bytearray of 32-byte hashes, so an append
+    costs O(log n) hashes and never touches earlier nodes. The right edge
+    of a tree whose size is not a power of two is recomputed on demand,
+    with a lone right node carried up unchanged rather than paired with
+    itself. Because stored nodes never change, roots and proofs can be
+    produced for any earlier size as well as the current one.
+    """
+
+    HASH_SIZE = 32
+
+    def __init__(self, leaves=()):
+        self.leaves = bytearray()
+        self.levels = [bytearray()]
+        self.size = 0
+        for leaf in leaves:
+            self.append(leaf)
+
+    def __len__(self):
+        return self.size
+
+    def append(self, leaf):
+        """Append a 32-byte leaf and return its index"""
+        if len(leaf) != self.HASH_SIZE:
+            raise ValueError(f"Merkle leaves must be {self.HASH_SIZE}-byte hashes")
+        index = self.size
+        node = _merkle_leaf(leaf)
+        self.leaves += leaf
+        self.levels[0] += node
+        self.size += 1
+
+        # Carry completed pairs upward, like incrementing a binary counter
+        level, position = 0, index
+        while position & 1:
+            node = _merkle_parent(self._stored(level, position - 1), node)
+            level += 1
+            position >>= 1
+            if level == len(self.levels):
+                self.levels.append(bytearray())
+            self.levels[level] += node
+        return index
+
+    def _stored(self, level, index):
+        start = index * self.HASH_SIZE
+        return bytes(self.levels[level][start:start + self.HASH_SIZE])
+
+    @staticmethod
+    def _height(size):
+        return (size - 1).bit_length()
+
+    @staticmethod
+    def _compute(level, index, size, lookup):
+        """Value of node (level, index) in the tree of `size` leaves, taking
+        complete nodes from lookup(level, index)"""
+        if (index + 1) << level <= size:
+            return lookup(level, index)
+        below = (size + (1 << (level - 1)) - 1) >> (level - 1)  # nodes one level down
+        left = MerkleAccumulator._compute(level - 1, 2 * index, size, lookup)
+        if 2 * index + 1 >= below:
+            return left
+        right = MerkleAccumulator._compute(level - 1, 2 * index + 1, size, lookup)
+        return _merkle_parent(left, right)
+
+    def _check_size(self, size):
+        size = self.size if size is None else size
+        if not 0 < size <= self.size:
+            raise ValueError(f"tree size must be between 1 and {self.size}")
+        return size
+
+    def root(self, size=None):
+        """Root hash (bytes) of the first `size` leaves, default all of them"""
+        if not self.size:
+            return None
+        size = self._check_size(size)
+        return self._compute(self._height(size), 0, size, self._stored)
+
+    def _path(self, level, index, size):
+        """Sibling hashes from node (level, index) up to the root of `size`;
+        levels where the node has no sibling are carried and omitted"""
+        path = []
+        count = (size + (1 << level) - 1) >> level
+        for height in range(level, self._height(size)):
+            sibling = index ^ 1
+            if sibling < count:
+                path.append(self._compute(height, sibling, size, self._stored).hex())
+            index >>= 1
+            count = (count + 1) >> 1
+        return path
+
+    def inclusion_proof(self, index, size=None):
+        """Proof that leaf `index` is in the tree of `size` leaves"""
+        size = self._check_size(size)
+        if not 0 <= index < size:
+            raise IndexError(f"leaf {index} is not in a tree of {size} leaves")
+        start = index * self.HASH_SIZE
+        return {
+            'index': index,
+            'size': size,
+            'leaf': bytes(self.leaves[start:start + self.HASH_SIZE]).hex(),
+            'root': self.root(size).hex(),
+            'path': self._path(0, index, size)
+        }
+
+    def consistency_proof(self, old_size, new_size=None):
+        """Proof that the tree of `old_size` leaves is a prefix of `new_size`
+
+        The proof carries the complete nodes the old root is built from, each
+        with its path to the new root, so O(log^2 n) hashes at most.
+        """
+        new_size = self._check_size(new_size)
+        old_size = self._check_size(old_size)
+        if old_size > new_size:
+            raise ValueError("old_size must not exceed new_size")
+        nodes = {}
+
+        def record(level, index):
+            node = self._stored(level, index)
+            nodes[(level, index)] = node
+            return node
+
+        self._compute(self._height(old_size), 0, old_size, record)
+        return {
+            'old_size': old_size,
+            'new_size': new_size,
+            'old_root': self.root(old_size).hex(),
+            'new_root': self.root(new_size).hex(),
+            'nodes': [{'level': level, 'index': index, 'hash': node.hex(),
+                       'path': self._path(level, index, new_size)}
+                      for (level, index), node in sorted(nodes.items())]
+        }
+
+    @staticmethod
+    def _climb(node, level, index, size, path):
+        """Hash a node up through `path`, with the shape of the path derived
+        from `size`; returns None if the path does not fit that shape"""
+        count = (size + (1 << level) - 1) >> level
+        if not 0 <= index < count:
+            return None
+        siblings = iter(path)
+        while count > 1:
+            if index ^ 1 < count:
+                sibling_hex = next(siblings, None)
+                if sibling_hex is None:
+                    return None
+                if index & 1:
+                    node = _merkle_parent(bytes.fromhex(sibling_hex), node)
+                else:
+                    node = _merkle_parent(node, bytes.fromhex(sibling_hex))
+            index >>= 1
+            count = (count + 1) >> 1
+        if next(siblings, None) is not None:
+            return None
+        return node
+
+    @staticmethod
+    def verify_inclusion(proof, root_hex=None):
+        """Check an inclusion_proof, against `root_hex` if given"""
+        root_hex = proof['root'] if root_hex is None else root_hex
+        if not 0 <= proof['index'] < proof['size']:
+            return False
+        node = MerkleAccumulator._climb(_merkle_leaf(bytes.fromhex(proof['leaf'])), 0,
+                                        proof['index'], proof['size'], proof['path'])
+        return node is not None and node.hex() == root_hex
+
+    @staticmethod
+    def verify_consistency(proof, old_root_hex=None, new_root_hex=None):
+        """Check a consistency_proof, against known roots if given"""
+        old_root_hex = proof['old_root'] if old_root_hex is None else old_root_hex
+        new_root_hex = proof['new_root'] if new_root_hex is None else new_root_hex
+        old_size, new_size = proof['old_size'], proof['new_size']
+        if not 0 < old_size <= new_size:
+            return False
+        nodes = {(entry['level'], entry['index']): entry for entry in proof['nodes']}
+
+        # Every supplied node must lead to the new root...
+        for (level, index), entry in nodes.items():
+            node = MerkleAccumulator._climb(bytes.fromhex(entry['hash']), level, index,
+                                            new_size, entry['path'])
+            if node is None or node.hex() != new_root_hex:
+                return False
+
+        # ...and together rebuild the old root
+        def lookup(level, index):
+            return bytes.fromhex(nodes[(level, index)]['hash'])
+
+        try:
+            old_root = MerkleAccumulator._compute(MerkleAccumulator._height(old_size), 0,
+                                                  old_size, lookup)
+        except KeyError:
+            return False
+        return old_root.hex() == old_root_hex
+
 
 class IntegrityVerificationModule:
     """Verify command integrity using checksums and digital signatures"""
     
-    def __init__(self):
-        self.checksum_algorithm = 'sha256'
-        self.command_hashes = deque(maxlen=1000)
+    CHECKSUM_ALGORITHMS = {
+        'sha256': hashlib.sha256,
+        'blake2b': lambda data: hashlib.blake2b(data, digest_size=32)
+    }
+
+    def __init__(self, replay_window=1000, bloom_window=0, bloom_error_rate=0.001,
+                 checksum_algorithm='sha256'):
+        if checksum_algorithm not in self.CHECKSUM_ALGORITHMS:
+            raise ValueError(f"checksum_algorithm must be one of {list(self.CHECKSUM_ALGORITHMS)}")
+        self.checksum_algorithm = checksum_algorithm
+        self._hash = self.CHECKSUM_ALGORITHMS[checksum_algorithm]
+
+        # Exact replay window: raw digests in a set for O(1) lookup, with a
+        # FIFO giving the eviction order
+        self.replay_window = replay_window
+        self.command_hashes = deque()
+        self._hash_set = set()
+
+        # Optional approximate tier: every digest also goes into two rotating
+        # Bloom filters, each holding bloom_window / 2, so lookups that miss
+        # the exact window still see roughly bloom_window commands back
+        self.bloom_window = bloom_window
+        self.bloom_error_rate = bloom_error_rate
+        self._bloom_generations = []
+        if bloom_window:
+            self._bloom_generations = [BloomFilter(bloom_window // 2, bloom_error_rate)]
+        self.bloom_hits = 0
+
+        # Per-job Merkle tree, only kept between start_job and end_job
+        self.job_id = None
+        self.job_tree = None
+
+    def set_replay_window(self, replay_window):
+        """Resize the exact window; evicted digests stay in the Bloom tier if enabled"""
+        self.replay_window = replay_window
+        while len(self.command_hashes) > self.replay_window:
+            self._evict()
+
+    def _evict(self):
+        digest = self.command_hashes.popleft()
+        self._hash_set.discard(digest)
+
+    def _replay_reason(self, digest):
+        """Return (reason, bloom positions); reason is None unless digest
+        looks like a replay"""
+        if digest in self._hash_set:
+            return 'Duplicate command detected (possible replay)', None
+        if not self._bloom_generations:
+            return None, None
+        # Every generation has the same size, so positions are computed once
+        positions = self._bloom_generations[0].positions(digest)
+        for generation in self._bloom_generations:
+            if generation.contains_positions(positions):
+                self.bloom_hits += 1
+                reason = 'Probable duplicate command in long replay window (possible replay)'
+                return reason, positions
+        return None, positions
+
+    def _remember(self, digest, positions=None):
+        self.command_hashes.append(digest)
+        self._hash_set.add(digest)
+        if len(self.command_hashes) > self.replay_window:
+            self._evict()
+        if self._bloom_generations:
+            current = self._bloom_generations[-1]
+            if current.count >= current.capacity:
+                current = BloomFilter(self.bloom_window // 2, self.bloom_error_rate)
+                self._bloom_generations = [self._bloom_generations[-1], current]
+            current.add(digest, positions)
+
+    def _accept(self, digest):
+        """Record a command that passed every check in the current job"""
+        if self.job_tree is not None:
+            self.job_tree.append(digest)
+
+    def calculate_digest(self, command):
+        """Raw checksum digest of a command"""
+        return self._hash(command.encode()).digest()
         
     def calculate_checksum(self, command):
         """Calculate command checksum"""
-        h = hashlib.sha256(command.encode())
-        return h.hexdigest()
+        return self.calculate_digest(command).hex()
         
     def verify_checksum(self, command, provided_checksum):
         """Verify command checksum"""
@@ -400,39 +1719,43 @@ class IntegrityVerificationModule:
         """Generate Merkle tree for batch verification"""
         if not commands:
             return None
-            
-        # Leaf nodes
-        hashes = [self.calculate_checksum(cmd) for cmd in commands]
-        
-        # Build tree
-        while len(hashes) > 1:
-            next_level = []
-            for i in range(0, len(hashes), 2):
-                if i + 1 < len(hashes):
-                    combined = hashes[i] + hashes[i + 1]
-                else:
-                    combined = hashes[i] + hashes[i]
-                    
-                h = hashlib.sha256(combined.encode())
-                next_level.append(h.hexdigest())
-                
-            hashes = next_level
-            
-        return hashes[0]  # Root hash
+        tree = MerkleAccumulator(self.calculate_digest(cmd) for cmd in commands)
+        return tree.root().hex()  # Root hash
+
+    def start_job(self, job_id=None):
+        """Begin a per-job Merkle tree fed by every accepted command"""
+        self.job_id = job_id
+        self.job_tree = MerkleAccumulator()
+
+    def end_job(self):
+        """Stop tracking the current job and return its final commitment"""
+        if self.job_tree is None:
+            return None
+        summary = {'job_id': self.job_id, 'size': len(self.job_tree), 'root': self.job_root()}
+        self.job_tree = None
+        return summary
+
+    def job_root(self, size=None):
+        """Hex root over the current job's accepted commands so far"""
+        if self.job_tree is None or not len(self.job_tree):
+            return None
+        return self.job_tree.root(size).hex()
         
     def process(self, command, context=None):
         """Process command for integrity verification"""
-        checksum = self.calculate_checksum(command)
+        digest = self.calculate_digest(command)
+        checksum = digest.hex()
         
         # Check for duplicate commands (replay attack)
-        if checksum in self.command_hashes:
+        reason, positions = self._replay_reason(digest)
+        if reason:
             return {
                 'allowed': False,
-                'reason': 'Duplicate command detected (possible replay)',
+                'reason': reason,
                 'checksum': checksum
             }
             
-        self.command_hashes.append(checksum)
+        self._remember(digest, positions)
         
         # Verify provided checksum if available
         if context and 'checksum' in context:
@@ -444,50 +1767,267 @@ class IntegrityVerificationModule:
                     'calculated': checksum
                 }
                 
+        self._accept(digest)
         return {
             'allowed': True,
             'checksum': checksum,
             'verified': True
         }
 
+    def process_batch(self, commands, contexts=None):
+        """Batch form of process with hashing done in one tight loop"""
+        hash_function = self._hash
+        digests = [hash_function(command.encode()).digest() for command in commands]
+        if contexts is None:
+            contexts = [None] * len(commands)
+
+        results = []
+        for context, digest in zip(contexts, digests):
+            checksum = digest.hex()
+            reason, positions = self._replay_reason(digest)
+            if reason:
+                results.append({
+                    'allowed': False,
+                    'reason': reason,
+                    'checksum': checksum
+                })
+                continue
+            self._remember(digest, positions)
+            if context and 'checksum' in context and context['checksum'] != checksum:
+                results.append({
+                    'allowed': False,
+                    'reason': 'Checksum verification failed',
+                    'expected': context['checksum'],
+                    'calculated': checksum
+                })
+                continue
+            self._accept(digest)
+            results.append({'allowed': True, 'checksum': checksum, 'verified': True})
+        return results
+
+
+GRBL_STATUS_PATTERN = re.compile(r'<([^<>]*)>')
+
+
+def parse_grbl_status(report):
+    """Parse a GRBL 1.1 realtime status report
+
+    '<Run|MPos:1.000,2.000,0.000|Bf:15,128|FS:500,0>' becomes
+    {'state': 'Run', 'mpos': [1.0, 2.0, 0.0], 'planner_free': 15,
+     'rx_free': 128, 'feed': 500.0, 'spindle': 0.0}. Returns None if the
+    text holds no report.
+    """
+    match = GRBL_STATUS_PATTERN.search(report)
+    if not match:
+        return None
+    fields = match.group(1).split('|')
+    status = {'state': fields[0].split(':')[0]}
+    try:
+        for field in fields[1:]:
+            name, _, value = field.partition(':')
+            if name == 'Bf':
+                planner_free, rx_free = value.split(',')
+                status['planner_free'] = int(planner_free)
+                status['rx_free'] = int(rx_free)
+            elif name in ('MPos', 'WPos', 'WCO'):
+                status[name.lower()] = [float(v) for v in value.split(',')]
+            elif name == 'FS':
+                feed, spindle = value.split(',')
+                status['feed'] = float(feed)
+                status['spindle'] = float(spindle)
+            elif name == 'F':
+                status['feed'] = float(value)
+    except ValueError:
+        return None
+    return status
+
+
+class TokenBucket:
+    """Lazily refilled token bucket; the caller passes the clock, rate and capacity"""
+
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+
+    def refill(self, now, rate, capacity):
+        tokens = self.tokens + (now - self.updated) * rate
+        self.tokens = capacity if tokens > capacity else tokens
+        self.updated = now
+        return self.tokens
+
 
 class RateLimitingModule:
     """Rate limiting and DDoS protection"""
     
-    def __init__(self):
-        self.command_buckets = {}  # Per-IP rate limiting
-        self.global_rate_limit = 100  # Commands per second
-        self.per_ip_rate_limit = 50  # Commands per IP per second
-        self.burst_size = 200  # Allow burst traffic
-        self.last_reset = time.time()
-        
+    def __init__(self, per_ip_rate_limit=50, global_rate_limit=100, burst_size=200,
+                 per_ip_burst_size=None, idle_timeout=None, max_sources=100000):
+        self.global_rate_limit = global_rate_limit  # Commands per second
+        self.per_ip_rate_limit = per_ip_rate_limit  # Commands per IP per second
+        self.burst_size = burst_size  # Allow burst traffic (global bucket capacity)
+        # Per-source burst defaults to the same share of the global burst as its rate
+        self.per_ip_burst_size = per_ip_burst_size
+
+        # Token buckets refilled from the monotonic clock on each call; source
+        # buckets are kept in least-recently-used order so idle ones are
+        # evicted from the front
+        self.global_bucket = TokenBucket(burst_size, time.monotonic())
+        self.command_buckets = OrderedDict()  # Per-IP rate limiting
+        self.idle_timeout = idle_timeout
+        self.max_sources = max_sources
+        self.evicted_sources = 0
+        
+        # Machine feedback: GRBL status reports resize the limits to what the
+        # planner and serial RX buffer can actually absorb. Without a report
+        # for feedback_stale_after seconds the configured limits come back.
+        self.base_limits = (per_ip_rate_limit, global_rate_limit, burst_size)
+        self.machine_feedback = None
+        self.feedback_horizon = 0.5      # seconds to fill free buffer space
+        self.feedback_margin = 0.2       # allowance above the measured drain rate
+        self.feedback_min_rate = 5
+        self.feedback_max_rate = 5000
+        self.feedback_stale_after = 2.0
+        self.feedback_smoothing = 0.3    # EWMA weight of the newest drain sample
+        self.avg_line_bytes = 24.0       # EWMA of admitted line length incl. newline
+        self.attack_scale = 1.0          # share of the feedback rate allowed while under attack
+        self._admitted = 0
+
+    @property
+    def per_ip_capacity(self):
+        if self.per_ip_burst_size is not None:
+            return self.per_ip_burst_size
+        return max(1, self.burst_size * self.per_ip_rate_limit / self.global_rate_limit)
+
+    def _evict_idle(self, now, capacity):
+        # A bucket idle long enough to refill completely is the same as no
+        # bucket, so the default timeout never changes a verdict
+        idle_timeout = self.idle_timeout or capacity / self.per_ip_rate_limit
+        buckets = self.command_buckets
+        while buckets:
+            source_ip, bucket = next(iter(buckets.items()))
+            if now - bucket.updated < idle_timeout and len(buckets) < self.max_sources:
+                break
+            del buckets[source_ip]
+            self.evicted_sources += 1
+            
+    def _admit(self, source_ip, now):
+        """Take one token from the source and global buckets; O(1) amortized"""
+        feedback = self.machine_feedback
+        if feedback is not None and now - feedback['updated'] > self.feedback_stale_after:
+            self.reset_machine_feedback()
+        capacity = self.per_ip_capacity
+        buckets = self.command_buckets
+        # The source's own bucket is taken out while idle ones are evicted
+        # (leaving room for it under max_sources), then goes back in as the
+        # most recently used
+        bucket = buckets.pop(source_ip, None)
+        self._evict_idle(now, capacity)
+        if bucket is None:
+            bucket = TokenBucket(capacity, now)
+        buckets[source_ip] = bucket
+
+        # Both buckets are checked before either is charged
+        if bucket.refill(now, self.per_ip_rate_limit, capacity) < 1:
+            return False, 'Per-IP rate limit exceeded', bucket.tokens
+        if self.global_bucket.refill(now, self.global_rate_limit, self.burst_size) < 1:
+            return False, 'Global rate limit exceeded', bucket.tokens
+        bucket.tokens -= 1
+        self.global_bucket.tokens -= 1
+        self._admitted += 1
+        return True, None, bucket.tokens
+        
+    def _observe_line(self, command):
+        self.avg_line_bytes += 0.05 * (len(command) + 1 - self.avg_line_bytes)
+
     def check_rate_limit(self, source_ip):
         """Check if request exceeds rate limit"""
-        current_time = time.time()
-        
-        # Reset buckets every second
-        if current_time - self.last_reset > 1.0:
-            self.command_buckets = {}
-            self.last_reset = current_time
-            
-        # Check per-IP limit
-        if source_ip not in self.command_buckets:
-            self.command_buckets[source_ip] = 0
-            
-        self.command_buckets[source_ip] += 1
-        
-        if self.command_buckets[source_ip] > self.per_ip_rate_limit:
-            return False, 'Per-IP rate limit exceeded'
-            
-        # Check global limit
-        total_commands = sum(self.command_buckets.values())
-        if total_commands > self.global_rate_limit:
-            return False, 'Global rate limit exceeded'
-            
-        return True, None
+        allowed, reason, _ = self._admit(source_ip, time.monotonic())
+        return allowed, reason
         
+    def update_machine_status(self, status, acknowledged=None, now=None):
+        """Size the limits from a GRBL status report (raw text or parsed)
+
+        The machine's drain rate comes from `acknowledged`, the number of
+        'ok' responses since the previous report, when the caller sees the
+        response stream. Otherwise it is estimated from lines admitted since
+        the previous report minus the growth of what is queued in the planner
+        and RX buffer, which overestimates once lines back up in the network
+        in front of a full RX buffer. The global rate is that drain rate plus
+        enough to fill the free buffer space over feedback_horizon, and the
+        burst is capped at the free space itself, so a flood against a full
+        planner is held to the machine's own pace while a fast raster keeps
+        its headroom. attack_scale is applied on top.
+        """
+        if isinstance(status, str):
+            status = parse_grbl_status(status)
+        if not status or 'planner_free' not in status:
+            return None
+        now = time.monotonic() if now is None else now
+
+        feedback = self.machine_feedback
+        if feedback is None:
+            feedback = self.machine_feedback = {
+                'planner_size': 0, 'rx_size': 0, 'drain_rate': 0.0,
+                'queued_lines': 0.0, 'updated': now, 'reports': 0
+            }
+            self._admitted = 0
+        # Buffer sizes are learnt from the most free space ever reported
+        planner_free, rx_free = status['planner_free'], status['rx_free']
+        feedback['planner_size'] = max(feedback['planner_size'], planner_free)
+        feedback['rx_size'] = max(feedback['rx_size'], rx_free)
+
+        line_bytes = max(self.avg_line_bytes, 1.0)
+        queued = ((feedback['planner_size'] - planner_free) +
+                  (feedback['rx_size'] - rx_free) / line_bytes)
+        elapsed = now - feedback['updated']
+        if feedback['reports'] and elapsed > 0:
+            if acknowledged is not None:
+                completed = acknowledged
+            else:
+                completed = max(0.0, self._admitted - (queued - feedback['queued_lines']))
+            sample = completed / elapsed
+            feedback['drain_rate'] += self.feedback_smoothing * (sample - feedback['drain_rate'])
+        self._admitted = 0
+
+        headroom = planner_free + rx_free / line_bytes
+        rate = (feedback['drain_rate'] * (1 + self.feedback_margin) +
+                headroom / self.feedback_horizon)
+        self.burst_size = max(1.0, headroom)
+
+        feedback.update(queued_lines=queued, updated=now, state=status['state'],
+                        headroom=headroom, rate=rate, reports=feedback['reports'] + 1)
+        self._apply_feedback_rate()
+        return {'global_rate_limit': self.global_rate_limit, 'burst_size': self.burst_size,
+                'drain_rate': feedback['drain_rate'], 'headroom': headroom}
+
+    def _apply_feedback_rate(self):
+        rate = self.machine_feedback['rate'] * self.attack_scale
+        rate = min(self.feedback_max_rate, max(self.feedback_min_rate, rate))
+        # One planner is shared by every source, so the machine's headroom is
+        # the limit for each source as well as for the total
+        self.global_rate_limit = rate
+        self.per_ip_rate_limit = rate
+
+    def reset_machine_feedback(self):
+        """Forget machine feedback and go back to the configured limits"""
+        self.machine_feedback = None
+        self.attack_scale = 1.0
+        self.per_ip_rate_limit, self.global_rate_limit, self.burst_size = self.base_limits
+
     def adaptive_rate_limiting(self, metrics):
         """Adjust rate limits based on attack detection"""
+        if 'machine_status' in metrics:
+            self.update_machine_status(metrics['machine_status'])
+        if self.machine_feedback is not None:
+            # Limits come from the machine; an attack scales them down
+            # instead of replacing them with the static bounds below
+            if metrics.get('attack_detected', False):
+                self.attack_scale = max(0.05, self.attack_scale / 2)
+            else:
+                self.attack_scale = min(1.0, self.attack_scale + 0.05)
+            self._apply_feedback_rate()
+            return
         # Increase limits during normal operation
         if metrics.get('attack_detected', False):
             self.per_ip_rate_limit = max(10, self.per_ip_rate_limit // 2)
@@ -500,87 +2040,208 @@ class RateLimitingModule:
         """Process command for rate limiting"""
         source_ip = context.get('source_ip', '0.0.0.0') if context else '0.0.0.0'
         
-        allowed, reason = self.check_rate_limit(source_ip)
+        self._observe_line(command)
+        allowed, reason, tokens = self._admit(source_ip, time.monotonic())
         
         return {
             'allowed': allowed,
-            'reason': reason if not allowed else None,
-            'current_rate': self.command_buckets.get(source_ip, 0),
+            'reason': reason,
+            'tokens': tokens,
             'limit': self.per_ip_rate_limit
         }
 
+    def process_batch(self, commands, contexts=None):
+        """Batch form of process: the whole batch is accounted against one
+        clock reading"""
+        if contexts is None:
+            contexts = [None] * len(commands)
+
+        now = time.monotonic()
+        limit = self.per_ip_rate_limit
+        results = []
+        for command, context in zip(commands, contexts):
+            source_ip = context.get('source_ip', '0.0.0.0') if context else '0.0.0.0'
+            self._observe_line(command)
+            allowed, reason, tokens = self._admit(source_ip, now)
+            results.append({
+                'allowed': allowed,
+                'reason': reason,
+                'tokens': tokens,
+                'limit': limit
+            })
+        return results
+
+
+class IntervalMatcher:
+    """Map IP addresses to the labels of the networks that contain them
+
+    Networks are flattened into sorted, non-overlapping address segments,
+    each carrying the labels of every network covering it, so a lookup is
+    a single bisect whatever the prefix lengths or overlaps.
+    """
+
+    def __init__(self, entries):
+        # entries: iterable of (ip_network, label)
+        by_version = {4: [], 6: []}
+        for network, label in entries:
+            by_version[network.version].append(
+                (int(network.network_address), int(network.broadcast_address) + 1, label))
+        self._tables = {}
+        for version, spans in by_version.items():
+            boundaries = sorted({point for start, end, _ in spans for point in (start, end)})
+            starts, ends, labels = [], [], []
+            for start, end in zip(boundaries, boundaries[1:]):
+                covering = frozenset(label for s, e, label in spans if s <= start < e)
+                if covering:
+                    starts.append(start)
+                    ends.append(end)
+                    labels.append(covering)
+            self._tables[version] = (starts, ends, labels)
+
+    def lookup(self, address):
+        """Labels covering an ip_address (empty frozenset if none)"""
+        starts, ends, labels = self._tables[address.version]
+        value = int(address)
+        index = bisect.bisect_right(starts, value) - 1
+        if index >= 0 and value < ends[index]:
+            return labels[index]
+        return frozenset()
+
 
 class NetworkIsolationModule:
     """Network segmentation and isolation"""
     
+    MAX_CACHED_FLOWS = 65536
+
     def __init__(self):
-        self.trusted_networks = ['192.168.100.0/24', '10.0.0.0/8']
-        self.vlan_config = {
+        # Setting any of the policy attributes recompiles the policy and
+        # clears the flow cache; call invalidate_policy() after editing a
+        # rule or list in place
+        self._trusted_networks = ['192.168.100.0/24', '10.0.0.0/8']
+        self._vlan_config = {
             'control': 100,
             'management': 200,
             'production': 300
         }
-        self.firewall_rules = []
+        # Subnets of each VLAN; addresses outside all of them are production
+        self._vlan_subnets = {
+            'control': ['192.168.100.0/24'],
+            'management': ['192.168.200.0/24']
+        }
+        # Named destinations usable in firewall rules
+        self._address_groups = {
+            'cnc_devices': ['192.168.0.0/24']  # CNC segment (proxy default 192.168.0.170)
+        }
+        self._firewall_rules = []
         self._initialize_firewall_rules()
+        self.invalidate_policy()
         
     def _initialize_firewall_rules(self):
-        """Initialize firewall rules"""
-        self.firewall_rules = [
+        """Initialize firewall rules
+
+        Rules are evaluated first match wins for 'allow'/'deny'; 'log' rules
+        only mark the flow and evaluation continues. A rule source or
+        destination is a CIDR, 'any', 'vlan_<id>' or an address group name.
+        """
+        self._firewall_rules = [
             {
-                'name': 'Block external G-code',
-                'source': '0.0.0.0/0',
+                'name': 'Log all G-code traffic',
+                'source': 'any',
                 'destination': 'cnc_devices',
                 'protocol': 'tcp',
-                'port': 80,
-                'action': 'deny'
+                'port': [80, 8080],
+                'action': 'log'
             },
             {
                 'name': 'Allow control VLAN',
                 'source': 'vlan_100',
                 'destination': 'cnc_devices',
                 'protocol': 'tcp',
-                'port': 80,
+                'port': [80, 8080],
                 'action': 'allow'
             },
             {
-                'name': 'Log all G-code traffic',
-                'source': 'any',
+                'name': 'Block external G-code',
+                'source': '0.0.0.0/0',
                 'destination': 'cnc_devices',
                 'protocol': 'tcp',
-                'port': 80,
-                'action': 'log'
+                'port': [80, 8080],
+                'action': 'deny'
             }
         ]
         
-    def check_network_access(self, source_ip, destination_ip):
-        """Check if network access is allowed"""
-        # Simplified check - in production, use proper CIDR matching
-        for network in self.trusted_networks:
-            if source_ip.startswith(network.split('/')[0].rsplit('.', 1)[0]):
-                return True
-                
-        return False
+    def _policy_property(name):
+        attribute = '_' + name
         
-    def get_vlan_from_ip(self, ip_address):
-        """Determine VLAN from IP address"""
-        # Simplified - in production, query switch/router
-        if ip_address.startswith('192.168.100'):
-            return self.vlan_config['control']
-        elif ip_address.startswith('192.168.200'):
-            return self.vlan_config['management']
-        else:
-            return self.vlan_config['production']
+        def getter(self):
+            return getattr(self, attribute)
+
+        def setter(self, value):
+            setattr(self, attribute, value)
+            self.invalidate_policy()
             
-    def process(self, command, context=None):
-        """Process command for network isolation checks"""
-        if not context:
-            return {'allowed': True, 'reason': 'No network context'}
+        return property(getter, setter)
+
+    trusted_networks = _policy_property('trusted_networks')
+    vlan_config = _policy_property('vlan_config')
+    vlan_subnets = _policy_property('vlan_subnets')
+    address_groups = _policy_property('address_groups')
+    firewall_rules = _policy_property('firewall_rules')
+    del _policy_property
+
+    def invalidate_policy(self):
+        """Drop the compiled policy and every cached flow verdict"""
+        self._matcher = None
+        self._flow_cache = {}
+
+    def compile_policy(self):
+        """Compile networks, VLAN subnets, groups and rules into one matcher"""
+        entries = [(ipaddress.ip_network(network, strict=False), 'trusted')
+                   for network in self._trusted_networks]
+        for vlan_name, subnets in self._vlan_subnets.items():
+            label = f"vlan_{self._vlan_config[vlan_name]}"
+            entries += [(ipaddress.ip_network(subnet, strict=False), label) for subnet in subnets]
+        for group, members in self._address_groups.items():
+            entries += [(ipaddress.ip_network(member, strict=False), group) for member in members]
+
+        rules = []
+        for rule in self._firewall_rules:
+            compiled = {'name': rule['name'], 'action': rule['action']}
+            for side in ('source', 'destination'):
+                spec = rule.get(side, 'any')
+                if (spec != 'any' and not spec.startswith('vlan_') and
+                        spec not in self._address_groups):
+                    network = ipaddress.ip_network(spec, strict=False)
+                    spec = str(network)
+                    entries.append((network, spec))
+                compiled[side] = spec
+            ports = rule.get('port')
+            compiled['ports'] = None if ports is None else frozenset(
+                ports if isinstance(ports, (list, tuple, set)) else [ports])
+            compiled['tcp'] = rule.get('protocol', 'any') in ('tcp', 'any')
+            rules.append(compiled)
             
-        source_ip = context.get('source_ip', '')
-        destination_ip = context.get('destination_ip', '')
+        self._matcher = IntervalMatcher(entries)
+        self._rules = rules
+        self._default_vlan = f"vlan_{self._vlan_config['production']}"
+        self._required_vlan = self._vlan_config['control']
+
+    def _labels(self, ip_string):
+        """Labels for an address, plus 'any' and exactly one VLAN label"""
+        try:
+            address = ipaddress.ip_address(ip_string)
+        except ValueError:
+            return None
+        labels = self._matcher.lookup(address)
+        if not any(label.startswith('vlan_') for label in labels):
+            labels = labels | {self._default_vlan}
+        return labels | {'any'}
+
+    def _evaluate(self, source_ip, destination_ip, port):
+        source = self._labels(source_ip)
         
         # Check if source is from trusted network
-        if not self.check_network_access(source_ip, destination_ip):
+        if source is None or 'trusted' not in source:
             return {
                 'allowed': False,
                 'reason': 'Source network not trusted',
@@ -588,29 +2249,188 @@ class NetworkIsolationModule:
             }
             
         # Check VLAN isolation
-        source_vlan = self.get_vlan_from_ip(source_ip)
-        if source_vlan != self.vlan_config['control']:
+        source_vlan = next(int(label[5:]) for label in source if label.startswith('vlan_'))
+        if source_vlan != self._required_vlan:
             return {
                 'allowed': False,
                 'reason': 'Wrong VLAN for control traffic',
                 'source_vlan': source_vlan,
-                'required_vlan': self.vlan_config['control']
+                'required_vlan': self._required_vlan
             }
             
+        # Firewall rules, first allow/deny match wins; G-code flows are TCP
+        destination = self._labels(destination_ip) or frozenset({'any'})
+        logged_by = []
+        for rule in self._rules:
+            if not (rule['tcp'] and rule['source'] in source and
+                    rule['destination'] in destination):
+                continue
+            if port is not None and rule['ports'] is not None and port not in rule['ports']:
+                continue
+            if rule['action'] == 'log':
+                logged_by.append(rule['name'])
+            elif rule['action'] == 'deny':
+                return {
+                    'allowed': False,
+                    'reason': f"Denied by firewall rule '{rule['name']}'",
+                    'rule': rule['name'],
+                    'logged_by': logged_by
+                }
+            else:
+                return {
+                    'allowed': True,
+                    'source_vlan': source_vlan,
+                    'network_trusted': True,
+                    'rule': rule['name'],
+                    'logged_by': logged_by
+                }
+
         return {
             'allowed': True,
             'source_vlan': source_vlan,
-            'network_trusted': True
+            'network_trusted': True,
+            'rule': None,
+            'logged_by': logged_by
         }
 
+    def check_flow(self, source_ip, destination_ip, port=None):
+        """Verdict for a (source, destination, port) flow, cached until the
+        policy changes; the returned dict is shared and must not be modified"""
+        key = (source_ip, destination_ip, port)
+        verdict = self._flow_cache.get(key)
+        if verdict is None:
+            if self._matcher is None:
+                self.compile_policy()
+            verdict = self._evaluate(source_ip, destination_ip, port)
+            if len(self._flow_cache) >= self.MAX_CACHED_FLOWS:
+                self._flow_cache.clear()
+            self._flow_cache[key] = verdict
+        return verdict
+
+    def check_network_access(self, source_ip, destination_ip):
+        """Check if network access is allowed"""
+        if self._matcher is None:
+            self.compile_policy()
+        labels = self._labels(source_ip)
+        return labels is not None and 'trusted' in labels
+
+    def get_vlan_from_ip(self, ip_address):
+        """Determine VLAN from IP address"""
+        if self._matcher is None:
+            self.compile_policy()
+        labels = self._labels(ip_address) or {self._default_vlan}
+        return next(int(label[5:]) for label in labels if label.startswith('vlan_'))
+
+    def process(self, command, context=None):
+        """Process command for network isolation checks"""
+        if not context:
+            return {'allowed': True, 'reason': 'No network context'}
+
+        return self.check_flow(context.get('source_ip', ''), context.get('destination_ip', ''),
+                               context.get('destination_port'))
+
+
+class AuditSegment:
+    """One time window of the audit trail with running event counters"""
+
+    __slots__ = ('start', 'end', 'events', 'counts')
+
+    def __init__(self, start, duration):
+        self.start = start
+        self.end = start + duration
+        self.events = []
+        self.counts = {}  # (event_type, severity) -> count
+
+    def add(self, event):
+        self.events.append(event)
+        key = (event['event_type'], event['severity'])
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+
+class SegmentedAuditStore:
+    """Append-only audit storage split into fixed time segments
+
+    Counters are kept per segment so reports never rescan events, and
+    retention is enforced by dropping whole segments once they age out.
+    """
+
+    def __init__(self, retention_days=90, segment_seconds=3600):
+        self.retention_days = retention_days
+        self.segment_seconds = segment_seconds
+        self.segments = deque()
+        self.event_count = 0
+        self.expired_events = 0
+
+    def append(self, event, now=None):
+        now = time.time() if now is None else now
+        if not self.segments or now >= self.segments[-1].end:
+            start = now - (now % self.segment_seconds)
+            self.segments.append(AuditSegment(start, self.segment_seconds))
+            self.expire(now)
+        self.segments[-1].add(event)
+        self.event_count += 1
+
+    def expire(self, now=None):
+        """Drop segments that fall entirely outside the retention window"""
+        now = time.time() if now is None else now
+        cutoff = now - self.retention_days * 86400
+        while self.segments and self.segments[0].end <= cutoff:
+            segment = self.segments.popleft()
+            self.event_count -= len(segment.events)
+            self.expired_events += len(segment.events)
+
+    def iter_counts(self, since=None):
+        """Yield ((event_type, severity), count) across live segments"""
+        for segment in self.segments:
+            if since is not None and segment.end <= since:
+                continue
+            yield from segment.counts.items()
+
+    def __len__(self):
+        return self.event_count
+
+    def __iter__(self):
+        for segment in self.segments:
+            yield from segment.events
+
 
 class AuditLoggingModule:
     """Comprehensive audit logging for compliance"""
     
-    def __init__(self):
-        self.audit_log = []
-        self.log_retention_days = 90
+    # Substring of the lowercased event type -> compliance tags
+    TAG_RULES = (
+        ('attack', ('ISO27001-A.12.1', 'NIST-DE.AE-1')),
+        ('auth', ('ISO27001-A.9.2', 'NIST-PR.AC-1')),
+        ('anomaly', ('IEC62443-3-3-SR2.11',))
+    )
+
+    def __init__(self, segment_seconds=3600, commit_batch_size=256, commit_interval=5.0):
+        self.audit_log = SegmentedAuditStore(retention_days=90, segment_seconds=segment_seconds)
         self.compliance_standards = ['ISO27001', 'NIST', 'IEC62443']
+        self._tag_cache = {}       # event_type -> tags
+        self._standard_cache = {}  # (standard, event_type) -> bool
+
+        # Tamper evidence: every event extends a hash chain, and the chain
+        # hashes of each batch are committed under one Merkle root
+        self.commit_batch_size = commit_batch_size
+        self.commit_interval = commit_interval
+        self.commitments = []  # one entry per committed batch
+        self._batch_trees = {}  # batch number -> MerkleAccumulator
+        self._pending = MerkleAccumulator()  # chain hashes not yet committed
+        self._pending_started = None
+        self._chain_head = bytes(32)
+        self._next_seq = 0
+        self._next_batch = 0
+        self._lock = threading.Lock()
+
+    @property
+    def log_retention_days(self):
+        return self.audit_log.retention_days
+
+    @log_retention_days.setter
+    def log_retention_days(self, days):
+        self.audit_log.retention_days = days
+        self.audit_log.expire()
         
     def log_event(self, event_type, details, severity='INFO'):
         """Log security event"""
@@ -619,58 +2439,200 @@ class AuditLoggingModule:
             'event_type': event_type,
             'severity': severity,
             'details': details,
-            'compliance_tags': self._get_compliance_tags(event_type)
+            'compliance_tags': list(self._get_compliance_tags(event_type))
         }
         
-        self.audit_log.append(event)
+        with self._lock:
+            event['seq'] = self._next_seq
+            self._next_seq += 1
+            self._chain_head = hashlib.sha256(self._chain_head + self._chain_record(event)).digest()
+            event['chain_hash'] = self._chain_head.hex()
+
+            now = time.time()
+            if not self._pending:
+                self._pending_started = now
+            self._pending.append(self._chain_head)
+            if (len(self._pending) >= self.commit_batch_size or
+                    now - self._pending_started >= self.commit_interval):
+                self._commit_batch(now)
+
+            self.audit_log.append(event, now)
         
         # In production, write to secure log storage
         return event
         
+    @staticmethod
+    def _chain_record(event):
+        """Canonical bytes of the event fields covered by the hash chain"""
+        return json.dumps([event['seq'], event['timestamp'], event['event_type'],
+                           event['severity'], event['details']],
+                          sort_keys=True, default=str).encode()
+
+    def _commit_batch(self, now=None):
+        """Commit the pending chain hashes under a single Merkle root"""
+        if not self._pending:
+            return None
+        tree = self._pending
+        batch = self._next_batch
+        self._next_batch += 1
+        last_seq = self._next_seq - 1
+        commitment = {
+            'batch': batch,
+            'first_seq': last_seq - len(self._pending) + 1,
+            'last_seq': last_seq,
+            'root': tree.root().hex(),
+            'chain_head': self._chain_head.hex(),
+            'timestamp': time.time() if now is None else now
+        }
+        self.commitments.append(commitment)
+        self._batch_trees[batch] = tree
+        self._pending = MerkleAccumulator()
+        self._expire_commitments(commitment['timestamp'])
+        return commitment
+
+    def _expire_commitments(self, now):
+        cutoff = now - self.log_retention_days * 86400
+        expired = 0
+        while expired < len(self.commitments) and self.commitments[expired]['timestamp'] <= cutoff:
+            self._batch_trees.pop(self.commitments[expired]['batch'], None)
+            expired += 1
+        if expired:
+            del self.commitments[:expired]
+
+    def commit(self):
+        """Force a commitment of any pending events (e.g. on shutdown)"""
+        with self._lock:
+            return self._commit_batch()
+
+    def get_inclusion_proof(self, seq):
+        """Return an O(log n) proof that event `seq` is under its batch root"""
+        with self._lock:
+            if self._pending and seq > self._next_seq - 1 - len(self._pending):
+                self._commit_batch()
+            for commitment in reversed(self.commitments):
+                if commitment['first_seq'] <= seq <= commitment['last_seq']:
+                    break
+            else:
+                return None
+            tree = self._batch_trees[commitment['batch']]
+            proof = tree.inclusion_proof(seq - commitment['first_seq'])
+            proof.update(seq=seq, batch=commitment['batch'])
+            return proof
+
+    def _find_commitment(self, batch):
+        """Return the retained commitment for `batch`, or None"""
+        if not self.commitments:
+            return None
+        position = batch - self.commitments[0]['batch']
+        if 0 <= position < len(self.commitments):
+            return self.commitments[position]
+        return None
+
+    def verify_inclusion_proof(self, proof, event=None):
+        """Verify a proof against the root this module committed for its
+        batch, and optionally that it belongs to `event`
+
+        The root carried in the proof is ignored: a proof for a batch that
+        was never committed, or has expired, does not verify.
+        """
+        with self._lock:
+            commitment = self._find_commitment(proof['batch'])
+        if commitment is None:
+            return False
+        if event is not None and (event.get('chain_hash') != proof['leaf'] or
+                                  event.get('seq') != proof['seq']):
+            return False
+        if (proof['size'] != commitment['last_seq'] - commitment['first_seq'] + 1 or
+                proof['index'] != proof['seq'] - commitment['first_seq']):
+            return False
+        return MerkleAccumulator.verify_inclusion(proof, commitment['root'])
+
+    def verify_chain(self):
+        """Recompute the hash chain over retained events and check it
+        against the committed batches
+
+        The oldest retained event anchors the chain, since its predecessor
+        may already have expired. Each committed batch must end on its
+        recorded chain head, and a batch whose events are all retained must
+        rebuild to its recorded root, so rewriting events and re-deriving
+        the chain after them is still detected.
+        """
+        with self._lock:
+            commitments = list(self.commitments)
+        batches = iter(commitments)
+        commitment = next(batches, None)
+        leaves = MerkleAccumulator()
+
+        def invalid(seq, batch=None):
+            return {'valid': False, 'checked': checked, 'first_invalid_seq': seq,
+                    'invalid_batch': batch}
+
+        previous = None
+        checked = 0
+        for event in self.audit_log:
+            if previous is not None:
+                expected = hashlib.sha256(bytes.fromhex(previous['chain_hash']) +
+                                          self._chain_record(event)).hexdigest()
+                if event['seq'] != previous['seq'] + 1 or event['chain_hash'] != expected:
+                    return invalid(event['seq'])
+            previous = event
+            checked += 1
+
+            while commitment is not None and commitment['last_seq'] < event['seq']:
+                commitment = next(batches, None)
+                leaves = MerkleAccumulator()
+            if commitment is None or event['seq'] < commitment['first_seq']:
+                continue
+            leaves.append(bytes.fromhex(event['chain_hash']))
+            if event['seq'] == commitment['last_seq']:
+                if event['chain_hash'] != commitment['chain_head']:
+                    return invalid(event['seq'], commitment['batch'])
+                complete = len(leaves) == event['seq'] - commitment['first_seq'] + 1
+                if complete and leaves.root().hex() != commitment['root']:
+                    return invalid(commitment['first_seq'], commitment['batch'])
+        return {'valid': True, 'checked': checked, 'first_invalid_seq': None, 'invalid_batch': None}
+
     def _get_compliance_tags(self, event_type):
         """Get relevant compliance tags for event"""
-        tags = []
-        
-        if 'attack' in event_type.lower():
-            tags.extend(['ISO27001-A.12.1', 'NIST-DE.AE-1'])
-        if 'auth' in event_type.lower():
-            tags.extend(['ISO27001-A.9.2', 'NIST-PR.AC-1'])
-        if 'anomaly' in event_type.lower():
-            tags.extend(['IEC62443-3-3-SR2.11'])
-            
+        tags = self._tag_cache.get(event_type)
+        if tags is None:
+            lowered = event_type.lower()
+            tags = tuple(tag for keyword, rule_tags in self.TAG_RULES
+                         if keyword in lowered for tag in rule_tags)
+            self._tag_cache[event_type] = tags
         return tags
         
-    def generate_compliance_report(self, standard='ISO27001'):
-        """Generate compliance report"""
-        relevant_events = [
-            event for event in self.audit_log
-            if any(standard in tag for tag in event.get('compliance_tags', []))
-        ]
+    def _matches_standard(self, standard, event_type):
+        key = (standard, event_type)
+        matched = self._standard_cache.get(key)
+        if matched is None:
+            matched = any(standard in tag for tag in self._get_compliance_tags(event_type))
+            self._standard_cache[key] = matched
+        return matched
+
+    def generate_compliance_report(self, standard='ISO27001', days=None):
+        """Generate compliance report from per-segment counters"""
+        self.audit_log.expire()
+        since = time.time() - days * 86400 if days is not None else None
+
+        total = 0
+        severity_breakdown = {'CRITICAL': 0, 'HIGH': 0, 'MEDIUM': 0, 'LOW': 0, 'INFO': 0}
+        event_types = {}
+        for (event_type, severity), count in self.audit_log.iter_counts(since):
+            if not self._matches_standard(standard, event_type):
+                continue
+            total += count
+            severity_breakdown[severity] = severity_breakdown.get(severity, 0) + count
+            event_types[event_type] = event_types.get(event_type, 0) + count
         
         return {
             'standard': standard,
-            'period': f"Last {self.log_retention_days} days",
-            'total_events': len(relevant_events),
-            'severity_breakdown': self._count_by_severity(relevant_events),
-            'event_types': self._count_by_type(relevant_events)
+            'period': f"Last {days if days is not None else self.log_retention_days} days",
+            'total_events': total,
+            'severity_breakdown': severity_breakdown,
+            'event_types': event_types
         }
         
-    def _count_by_severity(self, events):
-        """Count events by severity"""
-        counts = {'CRITICAL': 0, 'HIGH': 0, 'MEDIUM': 0, 'LOW': 0, 'INFO': 0}
-        for event in events:
-            severity = event.get('severity', 'INFO')
-            counts[severity] = counts.get(severity, 0) + 1
-        return counts
-        
-    def _count_by_type(self, events):
-        """Count events by type"""
-        counts = {}
-        for event in events:
-            event_type = event.get('event_type', 'unknown')
-            counts[event_type] = counts.get(event_type, 0) + 1
-        return counts
-        
     def process(self, command, context=None):
         """Process command for audit logging"""
         self.log_event(
@@ -685,7 +2647,8 @@ class AuditLoggingModule:
         return {
             'allowed': True,
             'logged': True,
-            'log_size': len(self.audit_log)
+            'log_size': len(self.audit_log),
+            'commitments': len(self.commitments)
         }
 
 
@@ -799,13 +2762,11 @@ def demonstrate_defense_effectiveness():
     print("Defense System Demonstration")
     print("=" * 60)
     
-    for command, attack_type in test_commands:
-        start_time = time.time()
-        
-        result = defense_system.process_command(command)
-        
-        processing_time = time.time() - start_time
-        
+    start_time = time.time()
+    batch_results = defense_system.process_batch([command for command, _ in test_commands])
+    processing_time = (time.time() - start_time) / len(test_commands)
+
+    for (command, attack_type), result in zip(test_commands, batch_results):
         print(f"\nCommand: {command}")
         print(f"Type: {attack_type}")
         print(f"Allowed: {result['allowed']}")
@@ -819,7 +2780,7 @@ def demonstrate_defense_effectiveness():
             else:
                 results['false_positives'] += 1
                 
-        print(f"Processing time: {processing_time*1000:.2f}ms")
+    print(f"\nProcessing time: {processing_time*1000:.2f}ms per command (batched)")
         
     print("\n" + "=" * 60)
     print("Defense Statistics")
@@ -827,6 +2788,15 @@ def demonstrate_defense_effectiveness():
     print(f"Attacks blocked: {results['attacks_blocked']}")
     print(f"False positives: {results['false_positives']}")
     
+    print("\nPipeline (evaluation order):")
+    for defense_name, stats in defense_system.get_pipeline_report().items():
+        latency = f"mean {stats['mean_ms']:.3f}ms"
+        if stats['p50_ms'] is not None:
+            latency += f", p50 {stats['p50_ms']:.3f}ms, p99 {stats['p99_ms']:.3f}ms"
+        rejected = f"{stats['rejection_rate']:.0%}"
+        print(f"  {stats['order']}. {defense_name}: reject {rejected}, {latency}")
+    results['performance_impact'] = defense_system.get_pipeline_report()
+
     return results
 
 
@@ -332,6 +332,10 @@ class ResearchExperimentFramework:
         stats = self.data_logger.get_statistics()
         report.append(f"```json\n{json.dumps(stats, indent=2)}\n```")
         
+        # Data collection health (dropped rows mean the statistics are sampled)
+        report.append("\n## Data Logging")
+        report.append(f"```json\n{json.dumps(self.data_logger.get_queue_metrics(), indent=2)}\n```")
+        
         # Conclusions
         report.append("\n## Conclusions")
         report.append("Based on the experimental results:")
@@ -7,11 +7,15 @@ Statistical Analysis and Data Collection Module
 
 import json
 import csv
+import io
 import time
 import hashlib
+import tempfile
+import zipfile
 import numpy as np
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import sqlite3
 import threading
 import queue
@@ -422,12 +426,155 @@ class ResearchScenarioManager:
         return command
 
 
+class BoundedLogQueue(queue.Queue):
+    """Fixed-capacity queue with a configurable overload policy
+    
+    Policies when the queue is full:
+    - 'block': producers wait for the writer (no data loss)
+    - 'drop_oldest': the oldest queued entry is discarded
+    - 'sample': only every `sample_rate`-th overflowing entry is kept
+      (replacing the oldest); the rest are counted and discarded
+    
+    A `None` sentinel always blocks and is never discarded, so shutdown is
+    never dropped.
+    """
+    
+    POLICIES = ('block', 'drop_oldest', 'sample')
+    
+    def __init__(self, maxsize=100000, policy='block', sample_rate=10):
+        super().__init__(maxsize)
+        self.enqueued = 0
+        self.dropped = 0
+        self.overflowed = 0
+        self.configure(maxsize, policy, sample_rate)
+        
+    def configure(self, maxsize=None, policy=None, sample_rate=None):
+        """Change capacity or overload policy of a live queue"""
+        if policy is not None and policy not in self.POLICIES:
+            raise ValueError(f"Unknown overload policy '{policy}', expected one of {self.POLICIES}")
+        with self.mutex:
+            if policy is not None:
+                self.policy = policy
+            if sample_rate is not None:
+                self.sample_rate = max(1, int(sample_rate))
+            if maxsize is not None:
+                self.maxsize = max(1, int(maxsize))
+                self.not_full.notify_all()
+                
+    def _drop_oldest(self):
+        """Make room by discarding the oldest entry; False if that is the shutdown sentinel"""
+        with self.mutex:
+            if not self.queue:
+                return True
+            if self.queue[0][1] is None:
+                return False
+            self.queue.popleft()
+            self.unfinished_tasks -= 1
+            if not self.unfinished_tasks:
+                self.all_tasks_done.notify_all()
+            self.dropped += 1
+            return True
+            
+    def put(self, item, block=True, timeout=None):
+        if item is None or self.policy == 'block':
+            super().put(item, block, timeout)
+            return
+        
+        if self.policy == 'sample':
+            try:
+                super().put(item, block=False)
+                return
+            except queue.Full:
+                self.overflowed += 1
+                if self.overflowed % self.sample_rate:
+                    self.dropped += 1
+                    return
+        
+        while True:
+            try:
+                super().put(item, block=False)
+                return
+            except queue.Full:
+                if not self._drop_oldest():
+                    # Writer is shutting down; the new entry has nowhere to go
+                    self.dropped += 1
+                    return
+                    
+    # Entries carry their enqueue time so writer lag can be reported
+    def _put(self, item):
+        self.enqueued += 1
+        self.queue.append((time.monotonic(), item))
+        
+    def _get(self):
+        return self.queue.popleft()[1]
+        
+    def metrics(self):
+        """Queue depth, drop counts and age of the oldest unwritten entry"""
+        with self.mutex:
+            depth = len(self.queue)
+            lag = time.monotonic() - self.queue[0][0] if depth else 0.0
+        return {
+            'policy': self.policy,
+            'capacity': self.maxsize,
+            'depth': depth,
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'writer_lag_seconds': lag
+        }
+
+
+class _ArchiveStream(io.RawIOBase):
+    """Write-only sink that collects archive bytes for a generator to hand out"""
+    
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        
+    def writable(self):
+        return True
+        
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+        
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
 class StatisticalDataLogger:
     """Comprehensive data logging for research analysis"""
     
-    def __init__(self, db_path='attack_research.db'):
+    SCHEMA_VERSION = 1
+    
+    EXPORT_TABLES = ['attack_events', 'network_metrics', 'physical_impacts', 'detection_metrics']
+    EXPORT_FORMATS = ('csv', 'json', 'parquet')
+    
+    # Queue marker asking the logging thread to commit without waiting
+    _FLUSH = object()
+    
+    # Session key holding the aggregates over every session
+    ALL_SESSIONS = '__all__'
+    
+    # Columns summarised per session in session_aggregates (count/total/max)
+    AGGREGATE_COLUMNS = {
+        'attack_events': ['detection_score'],
+        'network_metrics': ['latency_ms', 'packet_loss_rate', 'throughput_bps'],
+        'physical_impacts': ['position_error_x', 'position_error_y', 'position_error_z',
+                             'surface_quality_score', 'material_waste_grams',
+                             'energy_consumption_joules'],
+        'detection_metrics': ['true_positives', 'false_positives', 'true_negatives',
+                              'false_negatives', 'detection_latency_ms']
+    }
+    
+    def __init__(self, db_path='attack_research.db', batch_size=1000, commit_interval=0.5,
+                 max_queue=100000, overload_policy='block', sample_rate=10):
         self.db_path = db_path
-        self.log_queue = queue.Queue()
+        self.batch_size = batch_size  # Rows written per transaction at most
+        self.commit_interval = commit_interval  # Seconds a row may wait before commit
+        self.log_queue = BoundedLogQueue(max_queue, overload_policy, sample_rate)
+        self.rows_written = 0
+        self.rows_rejected = 0
         self.init_database()
         self.start_logging_thread()
         
@@ -436,6 +583,9 @@ class StatisticalDataLogger:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        # WAL lets the logging thread write while sessions/statistics read
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Attack events table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS attack_events (
@@ -511,42 +661,222 @@ class StatisticalDataLogger:
             )
         ''')
         
+        # Running per-session aggregates, maintained by the logging thread
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS session_aggregates (
+                session_id TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                total REAL NOT NULL DEFAULT 0,
+                maximum REAL,
+                PRIMARY KEY (session_id, metric)
+            ) WITHOUT ROWID
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS session_attack_types (
+                session_id TEXT NOT NULL,
+                attack_type TEXT NOT NULL,
+                PRIMARY KEY (session_id, attack_type)
+            ) WITHOUT ROWID
+        ''')
+        
+        for table in self.AGGREGATE_COLUMNS:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_session_time ON {table} (session_id, timestamp)"
+            )
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_time ON {table} (timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (start_time)")
+        
+        # Databases created before the aggregates existed need a one-off backfill
+        if cursor.execute('PRAGMA user_version').fetchone()[0] < self.SCHEMA_VERSION:
+            self._rebuild_aggregates(cursor)
+            cursor.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+        
         conn.commit()
         conn.close()
         
+    def _rebuild_aggregates(self, cursor):
+        """Recompute session_aggregates from the raw tables"""
+        cursor.execute('DELETE FROM session_aggregates')
+        cursor.execute('DELETE FROM session_attack_types')
+        
+        for table, columns in self.AGGREGATE_COLUMNS.items():
+            metrics = [(f"{table}.rows", 'COUNT(*)', '0', 'NULL')] + [
+                (f"{table}.{column}", f'COUNT({column})', f'COALESCE(SUM({column}), 0)', f'MAX({column})')
+                for column in columns
+            ]
+            for metric, count_expr, total_expr, max_expr in metrics:
+                cursor.execute(f'''
+                    INSERT INTO session_aggregates (session_id, metric, count, total, maximum)
+                    SELECT session_id, ?, {count_expr}, {total_expr}, {max_expr}
+                    FROM {table} WHERE session_id IS NOT NULL GROUP BY session_id
+                ''', (metric,))
+                cursor.execute(f'''
+                    INSERT INTO session_aggregates (session_id, metric, count, total, maximum)
+                    SELECT ?, ?, {count_expr}, {total_expr}, {max_expr} FROM {table}
+                ''', (self.ALL_SESSIONS, metric))
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO session_attack_types (session_id, attack_type)
+            SELECT DISTINCT session_id, attack_type FROM attack_events
+            WHERE session_id IS NOT NULL AND attack_type IS NOT NULL
+        ''')
+        cursor.execute('''
+            INSERT OR IGNORE INTO session_attack_types (session_id, attack_type)
+            SELECT DISTINCT ?, attack_type FROM attack_events WHERE attack_type IS NOT NULL
+        ''', (self.ALL_SESSIONS,))
+        
     def start_logging_thread(self):
-        """Start background thread for database writes"""
+        """Start background thread for batched database writes"""
         def logging_worker():
-            while True:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            
+            pending = []
+            last_commit = time.monotonic()
+            running = True
+            
+            while running:
+                force = False
+                # Wait no longer than what is left of the current commit window
+                if pending:
+                    timeout = max(0.0, self.commit_interval - (time.monotonic() - last_commit))
+                else:
+                    timeout = self.commit_interval
                 try:
-                    log_entry = self.log_queue.get(timeout=1)
-                    if log_entry is None:
-                        break
-                        
-                    self._write_to_database(log_entry)
-                    
+                    log_entry = self.log_queue.get(timeout=timeout)
+                    while True:
+                        if log_entry is None:
+                            self.log_queue.task_done()
+                            running = False
+                            break
+                        if log_entry is self._FLUSH:
+                            # flush() is waiting: commit now, not at the window's end
+                            self.log_queue.task_done()
+                            force = True
+                            break
+                        pending.append(log_entry)
+                        if len(pending) >= self.batch_size:
+                            break
+                        log_entry = self.log_queue.get_nowait()
                 except queue.Empty:
+                    pass
+                
+                if not pending:
+                    last_commit = time.monotonic()
                     continue
+                if (running and not force and len(pending) < self.batch_size
+                        and time.monotonic() - last_commit < self.commit_interval):
+                    continue
+                
+                try:
+                    self._write_batch(conn, pending)
                 except Exception as e:
-                    print(f"Logging error: {e}")
+                    print(f"Logging error: {e}; retrying batch row by row")
+                    conn.rollback()
+                    self._write_rows(conn, pending)
+                for _ in pending:
+                    self.log_queue.task_done()
+                pending = []
+                last_commit = time.monotonic()
+            
+            conn.close()
                     
         self.logging_thread = threading.Thread(target=logging_worker, daemon=True)
         self.logging_thread.start()
         
-    def _write_to_database(self, log_entry):
-        """Write log entry to appropriate table"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _write_batch(self, conn, log_entries):
+        """Write queued entries with one executemany per table and a single commit"""
+        groups = {}
+        for log_entry in log_entries:
+            columns = tuple(key for key in log_entry if key != 'table')
+            groups.setdefault((log_entry['table'], columns), []).append(
+                [log_entry[column] for column in columns]
+            )
         
-        table = log_entry.pop('table')
+        for (table, columns), rows in groups.items():
+            placeholders = ', '.join(['?' for _ in columns])
+            query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+            conn.executemany(query, rows)
+        self._update_aggregates(conn, log_entries)
+        conn.commit()
+        self.rows_written += len(log_entries)
         
-        columns = ', '.join(log_entry.keys())
-        placeholders = ', '.join(['?' for _ in log_entry])
-        query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+    def _write_rows(self, conn, log_entries):
+        """Fallback for a failed batch: commit rows one at a time so a single
+        bad row is rejected on its own instead of losing the whole batch"""
+        for log_entry in log_entries:
+            try:
+                self._write_batch(conn, [log_entry])
+            except Exception as e:
+                conn.rollback()
+                self.rows_rejected += 1
+                print(f"Logging error: rejected {log_entry.get('table')} row: {e}")
+                
+    def _update_aggregates(self, conn, log_entries):
+        """Fold a batch into session_aggregates in the same transaction"""
+        deltas = {}
+        attack_types = set()
         
-        cursor.execute(query, list(log_entry.values()))
-        conn.commit()
-        conn.close()
+        for log_entry in log_entries:
+            table = log_entry['table']
+            columns = self.AGGREGATE_COLUMNS.get(table)
+            if columns is None:
+                continue
+            sessions = [self.ALL_SESSIONS]
+            if log_entry.get('session_id') is not None:
+                sessions.append(log_entry['session_id'])
+            
+            values = [(f"{table}.rows", None)]
+            values += [(f"{table}.{column}", log_entry.get(column)) for column in columns]
+            for session in sessions:
+                for metric, value in values:
+                    delta = deltas.setdefault((session, metric), [0, 0.0, None])
+                    if metric.endswith('.rows'):
+                        delta[0] += 1
+                    elif value is not None:
+                        delta[0] += 1
+                        delta[1] += value
+                        if delta[2] is None or value > delta[2]:
+                            delta[2] = value
+                if table == 'attack_events' and log_entry.get('attack_type') is not None:
+                    attack_types.add((session, log_entry['attack_type']))
+        
+        conn.executemany('''
+            INSERT INTO session_aggregates (session_id, metric, count, total, maximum)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (session_id, metric) DO UPDATE SET
+                count = count + excluded.count,
+                total = total + excluded.total,
+                maximum = CASE
+                    WHEN maximum IS NULL OR excluded.maximum > maximum THEN excluded.maximum
+                    ELSE maximum
+                END
+        ''', [(session, metric, *delta) for (session, metric), delta in deltas.items()])
+        conn.executemany(
+            'INSERT OR IGNORE INTO session_attack_types (session_id, attack_type) VALUES (?, ?)',
+            attack_types
+        )
+        
+    def get_queue_metrics(self):
+        """Ingestion queue health for long unattended runs"""
+        metrics = self.log_queue.metrics()
+        metrics['rows_written'] = self.rows_written
+        metrics['rows_rejected'] = self.rows_rejected
+        return metrics
+        
+    def flush(self):
+        """Block until every queued entry has been committed"""
+        if self.logging_thread.is_alive():
+            self.log_queue.put(self._FLUSH)
+        self.log_queue.join()
+        
+    def close(self):
+        """Commit outstanding entries and stop the logging thread"""
+        self.log_queue.put(None)
+        self.logging_thread.join()
         
     def log_attack_event(self, scenario_id, attack_type, original_cmd, modified_cmd,
                         modification_type, impact_metrics, detection_score, session_id):
@@ -639,106 +969,211 @@ class StatisticalDataLogger:
         conn.commit()
         conn.close()
         
-    def export_session_data(self, session_id, output_format='csv'):
-        """Export session data for analysis"""
-        conn = sqlite3.connect(self.db_path)
+    def export_session_data(self, session_id, output_format='csv', chunk_size=10000, filename=None):
+        """Export session data for analysis
         
-        tables = ['attack_events', 'network_metrics', 'physical_impacts', 
-                 'detection_metrics']
+        Writes the session's tables into one zip archive, `filename` or
+        session_<id>_<timestamp>.zip in the working directory, and returns
+        a summary message. Use stream_session_data() to send the archive
+        somewhere other than a local file.
+        """
+        chunks = self.stream_session_data(session_id, output_format, chunk_size)
+        if filename is None:
+            filename = f"session_{session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        with open(filename, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                
+        return f"Exported session {session_id} to {output_format} files in {filename}"
+        
+    def stream_session_data(self, session_id, output_format='csv', chunk_size=10000):
+        """Export session data as a streamed zip archive
+        
+        Each table is read `chunk_size` rows at a time and written to a
+        temporary file by its own worker, so the four tables export in
+        parallel with bounded memory. Returns a generator of archive bytes
+        for the caller to write to a file or an HTTP response, e.g.:
         
+            for chunk in logger.stream_session_data(session_id, 'parquet'):
+                response.write(chunk)
+        """
+        if output_format not in self.EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{output_format}', expected one of {self.EXPORT_FORMATS}")
+        if output_format == 'parquet' and pq is None:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        
+        return self._stream_export(session_id, output_format, chunk_size)
+        
+    def _stream_export(self, session_id, output_format, chunk_size):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # Parquet pages are already compressed; deflate the text formats
+        compress_type = zipfile.ZIP_STORED if output_format == 'parquet' else zipfile.ZIP_DEFLATED
+        stream = _ArchiveStream()
         
-        for table in tables:
-            query = f"SELECT * FROM {table} WHERE session_id = ?"
+        with ThreadPoolExecutor(max_workers=len(self.EXPORT_TABLES)) as pool:
+            futures = {
+                pool.submit(self._export_table, table, session_id, output_format, chunk_size): table
+                for table in self.EXPORT_TABLES
+            }
+            try:
+                with zipfile.ZipFile(stream, 'w') as archive:
+                    for future in as_completed(futures):
+                        table = futures[future]
+                        member = zipfile.ZipInfo(
+                            f"{table}_{session_id}_{timestamp}.{output_format}",
+                            date_time=time.localtime()[:6]
+                        )
+                        member.compress_type = compress_type
+                        
+                        exported = future.result()
+                        exported.seek(0)
+                        with archive.open(member, 'w', force_zip64=True) as dest:
+                            while True:
+                                block = exported.read(1 << 20)
+                                if not block:
+                                    break
+                                dest.write(block)
+                                yield from stream.drain()
+                        exported.close()
+                yield from stream.drain()
+            finally:
+                for future in futures:
+                    if future.done() and future.exception() is None:
+                        future.result().close()
+                        
+    def _export_table(self, table, session_id, output_format, chunk_size):
+        """Write one table's session rows to a temporary file, chunk by chunk"""
+        conn = sqlite3.connect(self.db_path)
+        output = tempfile.TemporaryFile()
+        try:
+            cursor = conn.execute(
+                f"SELECT * FROM {table} WHERE session_id = ? ORDER BY timestamp, id",
+                (session_id,)
+            )
+            columns = [description[0] for description in cursor.description]
             
-            if output_format == 'csv':
-                df = pd.read_sql_query(query, conn, params=(session_id,))
-                filename = f"{table}_{session_id}_{timestamp}.csv"
-                df.to_csv(filename, index=False)
-                
-            elif output_format == 'json':
-                cursor = conn.cursor()
-                cursor.execute(query, (session_id,))
-                columns = [description[0] for description in cursor.description]
-                rows = cursor.fetchall()
+            if output_format == 'parquet':
+                declared = {row[1]: row[2].upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+                schema = pa.schema([(column, self._arrow_type(declared.get(column, ''))) for column in columns])
+                writer = pq.ParquetWriter(output, schema)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+                    writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                writer.close()
                 
-                data = [dict(zip(columns, row)) for row in rows]
-                filename = f"{table}_{session_id}_{timestamp}.json"
+            else:
+                text = io.TextIOWrapper(output, encoding='utf-8', newline='')
+                if output_format == 'csv':
+                    writer = csv.writer(text)
+                    writer.writerow(columns)
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        writer.writerows(rows)
+                else:
+                    # JSON array written element by element
+                    separator = '\n'
+                    text.write('[')
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        for row in rows:
+                            text.write(separator + json.dumps(dict(zip(columns, row)), default=str))
+                            separator = ',\n'
+                    text.write('\n]\n')
+                text.flush()
+                text.detach()
                 
-                with open(filename, 'w') as f:
-                    json.dump(data, f, indent=2, default=str)
-                    
-        conn.close()
+            return output
+        except Exception:
+            output.close()
+            raise
+        finally:
+            conn.close()
+            
+    @staticmethod
+    def _arrow_type(declared_type):
+        """Map an SQLite declared column type to an Arrow type"""
+        if 'INT' in declared_type:
+            return pa.int64()
+        if 'REAL' in declared_type or 'FLOA' in declared_type or 'DOUB' in declared_type:
+            return pa.float64()
+        return pa.string()
         
-        return f"Exported session {session_id} to {output_format} files"
+    def get_statistics(self, session_id=None, flush=True):
+        """Generate statistical summary for research
         
-    def get_statistics(self, session_id=None):
-        """Generate statistical summary for research"""
+        Reads the incrementally maintained session_aggregates, so the cost
+        does not depend on how many rows have been logged. Aggregates are
+        updated when the logging thread commits, so by default this first
+        waits for everything already logged to be committed; flush=False
+        reads whatever has been committed so far without waiting.
+        """
+        if flush:
+            self.flush()
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        where_clause = f"WHERE session_id = '{session_id}'" if session_id else ""
+        key = session_id if session_id else self.ALL_SESSIONS
+        cursor.execute(
+            'SELECT metric, count, total, maximum FROM session_aggregates WHERE session_id = ?',
+            (key,)
+        )
+        aggregates = {metric: (count, total, maximum) for metric, count, total, maximum in cursor.fetchall()}
+        cursor.execute('SELECT COUNT(*) FROM session_attack_types WHERE session_id = ?', (key,))
+        unique_types = cursor.fetchone()[0]
+        conn.close()
+        
+        # Mirror SQL semantics: AVG/SUM/MAX are NULL when no values were logged
+        def avg(metric):
+            count, total, _ = aggregates.get(metric, (0, 0.0, None))
+            return total / count if count else None
+        
+        def total(metric):
+            count, value, _ = aggregates.get(metric, (0, 0.0, None))
+            return value if count else None
+        
+        def maximum(metric):
+            return aggregates.get(metric, (0, 0.0, None))[2]
         
         stats = {}
         
         # Attack event statistics
-        cursor.execute(f'''
-            SELECT 
-                COUNT(*) as total_attacks,
-                COUNT(DISTINCT attack_type) as unique_attack_types,
-                AVG(detection_score) as avg_detection_score
-            FROM attack_events {where_clause}
-        ''')
-        stats['attacks'] = dict(zip(
-            ['total', 'unique_types', 'avg_detection_score'],
-            cursor.fetchone()
-        ))
+        stats['attacks'] = {
+            'total': aggregates.get('attack_events.rows', (0,))[0],
+            'unique_types': unique_types,
+            'avg_detection_score': avg('attack_events.detection_score')
+        }
         
         # Network performance statistics
-        cursor.execute(f'''
-            SELECT 
-                AVG(latency_ms) as avg_latency,
-                MAX(latency_ms) as max_latency,
-                AVG(packet_loss_rate) as avg_loss_rate,
-                AVG(throughput_bps) as avg_throughput
-            FROM network_metrics {where_clause}
-        ''')
-        stats['network'] = dict(zip(
-            ['avg_latency', 'max_latency', 'avg_loss_rate', 'avg_throughput'],
-            cursor.fetchone()
-        ))
+        stats['network'] = {
+            'avg_latency': avg('network_metrics.latency_ms'),
+            'max_latency': maximum('network_metrics.latency_ms'),
+            'avg_loss_rate': avg('network_metrics.packet_loss_rate'),
+            'avg_throughput': avg('network_metrics.throughput_bps')
+        }
         
         # Physical impact statistics
-        cursor.execute(f'''
-            SELECT 
-                AVG(position_error_x) as avg_error_x,
-                AVG(position_error_y) as avg_error_y,
-                AVG(position_error_z) as avg_error_z,
-                AVG(surface_quality_score) as avg_quality,
-                SUM(material_waste_grams) as total_waste,
-                SUM(energy_consumption_joules) as total_energy
-            FROM physical_impacts {where_clause}
-        ''')
-        stats['physical'] = dict(zip(
-            ['avg_error_x', 'avg_error_y', 'avg_error_z', 'avg_quality', 
-             'total_waste', 'total_energy'],
-            cursor.fetchone()
-        ))
+        stats['physical'] = {
+            'avg_error_x': avg('physical_impacts.position_error_x'),
+            'avg_error_y': avg('physical_impacts.position_error_y'),
+            'avg_error_z': avg('physical_impacts.position_error_z'),
+            'avg_quality': avg('physical_impacts.surface_quality_score'),
+            'total_waste': total('physical_impacts.material_waste_grams'),
+            'total_energy': total('physical_impacts.energy_consumption_joules')
+        }
         
         # Detection performance (if data exists)
-        cursor.execute(f'''
-            SELECT 
-                SUM(true_positives) as tp,
-                SUM(false_positives) as fp,
-                SUM(true_negatives) as tn,
-                SUM(false_negatives) as fn,
-                AVG(detection_latency_ms) as avg_latency
-            FROM detection_metrics {where_clause}
-        ''')
-        detection_data = cursor.fetchone()
+        tp = total('detection_metrics.true_positives')
         
-        if detection_data[0]:  # If we have detection data
-            tp, fp, tn, fn = detection_data[:4]
+        if tp:  # If we have detection data
+            fp = total('detection_metrics.false_positives') or 0
+            fn = total('detection_metrics.false_negatives') or 0
             
             precision = tp / (tp + fp) if (tp + fp) > 0 else 0
             recall = tp / (tp + fn) if (tp + fn) > 0 else 0
@@ -748,20 +1183,19 @@ class StatisticalDataLogger:
                 'precision': precision,
                 'recall': recall,
                 'f1_score': f1_score,
-                'avg_latency': detection_data[4]
+                'avg_latency': avg('detection_metrics.detection_latency_ms')
             }
         
-        conn.close()
-        
         return stats
 
 
-# Pandas import for data export (optional)
+# PyArrow import for Parquet export (optional)
 try:
-    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
 except ImportError:
-    pd = None
-    print("Warning: pandas not installed. CSV export will use basic method.")
+    pa = None
+    pq = None
 
 if __name__ == "__main__":
     # Example usage for testing
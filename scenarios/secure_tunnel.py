@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+TLS Tunnel Between G-code Sender and CNC
+Encrypts the controller <-> CNC TCP stream end to end so an ARP-poisoning
+proxy in between only sees TLS, without changing the sender software.
+
+Two endpoints:
+  controller side - listens in plain TCP where the sender used to connect
+                    (like working_proxy.py) and dials the CNC side over TLS
+  cnc side        - terminates TLS next to the machine and dials the CNC
+
+Both sides authenticate: the CNC side requires a client certificate and
+only accepts the pinned controller certificate, so nothing else on the
+network can reach the machine through the tunnel.
+
+The controller side keeps the last TLS session and offers it on the next
+connection, so sender reconnects resume instead of running a full
+handshake. TCP keep-alive is enabled on every leg so dead peers are noticed.
+
+Run as:
+  python3 secure_tunnel.py gencert --cert tunnel_cert.pem --key tunnel_key.pem
+  python3 secure_tunnel.py gencert --cert controller_cert.pem --key controller_key.pem \
+      --common-name cnc-controller
+  python3 secure_tunnel.py cnc --cert tunnel_cert.pem --key tunnel_key.pem \
+      --client-cafile controller_cert.pem
+  python3 secure_tunnel.py controller --tunnel-host 192.168.0.50 --cafile tunnel_cert.pem \
+      --cert controller_cert.pem --key controller_key.pem
+"""
+
+import argparse
+import asyncio
+import socket
+import ssl
+from datetime import datetime, timedelta, timezone
+
+TUNNEL_PORT = 8443
+TUNNEL_HOSTNAME = 'cnc-tunnel'  # name in the tunnel certificate
+CONTROLLER_HOSTNAME = 'cnc-controller'  # name in the controller certificate
+CHUNK_SIZE = 65536
+
+# TCP keep-alive: first probe after 10s idle, then every 5s, give up after 3
+KEEPALIVE_IDLE = 10
+KEEPALIVE_INTERVAL = 5
+KEEPALIVE_COUNT = 3
+
+GRBL_GREETING = b"\r\nGrbl 1.1h ['$' for help]\r\n"
+
+
+def generate_tunnel_certificate(cert_path, key_path, common_name=TUNNEL_HOSTNAME, days=365):
+    """Write a self-signed EC certificate for one side of the tunnel
+
+    Each side pins the other's certificate file as its CA, so no PKI is
+    needed in the lab.
+    """
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+    now = datetime.now(timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(minutes=5))
+        .not_valid_after(now + timedelta(days=days))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName(common_name)]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    with open(key_path, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM,
+                                  serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    with open(cert_path, 'wb') as f:
+        f.write(certificate.public_bytes(serialization.Encoding.PEM))
+
+
+def enable_keepalive(sock):
+    """Turn on TCP keep-alive with short probe timings where the OS allows"""
+    if sock is None:
+        return
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for option, value in (('TCP_KEEPIDLE', KEEPALIVE_IDLE),
+                          ('TCP_KEEPINTVL', KEEPALIVE_INTERVAL),
+                          ('TCP_KEEPCNT', KEEPALIVE_COUNT)):
+        if hasattr(socket, option):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """Client context that offers the last saved session on every handshake
+
+    asyncio has no way to pass a session to a connection, but it builds
+    every TLS connection through wrap_bio, so the session is injected there.
+    """
+
+    session = None
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self.session
+        return super().wrap_bio(incoming, outgoing, server_side=server_side,
+                                server_hostname=server_hostname, session=session)
+
+
+def controller_ssl_context(cafile, certfile, keyfile):
+    """Client context: pins the CNC side's certificate and presents our own"""
+    context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_verify_locations(cafile)
+    context.load_cert_chain(certfile, keyfile)
+    return context
+
+
+def cnc_ssl_context(certfile, keyfile, client_cafile):
+    """Server context: only controllers holding the pinned certificate get in"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(certfile, keyfile)
+    context.verify_mode = ssl.CERT_REQUIRED
+    context.load_verify_locations(client_cafile)
+    return context
+
+
+class TunnelEndpoint:
+    """One end of the tunnel: accept on one side, dial the other, relay bytes
+
+    listen_ssl / target_ssl say which leg is TLS. With a ResumingSSLContext
+    as target_ssl the session from each connection is kept for the next.
+    An optional GRBLProxy instance filters sender -> CNC traffic through its
+    process_gcode, so inline defenses can sit on the plaintext side.
+    """
+
+    def __init__(self, name, listen_host, listen_port, target_host, target_port,
+                 listen_ssl=None, target_ssl=None, server_hostname=None, gcode_proxy=None):
+        self.name = name
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+        self.target_host = target_host
+        self.target_port = target_port
+        self.listen_ssl = listen_ssl
+        self.target_ssl = target_ssl
+        self.server_hostname = server_hostname
+        self.gcode_proxy = gcode_proxy
+        self.server = None
+        self.stats = {
+            'connections': 0,
+            'active': 0,
+            'bytes_up': 0,      # sender -> CNC
+            'bytes_down': 0,    # CNC -> sender
+            'full_handshakes': 0,
+            'resumed_handshakes': 0,
+            'errors': 0
+        }
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.listen_host,
+                                                 self.listen_port, ssl=self.listen_ssl)
+        self.listen_port = self.server.sockets[0].getsockname()[1]
+        print(f"[+] {self.name}: {self.listen_host}:{self.listen_port} "
+              f"({'TLS' if self.listen_ssl else 'TCP'}) -> {self.target_host}:{self.target_port} "
+              f"({'TLS' if self.target_ssl else 'TCP'})")
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    def _save_session(self, ssl_object):
+        # Takes the SSL object rather than the writer: once the peer has torn
+        # the connection down the transport can no longer be asked for it
+        if ssl_object is not None and isinstance(self.target_ssl, ResumingSSLContext):
+            session = ssl_object.session
+            if session is not None and (session.has_ticket or ssl_object.version() != 'TLSv1.3'):
+                self.target_ssl.session = session
+
+    async def handle_connection(self, client_reader, client_writer):
+        peer = client_writer.get_extra_info('peername')
+        enable_keepalive(client_writer.get_extra_info('socket'))
+        self.stats['connections'] += 1
+        self.stats['active'] += 1
+        target_writer = ssl_object = None
+        try:
+            target_reader, target_writer = await asyncio.open_connection(
+                self.target_host, self.target_port, ssl=self.target_ssl,
+                server_hostname=self.server_hostname if self.target_ssl else None)
+            enable_keepalive(target_writer.get_extra_info('socket'))
+
+            ssl_object = target_writer.get_extra_info('ssl_object')
+            if ssl_object is not None:
+                key = 'resumed_handshakes' if ssl_object.session_reused else 'full_handshakes'
+                self.stats[key] += 1
+
+            context = {'source_ip': peer[0] if peer else '0.0.0.0',
+                       'destination_ip': self.target_host,
+                       'destination_port': self.target_port}
+            await asyncio.gather(
+                self._relay_up(client_reader, target_writer, client_writer, context),
+                self._relay_down(target_reader, client_writer, ssl_object))
+        except (OSError, ssl.SSLError, asyncio.IncompleteReadError) as e:
+            self.stats['errors'] += 1
+            print(f"[!] {self.name}: connection error: {e}")
+        finally:
+            if target_writer is not None:
+                self._save_session(ssl_object)
+                target_writer.close()
+            client_writer.close()
+            self.stats['active'] -= 1
+
+    async def _relay_up(self, reader, writer, client_writer, context):
+        """Sender -> CNC, through the G-code filter if one is attached"""
+        try:
+            while True:
+                data = await reader.read(CHUNK_SIZE)
+                if not data:
+                    break
+                if self.gcode_proxy is not None:
+                    data, blocked = self.gcode_proxy.process_gcode(data, context)
+                    for _ in range(blocked):
+                        client_writer.write(b'error:Blocked by defense\r\n')
+                if data:
+                    self.stats['bytes_up'] += len(data)
+                    writer.write(data)
+                    await writer.drain()
+        finally:
+            if writer.can_write_eof():
+                writer.write_eof()
+            else:
+                writer.close()
+
+    async def _relay_down(self, reader, writer, ssl_object):
+        """CNC -> sender"""
+        saved = False
+        try:
+            while True:
+                data = await reader.read(CHUNK_SIZE)
+                if not data:
+                    break
+                if not saved:
+                    # TLS 1.3 tickets arrive after the handshake, so the
+                    # session is worth keeping once the CNC side has spoken
+                    self._save_session(ssl_object)
+                    saved = True
+                self.stats['bytes_down'] += len(data)
+                writer.write(data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def print_stats(self):
+        stats = self.stats
+        print(f"{self.name}: {stats['connections']} connections, "
+              f"{stats['bytes_up']} bytes up / {stats['bytes_down']} bytes down, "
+              f"{stats['full_handshakes']} full / {stats['resumed_handshakes']} resumed TLS handshakes, "
+              f"{stats['errors']} errors")
+
+
+def controller_endpoint(tunnel_host, cafile, certfile, keyfile, tunnel_port=TUNNEL_PORT,
+                        listen_port=8888, listen_host='0.0.0.0', server_hostname=TUNNEL_HOSTNAME,
+                        gcode_proxy=None):
+    """Plain TCP in from the sender, TLS out to the CNC side"""
+    return TunnelEndpoint('controller-side', listen_host, listen_port, tunnel_host, tunnel_port,
+                          target_ssl=controller_ssl_context(cafile, certfile, keyfile),
+                          server_hostname=server_hostname, gcode_proxy=gcode_proxy)
+
+
+def cnc_endpoint(certfile, keyfile, client_cafile, cnc_ip="192.168.0.170", cnc_port=8080,
+                 tunnel_port=TUNNEL_PORT, listen_host='0.0.0.0'):
+    """TLS in from the controller side, plain TCP out to the CNC"""
+    return TunnelEndpoint('cnc-side', listen_host, tunnel_port, cnc_ip, cnc_port,
+                          listen_ssl=cnc_ssl_context(certfile, keyfile, client_cafile))
+
+
+class StandInCNC:
+    """Minimal GRBL stand-in for tunnel tests: greets, answers 'ok' per line
+    and a status report for the '?' realtime command"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.lines_received = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def handle_connection(self, reader, writer):
+        enable_keepalive(writer.get_extra_info('socket'))
+        writer.write(GRBL_GREETING)
+        pending = b''
+        try:
+            while True:
+                data = await reader.read(CHUNK_SIZE)
+                if not data:
+                    break
+                if b'?' in data:
+                    writer.write(b'<Idle|MPos:0.000,0.000,0.000|Bf:15,128|FS:0,0>\r\n')
+                    data = data.replace(b'?', b'')
+                pending += data
+                lines = pending.split(b'\n')
+                pending = lines.pop()
+                count = sum(1 for line in lines if line.strip())
+                self.lines_received += count
+                if count:
+                    writer.write(b'ok\r\n' * count)
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TLS tunnel between G-code sender and CNC')
+    subparsers = parser.add_subparsers(dest='side', required=True)
+
+    gencert = subparsers.add_parser('gencert', help='Create a self-signed tunnel certificate')
+    gencert.add_argument('--cert', default='tunnel_cert.pem')
+    gencert.add_argument('--key', default='tunnel_key.pem')
+    gencert.add_argument('--common-name', default=TUNNEL_HOSTNAME,
+                         help=f'Use {CONTROLLER_HOSTNAME} for the controller certificate')
+
+    cnc = subparsers.add_parser('cnc', help='Run next to the CNC: TLS in, TCP out')
+    cnc.add_argument('--cert', default='tunnel_cert.pem')
+    cnc.add_argument('--key', default='tunnel_key.pem')
+    cnc.add_argument('--client-cafile', default='controller_cert.pem',
+                     help='Pinned controller certificate')
+    cnc.add_argument('--cnc-ip', default='192.168.0.170')
+    cnc.add_argument('--cnc-port', type=int, default=8080)
+    cnc.add_argument('--tunnel-port', type=int, default=TUNNEL_PORT)
+
+    controller = subparsers.add_parser('controller', help='Run next to the sender: TCP in, TLS out')
+    controller.add_argument('--tunnel-host', required=True)
+    controller.add_argument('--tunnel-port', type=int, default=TUNNEL_PORT)
+    controller.add_argument('--cafile', default='tunnel_cert.pem')
+    controller.add_argument('--cert', default='controller_cert.pem')
+    controller.add_argument('--key', default='controller_key.pem')
+    controller.add_argument('--listen-port', type=int, default=8888)
+
+    standin = subparsers.add_parser('standin', help='Run a local GRBL stand-in for testing')
+    standin.add_argument('--port', type=int, default=8080)
+
+    args = parser.parse_args()
+
+    if args.side == 'gencert':
+        generate_tunnel_certificate(args.cert, args.key, args.common_name)
+        print(f"[+] Wrote {args.cert} and {args.key}")
+        print(f"    Copy {args.cert} (not the key) to the other side of the tunnel")
+        return
+
+    if args.side == 'cnc':
+        endpoint = cnc_endpoint(args.cert, args.key, args.client_cafile, args.cnc_ip,
+                                args.cnc_port, args.tunnel_port)
+    elif args.side == 'controller':
+        endpoint = controller_endpoint(args.tunnel_host, args.cafile, args.cert, args.key,
+                                       args.tunnel_port, args.listen_port)
+    else:
+        endpoint = StandInCNC('0.0.0.0', args.port)
+
+    async def run():
+        await endpoint.start()
+        if isinstance(endpoint, StandInCNC):
+            print(f"[+] GRBL stand-in listening on port {endpoint.port}")
+        await endpoint.server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\n[*] Shutting down...")
+        if isinstance(endpoint, TunnelEndpoint):
+            endpoint.print_stats()
+
+if __name__ == "__main__":
+    main()
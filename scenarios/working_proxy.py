@@ -10,10 +10,143 @@ import socket
 import threading
 import time
 import re
+import json
+import queue
+import numpy as np
+from collections import deque
 from datetime import datetime
 
+try:
+    from prevention_modules import DefenseSystem
+except ImportError:
+    try:
+        from scenarios.defense_modules.prevention_modules import DefenseSystem
+    except ImportError:
+        DefenseSystem = None
+
+DEFENSE_MODES = ('off', 'inline', 'shadow')
+
+# Defenses that judge the command stream itself; isolation/auth need
+# lab network and key setup that the proxy does not provide, and integrity
+# flags every repeated line (a second G0 Z5) as a replay
+DEFAULT_DEFENSES = ['rate_limiting', 'anomaly_detection']
+
+def latency_summary(samples):
+    """p50/p99/max of a latency window in milliseconds"""
+    if not samples:
+        return {'p50_ms': None, 'p99_ms': None, 'max_ms': None}
+    values = np.array(samples)
+    return {
+        'p50_ms': float(np.percentile(values, 50)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max())
+    }
+
+class DefenseVerdictLog:
+    """Thread-safe JSONL log of defense verdicts, shared by inline and shadow modes"""
+    
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.f = open(filename, 'a')
+        
+    def write(self, record):
+        line = json.dumps(record, default=str) + '\n'
+        with self.lock:
+            self.f.write(line)
+            self.f.flush()
+            
+    def close(self):
+        with self.lock:
+            self.f.close()
+
+class ShadowDefenseWorker:
+    """Evaluates forwarded commands through DefenseSystem off the critical path
+    
+    The proxy only enqueues; a single worker thread replays the commands in
+    arrival order, so stateful defenses see the same sequence they would
+    inline. Each verdict is logged with the latency the defense would have
+    added had it run inline.
+    """
+    
+    def __init__(self, defense_system, verdict_log, max_queue=10000):
+        self.defense_system = defense_system
+        self.verdict_log = verdict_log
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.evaluated = 0
+        self.would_block = 0
+        self.dropped = 0
+        self.eval_latencies = deque(maxlen=10000)
+        self.queue_latencies = deque(maxlen=10000)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        
+    def submit(self, command, context):
+        try:
+            self.queue.put_nowait((command, context, time.perf_counter()))
+        except queue.Full:
+            # Never stall forwarding; count what shadow mode missed
+            self.dropped += 1
+            
+    def submit_status(self, report, acknowledged):
+        """Queue a GRBL status report in order with the commands around it"""
+        try:
+            self.queue.put_nowait((None, (report, acknowledged), time.perf_counter()))
+        except queue.Full:
+            pass
+            
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            command, context, enqueued = item
+            if command is None:
+                self.defense_system.update_machine_status(*context)
+                continue
+            start = time.perf_counter()
+            try:
+                result = self.defense_system.process_command(command, context)
+            except Exception as e:
+                result = {'allowed': True, 'reason': f'Evaluation error: {e}'}
+            eval_ms = (time.perf_counter() - start) * 1000
+            queue_ms = (start - enqueued) * 1000
+            
+            self.evaluated += 1
+            self.eval_latencies.append(eval_ms)
+            self.queue_latencies.append(queue_ms)
+            if not result['allowed']:
+                self.would_block += 1
+                print(f"[SHADOW] Would block: {command[:60]} ({result.get('blocked_by')}: {result.get('reason')})")
+            
+            self.verdict_log.write({
+                'timestamp': datetime.now().isoformat(),
+                'mode': 'shadow',
+                'command': command,
+                'allowed': result['allowed'],
+                'blocked_by': result.get('blocked_by'),
+                'reason': result.get('reason'),
+                'defense_ms': eval_ms,
+                'queue_ms': queue_ms
+            })
+            
+    def stop(self, timeout=5):
+        """Finish evaluating queued commands, then stop the worker"""
+        self.queue.put(None)
+        self.thread.join(timeout)
+        
+    def summary(self):
+        return {
+            'evaluated': self.evaluated,
+            'would_block': self.would_block,
+            'dropped': self.dropped,
+            'pending': self.queue.qsize(),
+            'defense_latency': latency_summary(self.eval_latencies),
+            'queue_latency': latency_summary(self.queue_latencies)
+        }
+
 class GRBLProxy:
-    def __init__(self):
+    def __init__(self, defense_mode='off', defenses=None, defense_deadline_ms=None):
         self.cnc_ip = "192.168.0.170"
         self.cnc_port = 8080
         self.proxy_port = 8888
@@ -23,10 +156,68 @@ class GRBLProxy:
         self.drift_amount = 0.0
         self.drift_increment = 0.1
         
+        # Defense settings: 'inline' evaluates before forwarding and drops
+        # blocked lines, 'shadow' forwards first and evaluates in a worker
+        if defense_mode not in DEFENSE_MODES:
+            raise ValueError(f"defense_mode must be one of {DEFENSE_MODES}")
+        self.defense_mode = defense_mode
+        self.defenses = defenses or DEFAULT_DEFENSES
+        self.defense_deadline_ms = defense_deadline_ms  # inline latency budget per command
+        self.defense_system = None
+        self.defense_lock = threading.Lock()
+        self.verdict_log = None
+        self.shadow_worker = None
+        self.inline_latencies = deque(maxlen=10000)
+        self.commands_blocked = 0
+        self.acknowledged_lines = 0  # 'ok' responses since the last status report
+        self.status_reports = 0
+        
         # Statistics
         self.commands_seen = 0
         self.commands_modified = 0
         
+    def setup_defenses(self):
+        """Create the defense pipeline and verdict log for the selected mode"""
+        if self.defense_mode == 'off':
+            return
+        if DefenseSystem is None:
+            print("[!] prevention_modules unavailable - running without defenses")
+            self.defense_mode = 'off'
+            return
+        
+        # Shadow mode is off the forwarding path, so only inline gets a budget
+        deadline_ms = self.defense_deadline_ms if self.defense_mode == 'inline' else None
+        self.defense_system = DefenseSystem(deadline_ms=deadline_ms)
+        for defense in self.defenses:
+            self.defense_system.enable_defense(defense)
+        
+        filename = f"defense_verdicts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        self.verdict_log = DefenseVerdictLog(filename)
+        if self.defense_mode == 'shadow':
+            self.shadow_worker = ShadowDefenseWorker(self.defense_system, self.verdict_log)
+        print(f"[+] Defenses ({self.defense_mode}): {', '.join(self.defenses)}")
+        print(f"[+] Verdicts logged to {filename}")
+        
+    def evaluate_inline(self, command, context):
+        """Run the defense pipeline on the forwarding path; returns the verdict"""
+        start = time.perf_counter()
+        with self.defense_lock:
+            result = self.defense_system.process_command(command, context)
+        defense_ms = (time.perf_counter() - start) * 1000
+        self.inline_latencies.append(defense_ms)
+        
+        self.verdict_log.write({
+            'timestamp': datetime.now().isoformat(),
+            'mode': 'inline',
+            'command': command,
+            'allowed': result['allowed'],
+            'blocked_by': result.get('blocked_by'),
+            'reason': result.get('reason'),
+            'defense_ms': defense_ms,
+            'queue_ms': 0.0
+        })
+        return result
+        
     def start(self):
         """Start the proxy server"""
         server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -37,6 +228,7 @@ class GRBLProxy:
         print(f"[+] GRBL Proxy listening on port {self.proxy_port}")
         print(f"[+] Forwarding to {self.cnc_ip}:{self.cnc_port}")
         print(f"[+] Attacks: {'ENABLED' if self.enable_attacks else 'DISABLED'}")
+        self.setup_defenses()
         print("-" * 60)
         print("Configure your G-code sender to:")
         print(f"  IP: 10.211.55.3")
@@ -51,7 +243,7 @@ class GRBLProxy:
                 # Handle each connection
                 handler = threading.Thread(
                     target=self.handle_connection,
-                    args=(client,),
+                    args=(client, addr),
                     daemon=True
                 )
                 handler.start()
@@ -60,11 +252,20 @@ class GRBLProxy:
             print("\n[*] Shutting down...")
         finally:
             server.close()
+            if self.shadow_worker:
+                self.shadow_worker.stop()
+            if self.verdict_log:
+                self.verdict_log.close()
             self.print_stats()
     
-    def handle_connection(self, client):
+    def handle_connection(self, client, addr=None):
         """Handle a client connection"""
         cnc = None
+        context = {
+            'source_ip': addr[0] if addr else '0.0.0.0',
+            'destination_ip': self.cnc_ip,
+            'destination_port': self.cnc_port
+        }
         try:
             # Connect to real CNC
             cnc = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -96,8 +297,15 @@ class GRBLProxy:
                         break
                     
                     # Process G-code
-                    modified_data = self.process_gcode(data)
-                    cnc.send(modified_data)
+                    modified_data, blocked = self.process_gcode(data, context)
+                    if modified_data:
+                        cnc.send(modified_data)
+                    # Answer blocked lines ourselves so streaming senders
+                    # don't wait forever for an 'ok'
+                    for _ in range(blocked):
+                        client.send(b'error:Blocked by defense\r\n')
+                    if not modified_data:
+                        continue  # nothing sent, so no CNC reply to wait for
                     
                 except socket.timeout:
                     pass
@@ -114,6 +322,8 @@ class GRBLProxy:
                             print(f"[<] CNC: {resp_text[:80]}")
                         
                         client.send(response)
+                        if self.defense_system is not None:
+                            self.observe_machine_response(response)
                 except socket.timeout:
                     pass
                 except:
@@ -127,15 +337,44 @@ class GRBLProxy:
             client.close()
             print("[*] Connection closed")
     
-    def process_gcode(self, data):
-        """Process and potentially modify G-code"""
+    def observe_machine_response(self, response):
+        """Count 'ok' acknowledgements and pass status reports to the defenses
+        
+        Reports only arrive while the sender polls with '?', which most
+        senders do several times a second; the rate limiter sizes its limits
+        from the planner/RX headroom (Bf:) and the ok count between reports.
+        """
+        self.acknowledged_lines += response.count(b'ok')
+        if b'<' not in response:
+            return
+        for report in re.findall(rb'<[^<>]*>', response):
+            acknowledged, self.acknowledged_lines = self.acknowledged_lines, 0
+            text = report.decode('ascii', errors='ignore')
+            self.status_reports += 1
+            if self.defense_mode == 'shadow':
+                self.shadow_worker.submit_status(text, acknowledged)
+            else:
+                with self.defense_lock:
+                    self.defense_system.update_machine_status(text, acknowledged)
+        
+    def process_gcode(self, data, context=None):
+        """Process and potentially modify G-code
+        
+        Returns the bytes to forward and the number of lines blocked inline.
+        """
+        blocked = 0
         try:
             text = data.decode('utf-8', errors='ignore')
             
-            # Log the command
-            for line in text.split('\n'):
-                line = line.strip()
-                if line and not line.startswith('$'):
+            # Rebuild the chunk line by line so edits and drops only ever
+            # touch the line they belong to
+            lines = text.split('\n')
+            forwarded = []
+            for index, raw in enumerate(lines):
+                line = raw.strip()
+                # '?', '!' and '~' are realtime commands (status poll, hold,
+                # resume) sent outside the line protocol; they never get an 'ok'
+                if line and not line.startswith('$') and line.strip('?!~'):
                     timestamp = datetime.now().strftime("%H:%M:%S")
                     print(f"[{timestamp}] > {line[:80]}")
                     self.commands_seen += 1
@@ -146,13 +385,28 @@ class GRBLProxy:
                         if modified != line:
                             print(f"[ATTACK] Modified to: {modified}")
                             self.commands_modified += 1
-                            # Replace in data
-                            text = text.replace(line, modified)
+                            raw = raw.replace(line, modified, 1)
+                            line = modified
+                    
+                    if self.defense_mode == 'shadow':
+                        self.shadow_worker.submit(line, context)
+                    elif self.defense_mode == 'inline':
+                        result = self.evaluate_inline(line, context)
+                        if not result['allowed']:
+                            print(f"[DEFENSE] Blocked by {result.get('blocked_by')}: {result.get('reason')}")
+                            self.commands_blocked += 1
+                            blocked += 1
+                            if index == len(lines) - 1 and forwarded:
+                                # Keep the newline that ended the previous line
+                                forwarded.append('')
+                            continue
+                forwarded.append(raw)
+            text = '\n'.join(forwarded)
             
-            return text.encode('utf-8')
+            return text.encode('utf-8'), blocked
             
         except:
-            return data  # Return unchanged if not text
+            return data, blocked  # Return unchanged if not text
     
     def apply_attacks(self, command):
         """Apply attack modifications"""
@@ -192,6 +446,31 @@ class GRBLProxy:
         if self.commands_seen > 0:
             mod_rate = (self.commands_modified / self.commands_seen) * 100
             print(f"Modification rate: {mod_rate:.1f}%")
+        
+        if self.status_reports:
+            limiter = self.defense_system.defense_modules['rate_limiting']
+            print(f"Machine status reports: {self.status_reports} "
+                  f"(rate limit now {limiter.global_rate_limit:.0f} lines/s)")
+        
+        if self.defense_mode == 'inline':
+            latency = latency_summary(self.inline_latencies)
+            print(f"Defense (inline): {self.commands_blocked} blocked, "
+                  f"added latency p50 {latency['p50_ms'] or 0:.3f}ms / p99 {latency['p99_ms'] or 0:.3f}ms")
+            if self.defense_deadline_ms is not None:
+                report = self.defense_system.get_deadline_report()
+                print(f"  Deadline {self.defense_deadline_ms}ms: {report['deadline_misses']} misses, "
+                      f"{report['failed_open']} modules failed open, {report['failed_closed']} failed closed")
+                for name, module in report['modules'].items():
+                    if module['overruns'] or module['skipped']:
+                        print(f"    {name} ({module['policy']}): {module['overruns']} overruns, "
+                              f"{module['skipped']} skipped")
+        elif self.defense_mode == 'shadow':
+            summary = self.shadow_worker.summary()
+            latency = summary['defense_latency']
+            print(f"Defense (shadow): {summary['would_block']} of {summary['evaluated']} would have been blocked, "
+                  f"{summary['dropped']} not evaluated (queue full)")
+            print(f"  Would-have-added latency p50 {latency['p50_ms'] or 0:.3f}ms / "
+                  f"p99 {latency['p99_ms'] or 0:.3f}ms")
 
 def main():
     print("="*60)
@@ -213,6 +492,14 @@ def main():
         print("    - Calibration drift will be applied")
         print("    - Power will be reduced by 50%")
     
+    print("\nDefense mode:")
+    print("1. Off")
+    print("2. Inline (evaluate before forwarding, drop blocked commands)")
+    print("3. Shadow (forward immediately, evaluate and log in background)")
+    
+    defense_choice = input("Select defense mode [1]: ").strip() or "1"
+    proxy.defense_mode = {'2': 'inline', '3': 'shadow'}.get(defense_choice, 'off')
+    
     print("\n[*] Starting proxy...")
     proxy.start()
 
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Channel Security Benchmark - Cost of authenticating and encrypting G-code streams
+
+Measures the authentication schemes in scenarios/prevention_modules.py
+over a synthetic job: per-line HMAC (generate_authenticated_command /
+verify_command) against chunked authentication at several window sizes,
+reporting throughput and how long lines wait in the verifier for their tag,
+per-command AES-CBC (encrypt_command / decrypt_command) against the
+AES-GCM session channel, and the TLS tunnel (scenarios/secure_tunnel.py)
+against plain TCP to a local GRBL stand-in.
+
+Usage:
+    python3 benchmark_channel_security.py auth
+    python3 benchmark_channel_security.py auth --lines 200000 --windows 1 16 256
+    python3 benchmark_channel_security.py encryption --lines 200000
+    python3 benchmark_channel_security.py tunnel --lines 20000 --reconnects 20
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / 'scenarios'))
+
+import numpy as np
+
+from prevention_modules import AuthenticationModule, EncryptionModule
+from secure_tunnel import (CONTROLLER_HOSTNAME, StandInCNC, TunnelEndpoint, cnc_endpoint,
+                           controller_endpoint, generate_tunnel_certificate)
+
+DEFAULT_WINDOWS = [1, 8, 64, 512, 4096]
+
+
+def synthetic_job(lines):
+    """Deterministic toolpath-like G-code lines"""
+    return [f"G1 X{(i * 7) % 300:.3f} Y{(i * 13) % 170:.3f} F{1200 + i % 600}"
+            for i in range(lines)]
+
+
+def bench_per_line(commands):
+    auth = AuthenticationModule(time_window=3600)
+    start = time.perf_counter()
+    signed = [auth.generate_authenticated_command(command) for command in commands]
+    sign_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    accepted = sum(auth.verify_command(message)['allowed'] for message in signed)
+    verify_time = time.perf_counter() - start
+    return {
+        'mode': 'per-line',
+        'sign_time': sign_time,
+        'verify_time': verify_time,
+        'accepted': accepted,
+        'mean_wait_us': 0.0,
+        'max_buffered': 1
+    }
+
+
+def bench_chunked(commands, window_size):
+    auth = AuthenticationModule(time_window=3600)
+    signer = auth.chunk_signer(window_size)
+    verifier = auth.chunk_verifier(window_size)
+
+    # Sender output as it would go on the wire: lines interleaved with tags
+    start = time.perf_counter()
+    wire = []
+    for command in commands:
+        wire.append(command)
+        tag = signer.add(command)
+        if tag:
+            wire.append(tag)
+    tag = signer.flush()
+    if tag:
+        wire.append(tag)
+    sign_time = time.perf_counter() - start
+
+    accepted = 0
+    waits = 0.0
+    pending_since = []
+    start = time.perf_counter()
+    for item in wire:
+        if isinstance(item, str):
+            verifier.feed(item)
+            pending_since.append(time.perf_counter())
+        else:
+            result = verifier.verify(item)
+            released_at = time.perf_counter()
+            if result['allowed']:
+                accepted += len(result['commands'])
+                waits += sum(released_at - t for t in pending_since)
+            pending_since = []
+    verify_time = time.perf_counter() - start
+    return {
+        'mode': f'chunked N={window_size}',
+        'sign_time': sign_time,
+        'verify_time': verify_time,
+        'accepted': accepted,
+        'mean_wait_us': waits / max(accepted, 1) * 1e6,
+        'max_buffered': window_size
+    }
+
+
+def run_auth(args):
+    commands = synthetic_job(args.lines)
+    print(f"Authenticating {len(commands)} lines\n")
+    print(f"{'mode':<18} {'sign l/s':>12} {'verify l/s':>12} {'mean wait':>12} {'held':>6}")
+    results = [bench_per_line(commands)]
+    results += [bench_chunked(commands, window) for window in args.windows]
+    for result in results:
+        if result['accepted'] != len(commands):
+            print(f"[!] {result['mode']}: only {result['accepted']} lines verified")
+        print(f"{result['mode']:<18} "
+              f"{len(commands) / result['sign_time']:>12,.0f} "
+              f"{len(commands) / result['verify_time']:>12,.0f} "
+              f"{result['mean_wait_us']:>10.1f}us "
+              f"{result['max_buffered']:>6}")
+    return results
+
+
+def bench_encryption_per_command(commands):
+    module = EncryptionModule()
+    start = time.perf_counter()
+    encrypted = [module.encrypt_command(command) for command in commands]
+    decrypted = [module.decrypt_command(message) for message in encrypted]
+    elapsed = time.perf_counter() - start
+    ok = sum(result['allowed'] for result in decrypted)
+    wire_bytes = sum(len(m['iv']) + len(m['ciphertext']) for m in encrypted)
+    return {'mode': 'per-command CBC', 'elapsed': elapsed, 'ok': ok, 'wire_bytes': wire_bytes}
+
+
+def bench_encryption_session(commands, streamed):
+    module = EncryptionModule(mode='session')
+    client = module.open_session('client')
+    server = module.open_session('server', client.salt)
+    client.establish(server.salt)
+    start = time.perf_counter()
+    frames = [client.seal(command) for command in commands]
+    if streamed:
+        # Receiver sees one byte stream and reassembles frames itself
+        decrypted = server.feed(b''.join(frames))
+    else:
+        decrypted = [server.open(frame) for frame in frames]
+    elapsed = time.perf_counter() - start
+    ok = sum(result['allowed'] for result in decrypted)
+    wire_bytes = sum(len(frame) for frame in frames)
+    mode = 'session GCM stream' if streamed else 'session GCM frames'
+    return {'mode': mode, 'elapsed': elapsed, 'ok': ok, 'wire_bytes': wire_bytes}
+
+
+def run_encryption(args):
+    commands = synthetic_job(args.lines)
+    payload_mb = sum(len(command) for command in commands) / 1e6
+    print(f"Encrypting and decrypting {len(commands)} lines ({payload_mb:.1f} MB of G-code)\n")
+    print(f"{'mode':<20} {'lines/s':>12} {'MB/s':>8} {'wire/payload':>13}")
+    results = [bench_encryption_per_command(commands),
+               bench_encryption_session(commands, streamed=False),
+               bench_encryption_session(commands, streamed=True)]
+    for result in results:
+        if result['ok'] != len(commands):
+            print(f"[!] {result['mode']}: only {result['ok']} lines decrypted")
+        print(f"{result['mode']:<20} "
+              f"{len(commands) / result['elapsed']:>12,.0f} "
+              f"{payload_mb / result['elapsed']:>8.1f} "
+              f"{result['wire_bytes'] / (payload_mb * 1e6):>12.2f}x")
+    return results
+
+
+async def tunnel_connect(port):
+    """Connect as a sender and wait for the GRBL greeting; returns seconds taken"""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    await reader.readuntil(b']\r\n')
+    return time.perf_counter() - start, reader, writer
+
+
+async def tunnel_round_trips(reader, writer, commands):
+    """Send one line at a time and wait for its 'ok'"""
+    latencies = []
+    for command in commands:
+        start = time.perf_counter()
+        writer.write(command.encode() + b'\n')
+        await reader.readuntil(b'ok\r\n')
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def tunnel_stream(reader, writer, commands, window):
+    """Stream lines with up to `window` unacknowledged; returns seconds taken"""
+    start = time.perf_counter()
+    sent = acked = 0
+    while acked < len(commands):
+        while sent < len(commands) and sent - acked < window:
+            writer.write(commands[sent].encode() + b'\n')
+            sent += 1
+        await writer.drain()
+        data = await reader.read(65536)
+        if not data:
+            break
+        acked += data.count(b'ok')
+    return time.perf_counter() - start
+
+
+async def bench_tunnel_path(name, port, commands, args, endpoint=None):
+    connects = []
+    for _ in range(args.reconnects):
+        elapsed, reader, writer = await tunnel_connect(port)
+        connects.append(elapsed * 1000)
+        writer.close()
+        await writer.wait_closed()
+        await asyncio.sleep(0.01)  # let the endpoint save the session
+
+    _, reader, writer = await tunnel_connect(port)
+    latencies = await tunnel_round_trips(reader, writer, commands[:args.round_trips])
+    elapsed = await tunnel_stream(reader, writer, commands, args.window)
+    writer.close()
+    await writer.wait_closed()
+    await asyncio.sleep(0.05)  # let the relays see EOF and finish their connections
+
+    payload_mb = sum(len(command) + 1 for command in commands) / 1e6
+    result = {
+        'path': name,
+        'first_connect_ms': connects[0],
+        'reconnect_ms': float(np.median(connects[1:])) if len(connects) > 1 else None,
+        'rtt_p50_ms': float(np.percentile(latencies, 50)),
+        'rtt_p99_ms': float(np.percentile(latencies, 99)),
+        'lines_per_sec': len(commands) / elapsed,
+        'mb_per_sec': payload_mb / elapsed
+    }
+    if endpoint is not None:
+        result['full_handshakes'] = endpoint.stats['full_handshakes']
+        result['resumed_handshakes'] = endpoint.stats['resumed_handshakes']
+    return result
+
+
+async def run_tunnel_async(args):
+    commands = synthetic_job(args.lines)
+    cnc = StandInCNC()
+    await cnc.start()
+    results = [await bench_tunnel_path('plain TCP', cnc.port, commands, args)]
+
+    # Same two relay hops without TLS, to separate relay cost from TLS cost
+    relay_cnc = TunnelEndpoint('relay cnc-side', '127.0.0.1', 0, '127.0.0.1', cnc.port)
+    await relay_cnc.start()
+    relay_controller = TunnelEndpoint('relay controller-side', '127.0.0.1', 0,
+                                      '127.0.0.1', relay_cnc.listen_port)
+    await relay_controller.start()
+    results.append(await bench_tunnel_path('TCP relay pair', relay_controller.listen_port,
+                                           commands, args))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = f"{tmp}/tunnel_cert.pem", f"{tmp}/tunnel_key.pem"
+        client_cert, client_key = f"{tmp}/controller_cert.pem", f"{tmp}/controller_key.pem"
+        generate_tunnel_certificate(cert, key)
+        generate_tunnel_certificate(client_cert, client_key, CONTROLLER_HOSTNAME)
+        tls_cnc = cnc_endpoint(cert, key, client_cert, '127.0.0.1', cnc.port, tunnel_port=0,
+                               listen_host='127.0.0.1')
+        await tls_cnc.start()
+        tls_controller = controller_endpoint('127.0.0.1', cert, client_cert, client_key,
+                                             tls_cnc.listen_port, listen_port=0,
+                                             listen_host='127.0.0.1')
+        await tls_controller.start()
+        results.append(await bench_tunnel_path('TLS tunnel', tls_controller.listen_port,
+                                               commands, args, tls_controller))
+        for endpoint in (tls_controller, tls_cnc):
+            await endpoint.close()
+
+    for endpoint in (relay_controller, relay_cnc, cnc):
+        await endpoint.close()
+    return results
+
+
+def run_tunnel(args):
+    print(f"Sender -> stand-in CNC over loopback: {args.reconnects} connects, "
+          f"{args.round_trips} round trips, {args.lines} streamed lines (window {args.window})\n")
+    results = asyncio.run(run_tunnel_async(args))
+    print(f"\n{'path':<16} {'connect':>9} {'reconnect':>10} {'rtt p50':>9} {'rtt p99':>9} "
+          f"{'lines/s':>10} {'MB/s':>7}")
+    for result in results:
+        reconnect = result['reconnect_ms']
+        print(f"{result['path']:<16} {result['first_connect_ms']:>7.2f}ms "
+              f"{reconnect if reconnect is not None else 0:>8.2f}ms "
+              f"{result['rtt_p50_ms']:>7.3f}ms {result['rtt_p99_ms']:>7.3f}ms "
+              f"{result['lines_per_sec']:>10,.0f} {result['mb_per_sec']:>7.2f}")
+        if 'full_handshakes' in result:
+            print(f"{'':<16} TLS handshakes: {result['full_handshakes']} full, "
+                  f"{result['resumed_handshakes']} resumed")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark G-code channel authentication, encryption and tunnelling')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    auth = subparsers.add_parser('auth', help='Per-line HMAC vs chunked authentication')
+    auth.add_argument('--lines', type=int, default=100000, help='Lines in the synthetic job')
+    auth.add_argument('--windows', type=int, nargs='+', default=DEFAULT_WINDOWS,
+                      help='Chunk window sizes to measure')
+
+    encryption = subparsers.add_parser('encryption', help='Per-command CBC vs AES-GCM session')
+    encryption.add_argument('--lines', type=int, default=100000, help='Lines in the synthetic job')
+
+    tunnel = subparsers.add_parser('tunnel', help='TLS tunnel vs plain TCP to a GRBL stand-in')
+    tunnel.add_argument('--lines', type=int, default=20000, help='Lines streamed per path')
+    tunnel.add_argument('--round-trips', type=int, default=1000,
+                        help='Lines sent one at a time for latency')
+    tunnel.add_argument('--reconnects', type=int, default=20, help='Connects timed per path')
+    tunnel.add_argument('--window', type=int, default=16,
+                        help='Unacknowledged lines allowed while streaming')
+
+    args = parser.parse_args()
+    if args.action == 'auth':
+        run_auth(args)
+    elif args.action == 'encryption':
+        run_encryption(args)
+    elif args.action == 'tunnel':
+        run_tunnel(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+"""
+Experiment Catalog - Indexed store over archived experiment files
+
+Walks data/archived_experiments and keeps an SQLite catalog of every run
+(experiment_*, attack_data_* as .json or .ndjson, attack_stats_* and
+experiment_data.json), keyed by session, attack type and timestamp.
+attack_data exports are streamed record by record. Rebuilds are incremental:
+files whose size and mtime are unchanged are skipped without being read,
+and files that were touched but still hash the same are not re-ingested.
+
+Usage:
+    python3 catalog_experiments.py build
+    python3 catalog_experiments.py query --attack drift --max-detection-rate 0.5
+    python3 catalog_experiments.py query --since 2025-09-16 --kind attack_data
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / 'scenarios'))
+
+from attack_simulator_advanced import iter_command_records, read_session_header
+
+DEFAULT_ARCHIVE = REPO_ROOT / 'data' / 'archived_experiments'
+DEFAULT_CATALOG = REPO_ROOT / 'data' / 'experiment_catalog.db'
+
+SCHEMA_VERSION = 1
+
+# Short names accepted on the command line and by find_runs()
+ATTACK_ALIASES = {
+    'drift': 'calibration_drift',
+    'power': 'power_reduction',
+    'injection': 'command_injection',
+    'y_inject': 'y_injection',
+    'home': 'home_override',
+    'swap': 'axis_swap',
+}
+
+# Prefixes used in attack_data comparison labels, e.g. 'DRIFT: +1.50mm|Y_INJECT: Added Y15.0'
+LABEL_ATTACKS = {
+    'DRIFT': 'calibration_drift',
+    'POWER': 'power_reduction',
+    'Y_INJECT': 'y_injection',
+    'INJECT': 'command_injection',
+    'HOME': 'home_override',
+    'SWAP': 'axis_swap',
+}
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS catalog_files (
+        path TEXT PRIMARY KEY,
+        kind TEXT,
+        size INTEGER,
+        mtime_ns INTEGER,
+        sha256 TEXT,
+        session_id TEXT,
+        indexed_at REAL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS runs (
+        source_file TEXT PRIMARY KEY,
+        session_id TEXT,
+        kind TEXT,
+        started_at TEXT,
+        cnc_target TEXT,
+        total_commands INTEGER,
+        modified_commands INTEGER,
+        attacks_detected INTEGER,
+        attacks_blocked INTEGER,
+        modification_rate REAL,
+        detection_rate REAL,
+        avg_latency_ms REAL,
+        defenses TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS run_attacks (
+        attack_type TEXT,
+        source_file TEXT,
+        session_id TEXT,
+        enabled INTEGER,
+        hits INTEGER,
+        PRIMARY KEY (attack_type, source_file)
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS commands (
+        source_file TEXT,
+        seq INTEGER,
+        session_id TEXT,
+        phase TEXT,
+        timestamp TEXT,
+        attack_type TEXT,
+        original_command TEXT,
+        modified_command TEXT,
+        response TEXT,
+        latency_ms REAL,
+        detection_status TEXT,
+        PRIMARY KEY (source_file, seq)
+    ) WITHOUT ROWID''',
+    'CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at)',
+    'CREATE INDEX IF NOT EXISTS idx_runs_session ON runs(session_id)',
+    'CREATE INDEX IF NOT EXISTS idx_runs_detection ON runs(detection_rate)',
+    'CREATE INDEX IF NOT EXISTS idx_commands_session_time ON commands(session_id, timestamp)',
+]
+
+RUN_COLUMNS = ['source_file', 'session_id', 'kind', 'started_at', 'cnc_target',
+               'total_commands', 'modified_commands', 'attacks_detected',
+               'attacks_blocked', 'modification_rate', 'detection_rate',
+               'avg_latency_ms', 'defenses']
+
+COMMAND_COLUMNS = ['source_file', 'seq', 'session_id', 'phase', 'timestamp',
+                   'attack_type', 'original_command', 'modified_command',
+                   'response', 'latency_ms', 'detection_status']
+
+
+def classify(name):
+    """Return the archive file kind for a file name, or None to ignore it"""
+    if name == 'experiment_data.json':
+        return 'summary'
+    for prefix in ('attack_data_', 'attack_stats_', 'attack_commands_', 'experiment_'):
+        if name.startswith(prefix):
+            kind = prefix.rstrip('_')
+            if name.endswith('.json') or (kind == 'attack_data' and name.endswith('.ndjson')):
+                return kind
+            if name.endswith('.csv'):
+                return kind + '_csv'
+    return None
+
+
+def session_timestamp(session_id):
+    """Convert a 'YYYYMMDD_HHMMSS' (or 'YYYYMMDD_HHMM') id to ISO format"""
+    for fmt in ('%Y%m%d_%H%M%S', '%Y%m%d_%H%M'):
+        try:
+            return datetime.strptime(session_id, fmt).isoformat()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def rate(numerator, denominator):
+    if not denominator:
+        return None
+    return numerator / denominator
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def label_attacks(label):
+    """Split a comparison label into catalog attack names"""
+    attacks = []
+    for part in (label or '').split('|'):
+        prefix = part.split(':', 1)[0].strip().upper()
+        if prefix in LABEL_ATTACKS:
+            attacks.append(LABEL_ATTACKS[prefix])
+    return attacks
+
+
+class ExperimentCatalog:
+    """Incremental SQLite catalog over an archived experiments directory"""
+
+    def __init__(self, catalog_path=DEFAULT_CATALOG, archive_dir=DEFAULT_ARCHIVE):
+        self.catalog_path = Path(catalog_path)
+        self.archive_dir = Path(archive_dir)
+        self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.catalog_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # Derived data only - a schema change just means a full rebuild
+            for table in ('catalog_files', 'runs', 'run_attacks', 'commands'):
+                self.conn.execute(f'DROP TABLE IF EXISTS {table}')
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+        self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def build(self):
+        """Bring the catalog up to date with the archive directory.
+
+        Returns counts of added, updated, unchanged and removed files.
+        """
+        summary = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+        known = {row['path']: row for row in self.conn.execute('SELECT * FROM catalog_files')}
+
+        seen = set()
+        for path in sorted(self.archive_dir.iterdir()):
+            kind = classify(path.name)
+            if kind is None or not path.is_file():
+                continue
+            seen.add(path.name)
+            stat = path.stat()
+            previous = known.get(path.name)
+
+            if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+                # A CSV twin is only skipped while its JSON sibling is still there
+                twin_changed = (kind.endswith('_csv') and
+                                (previous['session_id'] is None) != path.with_suffix('.json').exists())
+                if not twin_changed:
+                    summary['unchanged'] += 1
+                    continue
+
+            sha256 = file_sha256(path)
+            if previous and previous['sha256'] == sha256 and not kind.endswith('_csv'):
+                # Touched but not modified: refresh the stat fingerprint only
+                self.conn.execute('UPDATE catalog_files SET size = ?, mtime_ns = ? WHERE path = ?',
+                                  (stat.st_size, stat.st_mtime_ns, path.name))
+                self.conn.commit()
+                summary['unchanged'] += 1
+                continue
+
+            try:
+                self._ingest(path, kind, stat, sha256)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"[!] Skipping {path.name}: {e}")
+                continue
+            summary['updated' if previous else 'added'] += 1
+
+        for name in set(known) - seen:
+            with self.conn:
+                self._delete(name)
+                self.conn.execute('DELETE FROM catalog_files WHERE path = ?', (name,))
+            summary['removed'] += 1
+
+        return summary
+
+    def _delete(self, name):
+        for table in ('runs', 'run_attacks', 'commands'):
+            self.conn.execute(f'DELETE FROM {table} WHERE source_file = ?', (name,))
+
+    def _ingest(self, path, kind, stat, sha256):
+        """Parse one archive file and replace its rows in a single transaction"""
+        if kind.endswith('_csv'):
+            records = self._parse_csv(path, kind)
+        elif kind == 'attack_data':
+            records = self._parse_attack_data(path)
+        else:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            parser = getattr(self, f'_parse_{kind}')
+            records = parser(path.name, data)
+
+        run, attacks, commands = records
+        with self.conn:
+            self._delete(path.name)
+            # Commands go first: streamed parsers finish run/attacks as they go
+            self.conn.executemany(
+                f"INSERT INTO commands ({', '.join(COMMAND_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COMMAND_COLUMNS))})",
+                ([command.get(column) for column in COMMAND_COLUMNS] for command in commands))
+            if run is not None:
+                self.conn.execute(
+                    f"INSERT INTO runs ({', '.join(RUN_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(RUN_COLUMNS))})",
+                    [run.get(column) for column in RUN_COLUMNS])
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO run_attacks VALUES (?, ?, ?, ?, ?)',
+                    [(attack_type, path.name, run['session_id'], int(enabled), hits)
+                     for attack_type, (enabled, hits) in attacks.items()])
+            self.conn.execute(
+                'INSERT OR REPLACE INTO catalog_files VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (path.name, kind, stat.st_size, stat.st_mtime_ns, sha256,
+                 run['session_id'] if run else None, time.time()))
+
+    def _parse_experiment(self, name, data):
+        session_id = data.get('session_id')
+        stats = data.get('statistics', {})
+        config = data.get('config', {})
+        modified = stats.get('modified_commands', 0)
+        run = {
+            'source_file': name,
+            'session_id': session_id,
+            'kind': 'experiment',
+            'started_at': session_timestamp(session_id),
+            'total_commands': stats.get('total_commands', 0),
+            'modified_commands': modified,
+            'attacks_detected': stats.get('attacks_detected', 0),
+            'attacks_blocked': stats.get('attacks_blocked', 0),
+            'modification_rate': rate(modified, stats.get('total_commands', 0)),
+            'detection_rate': rate(stats.get('attacks_detected', 0), modified),
+            'defenses': json.dumps(sorted(
+                defense for defense, settings in config.get('defenses', {}).items()
+                if settings.get('enabled'))),
+        }
+        attacks = {attack: (bool(settings.get('enabled')), modified if settings.get('enabled') else 0)
+                   for attack, settings in config.get('attacks', {}).items()}
+        commands = [self._experiment_command(name, session_id, seq, row)
+                    for seq, row in enumerate(data.get('data', []))]
+        return run, attacks, commands
+
+    def _experiment_command(self, name, session_id, seq, row):
+        return {
+            'source_file': name,
+            'seq': seq,
+            'session_id': session_id,
+            'phase': 'with_attacks',
+            'timestamp': row.get('timestamp'),
+            'attack_type': row.get('attack_type'),
+            'original_command': row.get('original_command'),
+            'modified_command': row.get('modified_command'),
+            'response': row.get('cnc_response'),
+            'detection_status': row.get('detection_status'),
+        }
+
+    def _parse_csv(self, path, kind):
+        """CSV exports are twins of the JSON records; only index orphans"""
+        if path.with_suffix('.json').exists():
+            return None, {}, []
+
+        session_id = path.stem.split('_', 1)[1] if '_' in path.stem else path.stem
+        if kind == 'attack_commands_csv':
+            session_id = path.stem[len('attack_commands_'):]
+        with open(path, 'r', newline='') as f:
+            rows = list(csv.DictReader(f))
+
+        commands = [self._experiment_command(path.name, session_id, seq, row)
+                    for seq, row in enumerate(rows)]
+        modified = sum(1 for row in rows
+                       if row.get('modified_command') and row.get('modified_command') != row.get('original_command'))
+        detected = sum(1 for row in rows if row.get('detection_status') == 'detected')
+        run = {
+            'source_file': path.name,
+            'session_id': session_id,
+            'kind': kind,
+            'started_at': session_timestamp(session_id),
+            'total_commands': len(rows),
+            'modified_commands': modified,
+            'attacks_detected': detected,
+            'modification_rate': rate(modified, len(rows)),
+            'detection_rate': rate(detected, modified),
+        }
+        return run, {}, commands
+
+    def _parse_attack_data(self, path):
+        """Stream an attack_data export (.json or .ndjson) record by record.
+
+        The returned run and attack dicts are completed by the commands
+        generator, so callers must exhaust it before reading them.
+        """
+        header = read_session_header(path)
+        session_id = header.get('session_id')
+        stats = header.get('statistics', {})
+        modified = stats.get('modified_commands', 0)
+        run = {
+            'source_file': path.name,
+            'session_id': session_id,
+            'kind': 'attack_data',
+            'started_at': session_timestamp(session_id),
+            'cnc_target': header.get('cnc_target'),
+            'total_commands': stats.get('total_commands', 0),
+            'modified_commands': modified,
+            'modification_rate': rate(modified, stats.get('total_commands', 0)),
+        }
+        attacks = {}
+
+        def commands():
+            hits = {}
+            latency_total = 0.0
+            latency_count = 0
+            for seq, row in enumerate(iter_command_records(path)):
+                if row['phase'] == 'history':
+                    if row.get('latency_ms') is not None:
+                        latency_total += row['latency_ms']
+                        latency_count += 1
+                else:
+                    for attack in label_attacks(row.get('attack_type')):
+                        hits[attack] = hits.get(attack, 0) + 1
+                yield {
+                    'source_file': path.name,
+                    'seq': seq,
+                    'session_id': session_id,
+                    'phase': row['phase'],
+                    'timestamp': row.get('timestamp'),
+                    'attack_type': row.get('attack_type'),
+                    'original_command': row.get('command'),
+                    'modified_command': row.get('modified_command'),
+                    'response': row.get('firmware_response'),
+                    'latency_ms': row.get('latency_ms'),
+                }
+
+            run['avg_latency_ms'] = latency_total / latency_count if latency_count else None
+            for attack, settings in header.get('attack_parameters', {}).items():
+                attacks[attack] = (bool(settings.get('enabled')), hits.get(attack, 0))
+            for attack, count in hits.items():
+                attacks.setdefault(attack, (True, count))
+
+        return run, attacks, commands()
+
+    def _parse_attack_stats(self, name, data):
+        session_id = data.get('session_id')
+        stats = data.get('statistics', {})
+        modified = stats.get('modified_commands', 0)
+        run = {
+            'source_file': name,
+            'session_id': session_id,
+            'kind': 'attack_stats',
+            'started_at': session_timestamp(session_id),
+            'cnc_target': data.get('cnc_target'),
+            'total_commands': stats.get('total_commands', 0),
+            'modified_commands': modified,
+            'modification_rate': rate(modified, stats.get('total_commands', 0)),
+            'avg_latency_ms': stats.get('avg_latency'),
+        }
+        attacks = {attack: (True, count) for attack, count in stats.get('attack_types', {}).items()}
+        return run, attacks, []
+
+    def _parse_summary(self, name, data):
+        session_id = data.get('experiment_id')
+        attack_mode = data.get('test_results', {}).get('attack_mode', {})
+        run = {
+            'source_file': name,
+            'session_id': session_id,
+            'kind': 'summary',
+            'started_at': session_timestamp(session_id),
+            'total_commands': attack_mode.get('commands_intercepted', 0),
+            'modified_commands': attack_mode.get('commands_modified', 0),
+            'modification_rate': attack_mode.get('modification_rate'),
+        }
+        attacks = {attack: (True, int(bool(result.get('success'))))
+                   for attack, result in attack_mode.get('attacks', {}).items()}
+        return run, attacks, []
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def find_runs(self, attack_type=None, max_detection_rate=None, min_detection_rate=None,
+                  since=None, until=None, kind=None, session_id=None):
+        """Return runs matching every given filter, newest first.
+
+        Runs without detection data (no defenses in the loop, or no modified
+        commands) have a NULL detection rate and never match a rate filter.
+        """
+        clauses = []
+        params = []
+        source = 'runs r'
+        if attack_type:
+            source = 'run_attacks a JOIN runs r ON r.source_file = a.source_file'
+            clauses.append('a.attack_type = ? AND a.enabled = 1')
+            params.append(ATTACK_ALIASES.get(attack_type, attack_type))
+        if max_detection_rate is not None:
+            clauses.append('r.detection_rate < ?')
+            params.append(max_detection_rate)
+        if min_detection_rate is not None:
+            clauses.append('r.detection_rate >= ?')
+            params.append(min_detection_rate)
+        if since:
+            clauses.append('r.started_at >= ?')
+            params.append(since)
+        if until:
+            clauses.append('r.started_at < ?')
+            params.append(until)
+        if kind:
+            clauses.append('r.kind = ?')
+            params.append(kind)
+        if session_id:
+            clauses.append('r.session_id = ?')
+            params.append(session_id)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self.conn.execute(
+            f'SELECT r.* FROM {source} {where} ORDER BY r.started_at DESC', params)
+        return [dict(row) for row in rows]
+
+    def run_attacks(self, source_file):
+        rows = self.conn.execute(
+            'SELECT attack_type, enabled, hits FROM run_attacks WHERE source_file = ?', (source_file,))
+        return [dict(row) for row in rows]
+
+    def session_commands(self, session_id, phase=None):
+        """Return the indexed command rows for a session in time order"""
+        query = 'SELECT * FROM commands WHERE session_id = ?'
+        params = [session_id]
+        if phase:
+            query += ' AND phase = ?'
+            params.append(phase)
+        rows = self.conn.execute(query + ' ORDER BY source_file, seq', params)
+        return [dict(row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query the archived experiment catalog')
+    parser.add_argument('--catalog', default=str(DEFAULT_CATALOG), help='Catalog database path')
+    parser.add_argument('--archive', default=str(DEFAULT_ARCHIVE), help='Archived experiments directory')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+
+    subparsers.add_parser('build', help='Incrementally index new and changed archive files')
+
+    query = subparsers.add_parser('query', help='List runs matching the given filters')
+    query.add_argument('--attack', help=f"Attack type or alias ({', '.join(ATTACK_ALIASES)})")
+    query.add_argument('--max-detection-rate', type=float, help='Detection rate strictly below this value')
+    query.add_argument('--min-detection-rate', type=float, help='Detection rate at or above this value')
+    query.add_argument('--since', help='ISO date/time lower bound (inclusive)')
+    query.add_argument('--until', help='ISO date/time upper bound (exclusive)')
+    query.add_argument('--kind', help='File kind, e.g. experiment, attack_data, attack_stats')
+    query.add_argument('--session', help='Session id')
+    query.add_argument('--no-build', action='store_true', help='Query without refreshing the catalog first')
+    args = parser.parse_args()
+
+    try:
+        catalog = ExperimentCatalog(args.catalog, args.archive)
+    except (OSError, sqlite3.Error) as e:
+        print(f"[!] Error: {e}")
+        sys.exit(1)
+
+    try:
+        if args.action == 'build' or not args.no_build:
+            start = time.perf_counter()
+            summary = catalog.build()
+            elapsed = (time.perf_counter() - start) * 1000
+            if args.action == 'build':
+                print(f"[*] Catalog: {catalog.catalog_path}")
+                print(f"[+] Built in {elapsed:.1f} ms: " +
+                      ', '.join(f"{count} {state}" for state, count in summary.items()))
+                return
+
+        start = time.perf_counter()
+        runs = catalog.find_runs(attack_type=args.attack,
+                                 max_detection_rate=args.max_detection_rate,
+                                 min_detection_rate=args.min_detection_rate,
+                                 since=args.since, until=args.until,
+                                 kind=args.kind, session_id=args.session)
+        elapsed = (time.perf_counter() - start) * 1000
+        for run in runs:
+            detection = 'n/a' if run['detection_rate'] is None else f"{run['detection_rate']:.2f}"
+            print(f"{run['started_at'] or '?':20} {run['kind']:13} {run['session_id']:16} "
+                  f"cmds={run['total_commands']:<4} mod={run['modified_commands']:<4} "
+                  f"detect={detection:5} {run['source_file']}")
+        print(f"[+] {len(runs)} run(s) in {elapsed:.2f} ms")
+    finally:
+        catalog.close()
+
+
+if __name__ == '__main__':
+    main()
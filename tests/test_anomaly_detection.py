@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming statistics in AnomalyDetectionModule
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+from prevention_modules import AnomalyDetectionModule, RunningStats
+
+
+def raster(start, count, y=0):
+    return [f"G1 X{(start + i) * 0.5:.1f} Y{y} F1500" for i in range(count)]
+
+
+def blocked_indices(module, commands):
+    return [i for i, command in enumerate(commands) if not module.process(command)['allowed']]
+
+
+def test_running_stats_matches_numpy_before_horizon():
+    values = np.random.default_rng(0).normal(7, 3, 10)
+    stats = RunningStats(alpha=0.01)
+    for value in values:
+        stats.update(value)
+    assert stats.mean == pytest.approx(values.mean())
+    assert np.sqrt(stats.var) == pytest.approx(values.std())
+
+
+def test_job_resumes_after_blocked_jump():
+    module = AnomalyDetectionModule()
+    job = raster(0, 60) + ['G0 X100 Y50'] + raster(60, 200)
+    assert blocked_indices(module, job) == [60]
+
+
+def test_job_continuing_from_long_move_is_not_locked_out():
+    module = AnomalyDetectionModule()
+    job = raster(0, 60) + ['G0 X100 Y50'] + [f"G1 X{100 + i * 0.5:.1f} Y50 F1500" for i in range(1, 50)]
+    assert blocked_indices(module, job) == [60]
+
+
+def test_jump_after_blocked_command_is_still_flagged():
+    module = AnomalyDetectionModule()
+    job = raster(0, 60) + ['G1 X30 F9999', 'G0 X100 Y50']
+    assert blocked_indices(module, job) == [60, 61]
+
+
+def test_every_axis_is_checked():
+    module = AnomalyDetectionModule()
+    job = [f"G1 Y{i * 0.5:.1f} Z{i * 0.1:.1f} F1500" for i in range(30)] + ['G1 Y15 Z20 F1500']
+    assert blocked_indices(module, job) == [30]
+    anomalies = AnomalyDetectionModule().process('G1 F9999')['anomalies']
+    assert anomalies[0]['type'] == 'feed_rate_anomaly'
+
+
+def test_batch_matches_sequential():
+    job = raster(0, 60) + ['G0 X100 Y50', 'G1 X31 S2000 F1500'] + raster(62, 40)
+    module = AnomalyDetectionModule()
+    sequential = [module.process(command)['allowed'] for command in job]
+    batched = [result['allowed'] for result in AnomalyDetectionModule().process_batch(job)]
+    assert batched == sequential
+
+
+def random_job(seed, count=600):
+    """Raster moves mixed with jumps, odd feeds/powers, bare laser toggles
+    and words missing, so both blocked and accepted runs occur"""
+    rng = np.random.default_rng(seed)
+    job = []
+    x = y = 0.0
+    for _ in range(count):
+        kind = rng.integers(20)
+        if kind == 0:
+            job.append(f"G0 X{rng.uniform(-200, 200):.2f} Y{rng.uniform(-200, 200):.2f}")
+        elif kind == 1:
+            job.append(f"G1 X{x:.2f} F{rng.choice([20, 9000])}")
+        elif kind == 2:
+            job.append('M3 S500' if rng.integers(2) else 'M5')
+        elif kind == 3:
+            job.append(f"G1 Z{rng.uniform(0, 3):.2f} S{rng.choice([500, 5000])}")
+        else:
+            x += rng.normal(0.5, 0.1)
+            y += rng.choice([0.0, 0.5])
+            job.append(f"G1 X{x:.3f} Y{y:.3f} F{rng.normal(1500, 50):.0f}")
+    return job
+
+
+def module_state(module):
+    return (module.get_statistics(), module.position, module.machine_position,
+            module._since_g1, list(module.command_history))
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('window', [8, 64, 512])
+def test_batch_results_and_state_match_sequential(monkeypatch, seed, window):
+    monkeypatch.setattr(AnomalyDetectionModule, 'BATCH_WINDOW', window)
+    job = random_job(seed)
+    sequential = AnomalyDetectionModule()
+    expected = [sequential.process(command) for command in job]
+    batched = AnomalyDetectionModule()
+    # Split unevenly so state also has to carry across calls
+    results = batched.process_batch(job[:137]) + batched.process_batch(job[137:])
+
+    assert sum(not result['allowed'] for result in expected) > 10
+    assert results == expected
+    assert module_state(batched) == module_state(sequential)
+
+
+def test_running_stats_scan_matches_updates():
+    values = np.random.default_rng(3).normal(5, 2, 60).tolist()
+    for kwargs in ({'alpha': 0.05}, {'alpha': 0.05, 'mean': 5, 'std': 2}, {'alpha': 0.6}):
+        stats, reference = RunningStats(**kwargs), RunningStats(**kwargs)
+        z_scores, trajectory = stats.scan(values)
+        for value, z_score in zip(values, z_scores):
+            assert (z_score == reference.z_score(value)) if reference.ready else np.isnan(z_score)
+            reference.update(value)
+        stats.advance(trajectory, len(values))
+        assert stats.summary() == reference.summary()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the streamed attack_data exports and readers
+"""
+
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+from attack_simulator_advanced import (AdvancedGCodeAttackSimulator, AttackDataStream,
+                                       iter_command_records, read_session_header)
+
+
+def recorded_simulator():
+    simulator = AdvancedGCodeAttackSimulator()
+    simulator.session_id = 'test_session'
+    for i in range(5):
+        simulator.command_history.append(f'G1 X{i}', 'ok', 1.5 + i)
+    simulator.stats['total_commands'] = 5
+    simulator.stats['comparison_data'] = {
+        'with_attacks': [{'command': 'G1 X0', 'modified_command': 'G1 X0.5', 'attack_type': 'DRIFT: +0.5mm'}],
+        'without_attacks': [{'command': 'G1 X0', 'modified_command': 'G1 X0', 'attack_type': 'none'}],
+    }
+    return simulator
+
+
+def small_chunks(monkeypatch):
+    # Force values to straddle buffer refills
+    monkeypatch.setattr(AttackDataStream, 'CHUNK_SIZE', 7)
+
+
+def test_stream_decodes_across_chunk_boundaries(monkeypatch):
+    small_chunks(monkeypatch)
+    document = {'a': 12345678901, 'skip': {'s': 'q\\"uote]', 'n': [1, [2, {'x': '}'}]]},
+                'items': [{'v': i, 's': 'x' * i} for i in range(10)], 'tail': 'end'}
+    stream = AttackDataStream(io.StringIO(json.dumps(document)))
+
+    seen = {}
+    for key in stream.keys():
+        if key == 'skip':
+            stream.skip()
+        elif key == 'items':
+            seen[key] = list(stream.items())
+        else:
+            seen[key] = stream.value()
+
+    assert seen == {'a': 12345678901, 'items': document['items'], 'tail': 'end'}
+
+
+def test_stream_rejects_malformed_array():
+    stream = AttackDataStream(io.StringIO('[1, 2 3]'))
+    with pytest.raises(ValueError):
+        list(stream.items())
+
+
+@pytest.mark.parametrize('output_format', ['json', 'ndjson'])
+def test_exports_read_back_the_same_records(tmp_path, monkeypatch, output_format):
+    small_chunks(monkeypatch)
+    monkeypatch.chdir(tmp_path)
+    simulator = recorded_simulator()
+
+    filename = simulator.export_data(output_format)
+
+    records = list(iter_command_records(filename))
+    history = [record for record in records if record['phase'] == 'history']
+    assert [(r['command'], r['latency_ms']) for r in history] == [(f'G1 X{i}', 1.5 + i) for i in range(5)]
+    assert [record['phase'] for record in records[5:]] == ['with_attacks', 'without_attacks']
+    assert [r['phase'] for r in iter_command_records(filename, phases=('without_attacks',))] == \
+        ['without_attacks']
+
+    header = read_session_header(filename)
+    assert header['session_id'] == 'test_session'
+    assert header['statistics']['total_commands'] == 5
+    assert 'comparison_data' not in header['statistics']
+    assert 'command_history' not in header
+
+
+def test_history_is_spooled_not_held(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    simulator = recorded_simulator()
+
+    assert len(simulator.command_history) == 5
+    assert simulator.command_history.last == ('G1 X4', 'ok', 5.5)
+    assert list(simulator.command_history)[0] == ('G1 X0', 'ok', 1.5)
+
+    # Appends after an export or a read still land at the end
+    simulator.export_data('ndjson')
+    simulator.command_history.append('G1 X9', 'ok', 2.0)
+    assert [cmd for cmd, _, _ in simulator.command_history][-2:] == ['G1 X4', 'G1 X9']
+    simulator.command_history.close()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tests for the segmented, tamper-evident audit log
+"""
+
+import hashlib
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+import prevention_modules
+from prevention_modules import AuditLoggingModule, MerkleAccumulator, SegmentedAuditStore
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def full_scan_report(module, standard):
+    """Reference report computed by scanning every retained event"""
+    total = 0
+    severities = {}
+    event_types = {}
+    for event in module.audit_log:
+        if not any(standard in tag for tag in event['compliance_tags']):
+            continue
+        total += 1
+        severities[event['severity']] = severities.get(event['severity'], 0) + 1
+        event_types[event['event_type']] = event_types.get(event['event_type'], 0) + 1
+    return total, severities, event_types
+
+
+def test_segmented_report_matches_full_scan(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prevention_modules.time, 'time', clock)
+    module = AuditLoggingModule(segment_seconds=60)
+    kinds = [('attack_detected', 'HIGH'), ('auth_failure', 'MEDIUM'),
+             ('anomaly_score', 'LOW'), ('command_processed', 'INFO'), ('attack_blocked', 'CRITICAL')]
+    for i in range(200):
+        event_type, severity = kinds[i % len(kinds)]
+        module.log_event(event_type, {'i': i}, severity)
+        clock.now += 7  # spans many segments
+    assert len(module.audit_log.segments) > 10
+
+    for standard in ('ISO27001', 'NIST', 'IEC62443', 'PCI'):
+        report = module.generate_compliance_report(standard)
+        total, severities, event_types = full_scan_report(module, standard)
+        assert report['total_events'] == total
+        assert {k: v for k, v in report['severity_breakdown'].items() if v} == severities
+        assert report['event_types'] == event_types
+
+
+def test_report_window_counts_recent_segments(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prevention_modules.time, 'time', clock)
+    module = AuditLoggingModule(segment_seconds=3600)
+    module.log_event('attack_old', {}, 'HIGH')
+    clock.now += 3 * 86400
+    module.log_event('attack_new', {}, 'HIGH')
+
+    assert module.generate_compliance_report(days=1)['event_types'] == {'attack_new': 1}
+    assert module.generate_compliance_report()['total_events'] == 2
+
+
+def test_retention_drops_whole_expired_segments():
+    store = SegmentedAuditStore(retention_days=1, segment_seconds=3600)
+    start = 86400 * 100
+    for hour in range(30):
+        store.append({'event_type': 'e', 'severity': 'INFO'}, start + hour * 3600)
+
+    # Segments ending more than a day before the newest append are gone
+    assert len(store) == 25
+    assert store.expired_events == 5
+    assert store.segments[0].start == start + 5 * 3600
+    assert sum(count for _, count in store.iter_counts()) == 25
+
+    store.expire(start + 100 * 3600)
+    assert len(store) == 0
+    assert store.expired_events == 30
+
+
+def test_shortening_retention_expires_events_and_commitments(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prevention_modules.time, 'time', clock)
+    module = AuditLoggingModule(commit_batch_size=4)
+    for day in range(10):
+        for i in range(4):
+            module.log_event('attack_detected', {'day': day, 'i': i}, 'HIGH')
+        clock.now += 86400
+
+    module.log_retention_days = 3
+    assert len(module.audit_log) == 12
+    assert module.generate_compliance_report()['total_events'] == 12
+    assert module.verify_chain()['valid']
+
+    module.log_event('attack_detected', {}, 'HIGH')
+    module.commit()
+    assert all(c['timestamp'] > clock.now - 3 * 86400 for c in module.commitments)
+
+
+def logged_module(count=20, batch_size=8):
+    module = AuditLoggingModule(commit_batch_size=batch_size)
+    events = [module.log_event('attack_detected', {'i': i}, 'HIGH') for i in range(count)]
+    module.commit()
+    return module, events
+
+
+def test_inclusion_proof_checks_the_committed_root():
+    module, events = logged_module()
+    for event in events:
+        proof = module.get_inclusion_proof(event['seq'])
+        assert module.verify_inclusion_proof(proof, event)
+
+    # A self-consistent proof over a forged batch carries its own root
+    forged_leaves = [bytes.fromhex(e['chain_hash']) for e in events[:8]]
+    forged_leaves[3] = hashlib.sha256(b'forged').digest()
+    proof = MerkleAccumulator(forged_leaves).inclusion_proof(3)
+    proof.update(seq=3, batch=0)
+    assert MerkleAccumulator.verify_inclusion(proof)
+    assert not module.verify_inclusion_proof(proof)
+
+    proof = module.get_inclusion_proof(5)
+    assert not module.verify_inclusion_proof(dict(proof, batch=99))
+    assert not module.verify_inclusion_proof(proof, events[6])
+    assert not module.verify_inclusion_proof(dict(proof, seq=13, batch=1))
+
+
+def rechain(module, events, start):
+    """Re-derive chain hashes from events[start] on, as a forger would"""
+    head = bytes.fromhex(events[start - 1]['chain_hash']) if start else bytes(32)
+    for event in events[start:]:
+        head = hashlib.sha256(head + module._chain_record(event)).digest()
+        event['chain_hash'] = head.hex()
+
+
+def test_verify_chain_detects_rewritten_and_rechained_events():
+    module, events = logged_module()
+    assert module.verify_chain() == {'valid': True, 'checked': 20, 'first_invalid_seq': None,
+                                     'invalid_batch': None}
+
+    events[10]['details'] = {'i': 'rewritten'}
+    assert module.verify_chain()['first_invalid_seq'] == 10
+
+    # A consistent chain no longer ends on the committed head of batch 1
+    rechain(module, events, 10)
+    result = module.verify_chain()
+    assert not result['valid'] and result['invalid_batch'] == 1
+
+
+def test_verify_chain_checks_roots_of_complete_batches():
+    module, events = logged_module()
+    # Swap two leaves' content but keep the head: only the root can tell
+    commitment = module.commitments[0]
+    events[0]['details'], events[1]['details'] = events[1]['details'], events[0]['details']
+    rechain(module, events, 0)
+    commitment['chain_head'] = events[7]['chain_hash']
+    result = module.verify_chain()
+    assert not result['valid'] and result['invalid_batch'] == 0
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Tests for HMAC command authentication and its bucketed nonce cache
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+import prevention_modules
+from prevention_modules import AuthenticationModule, NonceStore
+
+
+def test_bucket_rollover_keeps_nonces_inside_the_window():
+    store = NonceStore(time_window=10)
+    store.add('a', 95)
+    store.add('b', 100)
+    assert sorted(store.buckets) == [9, 10]
+
+    # 105 - 10 falls in bucket 9, so nothing is dropped yet
+    store.expire(105)
+    assert store.seen('a', 95) and store.seen('b', 100)
+
+    store.expire(110)
+    assert not store.seen('a', 95)
+    assert store.seen('b', 100)
+    assert len(store) == 1
+
+
+def test_seen_only_matches_the_signed_timestamp_bucket():
+    store = NonceStore(time_window=10)
+    store.add('a', 95)
+    assert store.seen('a', 99)
+    assert not store.seen('a', 100)
+
+
+def test_resize_rebuckets_cached_nonces():
+    store = NonceStore(time_window=10)
+    for i, timestamp in enumerate((95, 100, 117)):
+        store.add(f'n{i}', timestamp)
+
+    store.resize(30)
+    assert sorted(store.buckets) == [3]
+    assert all(store.seen(f'n{i}', t) for i, t in enumerate((95, 100, 117)))
+
+    store.resize(4)
+    assert sorted(store.buckets) == [23, 25, 29]
+    assert len(store) == 3
+
+
+def test_replay_rejected_after_window_change(monkeypatch):
+    monkeypatch.setattr(prevention_modules.time, 'time', lambda: 1000.0)
+    auth = AuthenticationModule(time_window=30)
+    signed = auth.generate_authenticated_command('G1 X1')
+    assert auth.verify_command(signed)['allowed']
+
+    auth.time_window = 60
+    result = auth.verify_command(signed)
+    assert not result['allowed']
+    assert result['reason'] == 'Replay attack detected'
+
+
+def test_expired_command_rejected(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(prevention_modules.time, 'time', lambda: clock[0])
+    auth = AuthenticationModule(time_window=30)
+    signed = auth.generate_authenticated_command('G1 X1')
+
+    clock[0] += 31
+    assert auth.verify_command(signed)['reason'] == 'Command expired'
+    assert len(auth.nonce_cache) == 0
+
+
+def sign_stream(auth, commands, window_size):
+    """Sender output as it goes on the wire: lines interleaved with tags"""
+    signer = auth.chunk_signer(window_size)
+    wire = []
+    for command in commands:
+        wire.append(command)
+        tag = signer.add(command)
+        if tag:
+            wire.append(tag)
+    tag = signer.flush()
+    if tag:
+        wire.append(tag)
+    return wire
+
+
+def receive(verifier, wire):
+    released, rejections = [], []
+    for item in wire:
+        result = verifier.feed(item) if isinstance(item, str) else verifier.verify(item)
+        if not result['allowed']:
+            rejections.append(result['reason'])
+        released.extend(result.get('commands', []))
+    return released, rejections
+
+
+def test_chunked_round_trip():
+    auth = AuthenticationModule()
+    commands = [f'G1 X{i}' for i in range(10)]
+    wire = sign_stream(auth, commands, window_size=4)
+    assert sum(not isinstance(item, str) for item in wire) == 3
+    assert receive(auth.chunk_verifier(4), wire) == (commands, [])
+
+
+def test_chunked_tampered_line_drops_its_chunk():
+    auth = AuthenticationModule()
+    wire = sign_stream(auth, [f'G1 X{i}' for i in range(8)], window_size=4)
+    wire[1] = 'G1 X999'
+    released, rejections = receive(auth.chunk_verifier(4), wire)
+    assert rejections[0] == 'Invalid signature'
+    assert 'G1 X999' not in released
+
+
+def test_chunked_reordered_chunks_rejected():
+    auth = AuthenticationModule()
+    wire = sign_stream(auth, [f'G1 X{i}' for i in range(8)], window_size=4)
+    # Send the second chunk (lines and tag) before the first
+    released, rejections = receive(auth.chunk_verifier(4), wire[5:] + wire[:5])
+    assert rejections == ['Chunk out of sequence']
+    assert released == [f'G1 X{i}' for i in range(4)]
+
+
+def test_chunked_reordered_lines_rejected():
+    auth = AuthenticationModule()
+    wire = sign_stream(auth, [f'G1 X{i}' for i in range(4)], window_size=4)
+    wire[0], wire[1] = wire[1], wire[0]
+    assert receive(auth.chunk_verifier(4), wire) == ([], ['Invalid signature'])
+
+
+def test_chunked_stream_replay_rejected():
+    auth = AuthenticationModule()
+    wire = sign_stream(auth, [f'G1 X{i}' for i in range(4)], window_size=4)
+    assert receive(auth.chunk_verifier(4), wire)[1] == []
+    assert receive(auth.chunk_verifier(4), wire) == ([], ['Replay attack detected'])
+
+
+def test_chunk_window_overflow_rejects_the_pending_chunk():
+    auth = AuthenticationModule()
+    verifier = auth.chunk_verifier(4)
+    for i in range(4):
+        assert verifier.feed(f'G1 X{i}')['allowed']
+
+    result = verifier.feed('G1 X4')
+    assert not result['allowed']
+    assert result['dropped'] == 5
+    assert verifier.buffer == []
+
+    # A sender that skipped the tag cannot get the overflowing chunk through
+    wire = sign_stream(auth, [f'G1 X{i}' for i in range(5)], window_size=5)
+    assert verifier.verify(wire[-1])['reason'] == 'Chunk line count mismatch'
+
+
+def test_chunked_partial_final_window():
+    auth = AuthenticationModule()
+    commands = [f'G1 X{i}' for i in range(6)]
+    wire = sign_stream(auth, commands, window_size=4)
+    assert wire[-1]['count'] == 2
+    assert receive(auth.chunk_verifier(4), wire) == (commands, [])
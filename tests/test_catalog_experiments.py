@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental experiment catalog
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from catalog_experiments import ExperimentCatalog
+
+
+def write_experiment(archive, session_id, detected, drift=True):
+    data = {
+        'session_id': session_id,
+        'statistics': {'total_commands': 10, 'modified_commands': 4, 'attacks_detected': detected},
+        'config': {
+            'attacks': {'calibration_drift': {'enabled': drift}, 'power_reduction': {'enabled': not drift}},
+            'defenses': {'anomaly_detection': {'enabled': True}},
+        },
+        'data': [{'timestamp': f'2025-09-16T10:00:0{i}', 'original_command': f'G1 X{i}',
+                  'modified_command': f'G1 X{i}.5', 'attack_type': 'drift'} for i in range(3)],
+    }
+    path = archive / f'experiment_{session_id}.json'
+    path.write_text(json.dumps(data))
+    return path
+
+
+def open_catalog(tmp_path):
+    return ExperimentCatalog(tmp_path / 'catalog.db', tmp_path / 'archive')
+
+
+def test_build_indexes_runs_and_commands(tmp_path):
+    archive = tmp_path / 'archive'
+    archive.mkdir()
+    write_experiment(archive, '20250916_100000', detected=1)
+    write_experiment(archive, '20250917_100000', detected=4, drift=False)
+    (archive / 'notes.txt').write_text('ignored')
+
+    catalog = open_catalog(tmp_path)
+    assert catalog.build() == {'added': 2, 'updated': 0, 'unchanged': 0, 'removed': 0}
+
+    runs = catalog.find_runs(attack_type='drift', max_detection_rate=0.5)
+    assert [run['session_id'] for run in runs] == ['20250916_100000']
+    assert runs[0]['detection_rate'] == 0.25
+    assert [run['session_id'] for run in catalog.find_runs(since='2025-09-17')] == ['20250917_100000']
+    commands = catalog.session_commands('20250916_100000')
+    assert [command['original_command'] for command in commands] == ['G1 X0', 'G1 X1', 'G1 X2']
+    catalog.close()
+
+
+def test_rebuild_only_touches_changed_files(tmp_path):
+    archive = tmp_path / 'archive'
+    archive.mkdir()
+    kept = write_experiment(archive, '20250916_100000', detected=1)
+    changed = write_experiment(archive, '20250917_100000', detected=1)
+    removed = write_experiment(archive, '20250918_100000', detected=1)
+
+    catalog = open_catalog(tmp_path)
+    catalog.build()
+    assert catalog.build() == {'added': 0, 'updated': 0, 'unchanged': 3, 'removed': 0}
+
+    # Same bytes with a new mtime is not re-ingested
+    stat = kept.stat()
+    os.utime(kept, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    stat = changed.stat()
+    write_experiment(archive, '20250917_100000', detected=3)
+    os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    removed.unlink()
+
+    assert catalog.build() == {'added': 0, 'updated': 1, 'unchanged': 1, 'removed': 1}
+    assert catalog.find_runs(session_id='20250917_100000')[0]['attacks_detected'] == 3
+    assert catalog.find_runs(session_id='20250918_100000') == []
+    assert catalog.session_commands('20250918_100000') == []
+    catalog.close()
+
+    # A fresh connection sees the committed catalog and has nothing to do
+    catalog = open_catalog(tmp_path)
+    assert catalog.build() == {'added': 0, 'updated': 0, 'unchanged': 2, 'removed': 0}
+    catalog.close()
+
+
+def test_csv_twin_is_indexed_only_without_its_json(tmp_path):
+    archive = tmp_path / 'archive'
+    archive.mkdir()
+    twin = write_experiment(archive, '20250916_100000', detected=1)
+    csv_path = archive / 'experiment_20250916_100000.csv'
+    csv_path.write_text('timestamp,original_command,modified_command,detection_status\n'
+                        '2025-09-16T10:00:00,G1 X0,G1 X0.5,detected\n')
+
+    catalog = open_catalog(tmp_path)
+    catalog.build()
+    assert len(catalog.find_runs(session_id='20250916_100000')) == 1
+
+    twin.unlink()
+    summary = catalog.build()
+    assert summary['removed'] == 1 and summary['updated'] == 1
+    runs = catalog.find_runs(session_id='20250916_100000')
+    assert [run['kind'] for run in runs] == ['experiment_csv']
+    assert runs[0]['detection_rate'] == 1.0
+    catalog.close()
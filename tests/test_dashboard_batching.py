@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for Socket.IO event batching in the enhanced dashboard
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'analysis'))
+
+dashboard_enhanced = pytest.importorskip('dashboard_enhanced')
+
+
+class FakeSocketIO:
+    """Records room changes and emits instead of talking to clients"""
+
+    def __init__(self):
+        self.server = self
+        self.left = []
+        self.emitted = []
+
+    def leave_room(self, sid, room, namespace=None):
+        self.left.append(sid)
+
+    def enter_room(self, sid, room, namespace=None):
+        pass
+
+    def emit(self, event, data=None, to=None):
+        self.emitted.append((event, to))
+
+    def start_background_task(self, target):
+        return object()
+
+
+def make_batcher():
+    socketio = FakeSocketIO()
+    config = {'max_pending': 100, 'frame_rate': 10, 'max_frames_in_flight': 3}
+    return socketio, dashboard_enhanced.EventBatcher(socketio, config, lambda: {})
+
+
+def test_client_without_acks_is_never_paused():
+    socketio, batcher = make_batcher()
+    batcher.register('legacy')
+    for i in range(10):
+        batcher.queue('command_executed', {'id': i})
+        batcher.flush()
+    assert socketio.left == []
+    assert batcher.metrics()['paused_clients'] == 0
+
+
+def test_acking_client_is_paused_and_resumed_with_summary():
+    socketio, batcher = make_batcher()
+    batcher.register('client')
+    batcher.ack('client', 0)
+    for i in range(10):
+        batcher.queue('command_executed', {'id': i})
+        batcher.flush()
+    assert socketio.left == ['client']
+
+    batcher.ack('client', batcher.frame)
+    assert socketio.emitted[-1] == ('event_summary', 'client')
+    assert batcher.metrics()['paused_clients'] == 0
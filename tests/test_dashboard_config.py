@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for dashboard configuration endpoints and the command log writer
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'analysis'))
+
+dashboard_enhanced = pytest.importorskip('dashboard_enhanced')
+
+
+@pytest.fixture
+def client():
+    saved = dict(dashboard_enhanced.dashboard_data.log_config)
+    yield dashboard_enhanced.app.test_client()
+    dashboard_enhanced.dashboard_data.log_config.update(saved)
+    dashboard_enhanced.command_log_writer.configure()
+
+
+@pytest.mark.parametrize('payload', [
+    {'max_queue': 'lots'},
+    {'max_queue': [1]},
+    {'fsync_interval': 'nan'},
+    {'max_batch': 2.5},
+    {'fsync': 'sometimes'},
+    {'no_such_setting': 1},
+])
+def test_log_config_rejects_bad_input_with_400(client, payload):
+    before = dict(dashboard_enhanced.dashboard_data.log_config)
+    response = client.post('/api/log_config', json=payload)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert dashboard_enhanced.dashboard_data.log_config == before
+
+
+def test_log_config_rejects_non_object(client):
+    response = client.post('/api/log_config', data='[1, 2]', content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_log_config_applies_valid_update(client):
+    response = client.post('/api/log_config', json={'max_queue': '500', 'sample_rate': 0})
+    assert response.status_code == 200
+    config = response.get_json()['config']
+    assert config['max_queue'] == 500
+    assert config['sample_rate'] == 1
+    assert dashboard_enhanced.command_log_writer.queue.maxsize == 500
+
+
+def test_boolean_settings_parse_strings_explicitly():
+    parse = dashboard_enhanced.parse_config_value
+    assert parse('flag', True, 'false') is False
+    assert parse('flag', False, 'True') is True
+    with pytest.raises(ValueError):
+        parse('flag', False, 'maybe')
+
+
+def test_writer_serialises_json_records(tmp_path):
+    config = dict(dashboard_enhanced.dashboard_data.log_config, fsync='none')
+    writer = dashboard_enhanced.GroupCommitLogWriter(config, str(tmp_path))
+    writer.write_json('records', '.jsonl', {'id': 1, 'original': 'G1 X1'})
+    writer.write('records', '.log', 'plain line\n')
+    writer.close()
+
+    (jsonl,) = tmp_path.glob('records_*.jsonl')
+    (log,) = tmp_path.glob('records_*.log')
+    assert json.loads(jsonl.read_text()) == {'id': 1, 'original': 'G1 X1'}
+    assert log.read_text() == 'plain line\n'
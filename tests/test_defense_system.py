@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Tests for the defense pipeline scheduler
+"""
+
+import itertools
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+import prevention_modules
+from prevention_modules import DefenseSystem
+
+
+def jittery_clock(seed):
+    """perf_counter stand-in whose step sizes vary from run to run"""
+    rng = random.Random(seed)
+    now = itertools.accumulate(rng.uniform(1e-6, 1e-2) for _ in itertools.count())
+    return lambda: next(now)
+
+
+def replay_workload(system, count=200):
+    pipelines = []
+    for i in range(count):
+        system.process_command(f'G1 X{i % 5}')
+        pipelines.append(tuple(system.pipeline))
+    return pipelines
+
+
+def make_system():
+    system = DefenseSystem(reorder_interval=10, min_samples=5)
+    for defense in ('audit', 'isolation', 'integrity'):
+        system.enable_defense(defense)
+    return system
+
+
+def test_order_uses_static_cost_and_rejection_rate():
+    system = make_system()
+    assert system.pipeline == ['isolation', 'integrity', 'audit']
+
+    replay_workload(system, 20)
+
+    # integrity rejects replays; the others never reject and keep hint order
+    assert system.pipeline == ['integrity', 'isolation', 'audit']
+
+
+def test_order_does_not_depend_on_timings(monkeypatch):
+    runs = []
+    for seed in (1, 2):
+        monkeypatch.setattr(prevention_modules.time, 'perf_counter', jittery_clock(seed))
+        runs.append(replay_workload(make_system()))
+    assert runs[0] == runs[1]
+
+
+def test_ties_break_on_module_name():
+    system = DefenseSystem()
+    system.COST_HINTS = {}
+    for defense in ('rollback', 'audit', 'encryption'):
+        system.enable_defense(defense)
+    assert system.pipeline == ['audit', 'encryption', 'rollback']
+
+
+def mixed_job(count=1500):
+    rng = random.Random(7)
+    job = []
+    x = 0.0
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.03:
+            job.append(f"G0 X{rng.uniform(-300, 300):.2f} Y{rng.uniform(-300, 300):.2f}")
+        elif roll < 0.06 and job:
+            job.append(rng.choice(job))  # replay
+        elif roll < 0.08:
+            job.append(f"G1 X{x:.3f} F{rng.choice([20, 9000])}")
+        else:
+            x += rng.gauss(0.5, 0.05)
+            job.append(f"G1 X{x:.3f} Y{i % 7 * 0.5:.1f} F1500")
+    return job
+
+
+def batch_system():
+    system = DefenseSystem(reorder_interval=50, min_samples=5)
+    for defense in ('integrity', 'anomaly_detection', 'isolation'):
+        system.enable_defense(defense)
+    return system
+
+
+def test_batch_verdicts_match_sequential():
+    job = mixed_job()
+    sequential = batch_system()
+    expected = [sequential.process_command(command) for command in job]
+    batched = batch_system()
+    verdicts = batched.process_batch(job[:700]) + batched.process_batch(job[700:])
+
+    assert sum(not verdict['allowed'] for verdict in expected) > 50
+    assert verdicts == expected
+    assert batched.pipeline == sequential.pipeline
+    for name in batched.pipeline:
+        for key in ('calls', 'rejections'):
+            assert batched.defense_stats[name][key] == sequential.defense_stats[name][key]
+
+    summary = batch_system().process_batch(job, details=False)
+    assert [(v['allowed'], v['blocked_by']) for v in summary] == \
+        [(v['allowed'], v.get('blocked_by')) for v in expected]
+
+
+def test_batch_records_latencies_for_deadline_estimates():
+    system = batch_system()
+    system.process_batch(mixed_job())
+
+    report = system.get_pipeline_report()
+    for name in ('integrity', 'anomaly_detection'):
+        assert report[name]['p50_ms'] is not None and report[name]['p99_ms'] is not None
+        assert system.defense_stats[name]['p99_estimate'] > 0
+
+
+class SlowModule:
+    """Stand-in defense that takes `cost` seconds of the fake clock"""
+
+    def __init__(self, clock, cost):
+        self.clock = clock
+        self.cost = cost
+
+    def process(self, command, context=None):
+        self.clock.now += self.cost
+        return {'allowed': True}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def deadline_system(monkeypatch, policy):
+    clock = FakeClock()
+    monkeypatch.setattr(prevention_modules.time, 'perf_counter', clock)
+    system = DefenseSystem(deadline_ms=10, min_samples=3, reorder_interval=5)
+    system.defense_modules['audit'] = SlowModule(clock, 0.002)
+    system.defense_modules['rollback'] = SlowModule(clock, 0.050)
+    system.enable_defense('audit')
+    system.enable_defense('rollback')
+    assert system.set_failure_policy('rollback', policy)
+    return system
+
+
+def test_deadline_fail_open_skips_slow_module(monkeypatch):
+    system = deadline_system(monkeypatch, 'open')
+
+    # Until the pipeline is re-estimated the slow module runs and overruns,
+    # leaving no budget for the module after it
+    verdicts = [system.process_command('G1 X1') for _ in range(4)]
+    assert all(verdict['allowed'] for verdict in verdicts)
+    assert verdicts[0]['defense_results']['audit']['skipped']
+    assert system.defense_stats['rollback']['overruns'] == 4
+
+    # Then it is skipped up front and the cheap module fits again
+    verdict = system.process_command('G1 X2')
+    assert verdict['allowed']
+    assert verdict['defense_results']['rollback']['skipped']
+    assert 'skipped' not in verdict['defense_results']['audit']
+    report = system.get_deadline_report()
+    assert report['failed_open'] == 5 and report['failed_closed'] == 0
+    assert report['deadline_misses'] == 5
+    assert report['modules']['rollback']['skipped'] == 1
+    assert report['modules']['audit']['overruns'] == 0
+    assert report['modules']['rollback']['p99_estimate_ms'] < 50  # decays toward a re-probe
+
+
+def test_deadline_fail_closed_blocks_command(monkeypatch):
+    system = deadline_system(monkeypatch, 'closed')
+    for _ in range(4):
+        system.process_command('G1 X1')
+
+    verdict = system.process_command('G1 X2')
+    assert not verdict['allowed']
+    assert verdict['blocked_by'] == 'rollback' and verdict['deadline_exceeded']
+    assert system.get_deadline_report()['failed_closed'] == 1
+
+    # A generous per-call budget lets the module run again
+    assert system.process_command('G1 X3', deadline_ms=1000)['allowed']
+    assert system.defense_stats['rollback']['skipped'] == 1
+
+
+def test_failure_policy_validation():
+    system = DefenseSystem()
+    assert not system.set_failure_policy('rollback', 'maybe')
+    assert not system.set_failure_policy('missing', 'open')
+    assert system.failure_policies['integrity'] == 'closed'
+    assert system.failure_policies['anomaly_detection'] == 'open'
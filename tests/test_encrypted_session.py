@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests for the AES-GCM session channel
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+from prevention_modules import EncryptedSession, EncryptionModule
+
+
+def open_pair(module):
+    client = module.open_session('client')
+    server = module.open_session('server', client.salt)
+    client.establish(server.salt)
+    return client, server
+
+
+def test_stream_round_trip():
+    client, server = open_pair(EncryptionModule(mode='session'))
+    stream = b''.join(client.seal(f'G1 X{i}') for i in range(10))
+    results = server.feed(stream[:7]) + server.feed(stream[7:])
+    assert [result['command'] for result in results] == [f'G1 X{i}' for i in range(10)]
+
+
+def test_oversized_length_prefix_closes_session():
+    client, server = open_pair(EncryptionModule(mode='session'))
+    header = EncryptedSession.HEADER.pack(EncryptedSession.MAX_FRAME_SIZE + 1, 0)
+    results = server.feed(header + b'x' * 100)
+    assert results[0]['reason'] == 'Frame length exceeds limit'
+    assert len(server._buffer) == 0
+    assert not server.feed(client.seal('G1 X1'))[0]['allowed']
+
+
+def test_replayed_client_salt_gives_new_keys():
+    module = EncryptionModule(mode='session')
+    client, server = open_pair(module)
+    frame = client.seal('G1 X1')
+
+    # A second server session fed the same client salt still uses its own salt
+    replayed = module.open_session('server', client.salt)
+    assert replayed.salt != server.salt
+    assert replayed.open(frame)['reason'] == 'Frame authentication failed'
+    assert server.open(frame)['allowed']
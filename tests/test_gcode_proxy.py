@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for inline defense blocking in the G-code proxy
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+from working_proxy import GRBLProxy
+
+
+def make_proxy(blocked_commands):
+    proxy = GRBLProxy(defense_mode='inline')
+    proxy.evaluate_inline = lambda command, context: {
+        'allowed': command not in blocked_commands,
+        'blocked_by': 'test',
+        'reason': 'blocked for test'
+    }
+    return proxy
+
+
+def test_blocked_line_is_removed_not_substring():
+    proxy = make_proxy({'G1 X1'})
+    forwarded, blocked = proxy.process_gcode(b'G1 X10\nG1 X1\n')
+    assert forwarded == b'G1 X10\n'
+    assert blocked == 1
+
+
+def test_blocked_last_line_keeps_previous_newline():
+    proxy = make_proxy({'G1 X1'})
+    forwarded, blocked = proxy.process_gcode(b'G1 X10\r\nG1 X1')
+    assert forwarded == b'G1 X10\r\n'
+    assert blocked == 1
+
+
+def test_realtime_commands_are_forwarded_unevaluated():
+    proxy = make_proxy({'?'})
+    forwarded, blocked = proxy.process_gcode(b'?\nG1 X1\n')
+    assert forwarded == b'?\nG1 X1\n'
+    assert blocked == 0
+
+
+def test_default_inline_defenses_allow_repeated_lines(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    proxy = GRBLProxy(defense_mode='inline')
+    proxy.setup_defenses()
+    job = b'G0 Z5\nG1 X10 Y10 F1500\nG0 Z5\nG1 X10 Y10 F1500\n'
+    forwarded, blocked = proxy.process_gcode(job)
+    proxy.verdict_log.close()
+    assert forwarded == job
+    assert blocked == 0
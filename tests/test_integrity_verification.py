@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for command integrity verification
+"""
+
+import hashlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+from prevention_modules import BloomFilter, IntegrityVerificationModule, MerkleAccumulator
+
+
+@pytest.mark.parametrize('batched', [False, True])
+def test_job_tree_holds_only_accepted_commands(batched):
+    module = IntegrityVerificationModule()
+    module.start_job('job')
+    commands = ['G1 X1', 'G1 X2', 'G1 X1', 'G1 X3']
+    contexts = [None, {'checksum': 'bad'}, None, {'checksum': module.calculate_checksum('G1 X3')}]
+
+    if batched:
+        results = module.process_batch(commands, contexts)
+    else:
+        results = [module.process(command, context) for command, context in zip(commands, contexts)]
+
+    assert [result['allowed'] for result in results] == [True, False, False, True]
+    accepted = MerkleAccumulator(module.calculate_digest(command) for command in ('G1 X1', 'G1 X3'))
+    assert module.end_job() == {'job_id': 'job', 'size': 2, 'root': accepted.root().hex()}
+
+
+def commands(start, count):
+    return [f'G1 X{i}' for i in range(start, start + count)]
+
+
+def allowed(module, batch):
+    return [module.process(command)['allowed'] for command in batch]
+
+
+def test_exact_window_is_a_set_with_fifo_eviction():
+    module = IntegrityVerificationModule(replay_window=4)
+    assert allowed(module, commands(0, 6)) == [True] * 6
+    assert len(module.command_hashes) == len(module._hash_set) == 4
+    assert module._hash_set == set(module.command_hashes)
+
+    # The two oldest were evicted; the rest are still replays
+    assert allowed(module, ['G1 X0', 'G1 X1', 'G1 X4', 'G1 X5']) == [True, True, False, False]
+
+    module.set_replay_window(2)
+    assert list(module.command_hashes) == [module.calculate_digest(c) for c in ('G1 X0', 'G1 X1')]
+    assert allowed(module, ['G1 X4']) == [True]
+
+
+def test_bloom_tier_catches_replays_past_the_exact_window():
+    module = IntegrityVerificationModule(replay_window=4, bloom_window=200)
+    allowed(module, commands(0, 50))
+
+    result = module.process('G1 X10')
+    assert not result['allowed']
+    assert 'long replay window' in result['reason']
+    assert module.bloom_hits == 1
+    assert len(module._hash_set) == 4
+
+
+def test_bloom_generations_rotate_and_expire():
+    module = IntegrityVerificationModule(replay_window=1, bloom_window=100)
+    allowed(module, commands(0, 50))
+    assert len(module._bloom_generations) == 1
+
+    # A second generation starts once the first holds bloom_window / 2
+    allowed(module, commands(50, 50))
+    assert len(module._bloom_generations) == 2
+    assert not module.process('G1 X0')['allowed']
+
+    # Filling another generation drops the oldest one
+    allowed(module, commands(100, 40))
+    assert len(module._bloom_generations) == 2
+    assert module.process('G1 X0')['allowed']
+    assert not module.process('G1 X75')['allowed']
+
+
+def test_bloom_filter_error_rate():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(hashlib.sha256(f'in {i}'.encode()).digest())
+    assert all(hashlib.sha256(f'in {i}'.encode()).digest() in bloom for i in range(1000))
+    false_positives = sum(hashlib.sha256(f'out {i}'.encode()).digest() in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_checksum_algorithms():
+    module = IntegrityVerificationModule(checksum_algorithm='blake2b')
+    assert module.calculate_checksum('G1 X1') == hashlib.blake2b(b'G1 X1', digest_size=32).hexdigest()
+    assert not module.process('G1 X2', {'checksum': 'bad'})['allowed']
+    with pytest.raises(ValueError):
+        IntegrityVerificationModule(checksum_algorithm='md5')
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded log queue used by the research loggers and dashboard
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+from research_scenarios import BoundedLogQueue
+
+
+def test_drop_oldest_keeps_shutdown_sentinel():
+    log_queue = BoundedLogQueue(2, 'drop_oldest')
+    log_queue.put(None)
+    log_queue.put('a')
+    log_queue.put('b')
+    assert log_queue.get_nowait() is None
+    assert log_queue.dropped == 1
+
+
+def test_zero_sample_rate_is_clamped():
+    log_queue = BoundedLogQueue(1, 'sample', sample_rate=0)
+    log_queue.put('a')
+    log_queue.put('b')
+    assert log_queue.sample_rate == 1
+    assert log_queue.get_nowait() == 'b'
+
+
+def test_configure_resizes_live_queue():
+    log_queue = BoundedLogQueue(1, 'drop_oldest')
+    log_queue.configure(maxsize=3)
+    for item in 'abc':
+        log_queue.put(item)
+    assert log_queue.metrics()['depth'] == 3
+    assert log_queue.dropped == 0
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental Merkle accumulator and its proofs
+"""
+
+import hashlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+from prevention_modules import MerkleAccumulator
+
+
+def leaf(i):
+    return hashlib.sha256(f'G1 X{i}'.encode()).digest()
+
+
+def naive_root(leaves):
+    """Merkle Tree Hash as defined in RFC 6962, section 2.1"""
+    leaves = list(leaves)
+    if len(leaves) == 1:
+        return hashlib.sha256(b'\x00' + leaves[0]).digest()
+    split = 1 << ((len(leaves) - 1).bit_length() - 1)
+    return hashlib.sha256(b'\x01' + naive_root(leaves[:split]) + naive_root(leaves[split:])).digest()
+
+
+@pytest.fixture
+def tree():
+    return MerkleAccumulator(leaf(i) for i in range(37))
+
+
+def test_roots_match_full_rebuild(tree):
+    for size in (1, 2, 3, 8, 13, 37):
+        assert tree.root(size) == naive_root(leaf(i) for i in range(size))
+
+
+def test_inclusion_proofs_verify(tree):
+    for size in (1, 5, 16, 37):
+        for index in range(size):
+            assert MerkleAccumulator.verify_inclusion(tree.inclusion_proof(index, size))
+
+
+def test_inclusion_proof_rejects_other_root_or_leaf(tree):
+    proof = tree.inclusion_proof(7)
+    assert not MerkleAccumulator.verify_inclusion(proof, tree.root(36).hex())
+    proof['leaf'] = leaf(8).hex()
+    assert not MerkleAccumulator.verify_inclusion(proof)
+
+
+def test_consistency_proofs_verify(tree):
+    for old_size in (1, 2, 7, 16, 30, 37):
+        proof = tree.consistency_proof(old_size)
+        assert MerkleAccumulator.verify_consistency(proof, tree.root(old_size).hex(), tree.root().hex())
+
+
+def test_consistency_proof_rejects_rewritten_history(tree):
+    rewritten = MerkleAccumulator(leaf(i) if i != 3 else leaf(99) for i in range(37))
+    proof = tree.consistency_proof(10)
+    assert not MerkleAccumulator.verify_consistency(proof, new_root_hex=rewritten.root().hex())
+    assert not MerkleAccumulator.verify_consistency(rewritten.consistency_proof(10),
+                                                    old_root_hex=tree.root(10).hex())
+
+
+def test_interior_node_is_not_accepted_as_leaf():
+    tree = MerkleAccumulator(leaf(i) for i in range(4))
+    left = naive_root([leaf(0), leaf(1)])
+    right = naive_root([leaf(2), leaf(3)])
+    forged = {'index': 0, 'size': 2, 'leaf': left.hex(), 'root': tree.root().hex(),
+              'path': [right.hex()]}
+    assert not MerkleAccumulator.verify_inclusion(forged)
+
+
+def test_duplicated_last_leaf_changes_root():
+    assert (MerkleAccumulator([leaf(0), leaf(1), leaf(2)]).root() !=
+            MerkleAccumulator([leaf(0), leaf(1), leaf(2), leaf(2)]).root())
+
+
+def test_inclusion_proof_must_fit_its_size(tree):
+    proof = tree.inclusion_proof(36)
+    assert proof['size'] == 37 and len(proof['path']) == 2
+    for index, size in ((37, 37), (-1, 37), (36, 0)):
+        assert not MerkleAccumulator.verify_inclusion(dict(proof, index=index, size=size))
+    # Extra or missing siblings do not fit the shape implied by the size
+    assert not MerkleAccumulator.verify_inclusion(dict(proof, path=proof['path'] * 2))
+    assert not MerkleAccumulator.verify_inclusion(dict(proof, path=[]))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled network isolation policy and its flow cache
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+from prevention_modules import NetworkIsolationModule
+
+CONTROL_HOST = '192.168.100.5'
+CNC = '192.168.0.170'
+
+
+def test_control_vlan_reaches_cnc_and_verdict_is_cached():
+    isolation = NetworkIsolationModule()
+    verdict = isolation.check_flow(CONTROL_HOST, CNC, 8080)
+    assert verdict['allowed']
+    assert verdict['rule'] == 'Allow control VLAN'
+    assert isolation.check_flow(CONTROL_HOST, CNC, 8080) is verdict
+
+
+def test_untrusted_and_wrong_vlan_sources_are_denied():
+    isolation = NetworkIsolationModule()
+    assert isolation.check_flow('172.16.0.1', CNC, 8080)['reason'] == 'Source network not trusted'
+    assert isolation.check_flow('10.1.2.3', CNC, 8080)['reason'] == 'Wrong VLAN for control traffic'
+
+
+def test_setting_policy_invalidates_cache():
+    isolation = NetworkIsolationModule()
+    assert isolation.check_flow(CONTROL_HOST, CNC, 8080)['allowed']
+    isolation.trusted_networks = ['10.0.0.0/8']
+    assert not isolation.check_flow(CONTROL_HOST, CNC, 8080)['allowed']
+
+
+def test_in_place_rule_edit_needs_invalidate_policy():
+    isolation = NetworkIsolationModule()
+    assert isolation.check_flow(CONTROL_HOST, CNC, 8080)['allowed']
+    isolation.firewall_rules[1]['action'] = 'deny'
+    assert isolation.check_flow(CONTROL_HOST, CNC, 8080)['allowed']
+
+    isolation.invalidate_policy()
+    verdict = isolation.check_flow(CONTROL_HOST, CNC, 8080)
+    assert not verdict['allowed']
+    assert verdict['rule'] == 'Allow control VLAN'
+
+
+def test_vlan_lookup():
+    isolation = NetworkIsolationModule()
+    assert isolation.get_vlan_from_ip(CONTROL_HOST) == 100
+    assert isolation.get_vlan_from_ip('192.168.200.9') == 200
+    assert isolation.get_vlan_from_ip('8.8.8.8') == 300
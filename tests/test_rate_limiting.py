@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for token-bucket rate limiting and GRBL buffer feedback
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+from prevention_modules import RateLimitingModule, TokenBucket, parse_grbl_status
+
+
+def test_token_bucket_refills_lazily_up_to_capacity():
+    bucket = TokenBucket(10, 0.0)
+    bucket.tokens = 0
+    assert bucket.refill(0.5, 4, 10) == pytest.approx(2)
+    assert bucket.refill(100.0, 4, 10) == 10
+
+
+def test_burst_then_rate():
+    limiter = RateLimitingModule(per_ip_rate_limit=10, global_rate_limit=10, burst_size=5)
+    now = limiter.global_bucket.updated
+    verdicts = [limiter._admit('10.0.0.1', now)[0] for _ in range(8)]
+    assert verdicts == [True] * 5 + [False] * 3
+
+    # 0.15 s refills one and a half tokens at 10/s
+    assert limiter._admit('10.0.0.1', now + 0.15)[0]
+    assert not limiter._admit('10.0.0.1', now + 0.15)[0]
+
+
+def test_sources_have_separate_buckets():
+    limiter = RateLimitingModule(per_ip_rate_limit=5, global_rate_limit=100, burst_size=100,
+                                 per_ip_burst_size=2)
+    now = limiter.global_bucket.updated
+    assert [limiter._admit('10.0.0.1', now)[0] for _ in range(3)] == [True, True, False]
+    assert limiter._admit('10.0.0.2', now)[0]
+
+
+def test_parse_grbl_status():
+    status = parse_grbl_status('<Run|MPos:1.000,2.000,0.000|Bf:15,128|FS:500,0>')
+    assert status['state'] == 'Run'
+    assert status['planner_free'] == 15
+    assert status['rx_free'] == 128
+    assert parse_grbl_status('ok') is None
+
+
+def test_feedback_sizes_limits_from_free_buffer():
+    limiter = RateLimitingModule()
+    result = limiter.update_machine_status('<Idle|Bf:15,128>', now=0.0)
+    headroom = 15 + 128 / limiter.avg_line_bytes
+    assert result['headroom'] == pytest.approx(headroom)
+    assert limiter.burst_size == pytest.approx(headroom)
+    assert limiter.global_rate_limit == pytest.approx(headroom / limiter.feedback_horizon)
+    assert limiter.per_ip_rate_limit == limiter.global_rate_limit
+
+
+def test_adaptive_adjustment_keeps_feedback_limits():
+    limiter = RateLimitingModule()
+    limiter.update_machine_status('<Idle|Bf:15,128>', now=0.0)
+    rate = limiter.global_rate_limit
+
+    limiter.adaptive_rate_limiting({'attack_detected': False})
+    assert limiter.per_ip_rate_limit == limiter.global_rate_limit == pytest.approx(rate)
+
+    limiter.adaptive_rate_limiting({'attack_detected': True})
+    assert limiter.global_rate_limit == pytest.approx(rate / 2)
+    assert limiter.per_ip_rate_limit == limiter.global_rate_limit
+
+
+def test_stale_feedback_restores_configured_limits():
+    limiter = RateLimitingModule(per_ip_rate_limit=50, global_rate_limit=100, burst_size=200)
+    limiter.update_machine_status('<Run|Bf:0,0>', now=0.0)
+    assert limiter.global_rate_limit != 100
+    limiter._admit('10.0.0.1', limiter.feedback_stale_after + 1.0)
+    assert (limiter.per_ip_rate_limit, limiter.global_rate_limit, limiter.burst_size) == (50, 100, 200)
+
+
+def test_active_source_keeps_its_bucket_after_idle_gap():
+    limiter = RateLimitingModule(per_ip_rate_limit=10, global_rate_limit=1000, burst_size=1000,
+                                 per_ip_burst_size=5)
+    now = limiter.global_bucket.updated
+    assert limiter._admit('10.0.0.1', now)[0]
+
+    # Idle past the 0.5 s refill time, then a burst: only one bucket's worth
+    # gets through and the returning source is not counted as evicted
+    later = now + 1.0
+    verdicts = [limiter._admit('10.0.0.1', later)[0] for _ in range(7)]
+    assert sum(verdicts) == 5
+    assert limiter.evicted_sources == 0
+    assert list(limiter.command_buckets) == ['10.0.0.1']
+
+
+def test_idle_sources_evicted_and_capped():
+    limiter = RateLimitingModule(per_ip_rate_limit=10, global_rate_limit=1000, burst_size=1000,
+                                 per_ip_burst_size=5, max_sources=2)
+    now = limiter.global_bucket.updated
+    for i in range(3):
+        limiter._admit(f'10.0.0.{i}', now)
+    assert list(limiter.command_buckets) == ['10.0.0.1', '10.0.0.2']
+    assert limiter.evicted_sources == 1
+
+    limiter._admit('10.0.0.2', now + 1.0)
+    assert list(limiter.command_buckets) == ['10.0.0.2']
+    assert limiter.evicted_sources == 2
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Tests for the experiment report
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+from research_framework import ResearchExperimentFramework
+from research_scenarios import StatisticalDataLogger
+
+
+def test_report_statistics_include_pending_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    framework = ResearchExperimentFramework('report')
+    framework.data_logger.close()
+    # A long commit window keeps every row pending until the report asks
+    framework.data_logger = StatisticalDataLogger(
+        str(framework.output_dir / 'research_data.db'), commit_interval=60
+    )
+    session_id = framework.data_logger.create_session('scenario', 'cnc', {})
+    for _ in range(3):
+        framework.data_logger.log_attack_event('scenario', 'drift', 'G1 X1', 'G1 X1.1',
+                                               'coordinate_shift', {}, 0.5, session_id)
+    monkeypatch.setattr(framework, '_generate_visualizations', lambda results: None)
+
+    framework._generate_report({'baseline': {'avg_latency': 1.0}, 'scenarios': []})
+    framework.data_logger.close()
+
+    report = (framework.output_dir / 'experiment_report.md').read_text()
+    stats_block = report.split('## Statistical Analysis')[1].split('```json\n')[1].split('\n```')[0]
+    assert json.loads(stats_block)['attacks']['total'] == 3
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched research data logger
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+from research_scenarios import StatisticalDataLogger
+
+
+def test_bad_row_does_not_lose_batch(tmp_path):
+    logger = StatisticalDataLogger(str(tmp_path / 'research.db'), commit_interval=60)
+    for i in range(5):
+        logger.log_network_metrics(64 + i, 1.0, 0.1, 0.0, 1000.0, 'session')
+    logger.log_network_metrics(object(), 1.0, 0.1, 0.0, 1000.0, 'session')
+    logger.log_network_metrics(128, 1.0, 0.1, 0.0, 1000.0, 'session')
+    logger.close()
+
+    metrics = logger.get_queue_metrics()
+    assert metrics['rows_written'] == 6
+    assert metrics['rows_rejected'] == 1
+
+
+def test_statistics_include_rows_logged_just_before(tmp_path):
+    logger = StatisticalDataLogger(str(tmp_path / 'research.db'), commit_interval=60)
+    session_id = logger.create_session('scenario', 'cnc', {})
+    for score in (0.2, 0.4):
+        logger.log_attack_event('scenario', 'drift', 'G1 X1', 'G1 X1.1', 'coordinate_shift',
+                                {'drift_amount': 0.1}, score, session_id)
+    logger.log_network_metrics(64, 5.0, 0.1, 0.0, 1000.0, session_id)
+
+    stats = logger.get_statistics(session_id)
+    logger.close()
+
+    assert stats['attacks']['total'] == 2
+    assert stats['attacks']['unique_types'] == 1
+    assert stats['attacks']['avg_detection_score'] == pytest.approx(0.3)
+    assert stats['network']['avg_latency'] == pytest.approx(5.0)
+
+
+def _logged_session(tmp_path):
+    logger = StatisticalDataLogger(str(tmp_path / 'research.db'))
+    session_id = logger.create_session('scenario', 'cnc', {})
+    for i in range(3):
+        logger.log_attack_event('scenario', 'drift', f'G1 X{i}', f'G1 X{i}.1', 'coordinate_shift',
+                                {}, 0.5, session_id)
+    logger.log_network_metrics(64, 5.0, 0.1, 0.0, 1000.0, session_id)
+    logger.flush()
+    return logger, session_id
+
+
+@pytest.mark.parametrize('output_format', ['csv', 'json', 'parquet'])
+def test_export_writes_one_file_per_table(tmp_path, output_format):
+    if output_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    logger, session_id = _logged_session(tmp_path)
+    archive_path = tmp_path / 'export.zip'
+
+    message = logger.export_session_data(session_id, output_format, chunk_size=2,
+                                         filename=str(archive_path))
+    logger.close()
+
+    assert str(archive_path) in message
+    with zipfile.ZipFile(archive_path) as archive:
+        members = {name.split(f'_{session_id}_')[0]: archive.read(name) for name in archive.namelist()}
+    assert sorted(members) == sorted(StatisticalDataLogger.EXPORT_TABLES)
+
+    attacks = members['attack_events']
+    if output_format == 'csv':
+        rows = list(csv.DictReader(io.StringIO(attacks.decode('utf-8'))))
+    elif output_format == 'json':
+        rows = json.loads(attacks)
+    else:
+        import pyarrow.parquet as pq
+        rows = pq.read_table(io.BytesIO(attacks)).to_pylist()
+    assert [row['command_original'] for row in rows] == ['G1 X0', 'G1 X1', 'G1 X2']
+
+
+def test_stream_is_a_valid_archive(tmp_path):
+    logger, session_id = _logged_session(tmp_path)
+    data = b''.join(logger.stream_session_data(session_id, 'json'))
+    logger.close()
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert len(archive.namelist()) == len(StatisticalDataLogger.EXPORT_TABLES)
+        assert archive.testzip() is None
+
+
+def test_export_rejects_unknown_format(tmp_path):
+    logger = StatisticalDataLogger(str(tmp_path / 'research.db'))
+    with pytest.raises(ValueError):
+        logger.export_session_data('session', 'xlsx', filename=str(tmp_path / 'export.zip'))
+    logger.close()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Tests for the TLS tunnel endpoints and the GRBL stand-in
+"""
+
+import asyncio
+import os
+import ssl
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scenarios'))
+
+pytest.importorskip('cryptography')
+
+from secure_tunnel import (CONTROLLER_HOSTNAME, GRBL_GREETING, StandInCNC, TunnelEndpoint,
+                           cnc_endpoint, controller_endpoint, generate_tunnel_certificate)
+
+
+@pytest.fixture(scope='module')
+def certs(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp('certs')
+    paths = {}
+    for name, common_name in (('tunnel', 'cnc-tunnel'), ('controller', CONTROLLER_HOSTNAME),
+                              ('rogue', CONTROLLER_HOSTNAME)):
+        cert, key = str(tmp / f'{name}_cert.pem'), str(tmp / f'{name}_key.pem')
+        generate_tunnel_certificate(cert, key, common_name)
+        paths[name] = (cert, key)
+    return paths
+
+
+async def connect(port):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    greeting = await asyncio.wait_for(reader.readuntil(b']\r\n'), 5)
+    return reader, writer, greeting
+
+
+async def close(writer):
+    writer.close()
+    await writer.wait_closed()
+    await asyncio.sleep(0.05)  # let the relays see EOF and save the session
+
+
+async def stop(*servers):
+    for server in servers:
+        await server.close()
+
+
+async def start_tls_pair(certs, cnc_port, client='controller'):
+    tunnel_cert, tunnel_key = certs['tunnel']
+    cnc_side = cnc_endpoint(tunnel_cert, tunnel_key, certs['controller'][0], '127.0.0.1',
+                            cnc_port, tunnel_port=0, listen_host='127.0.0.1')
+    await cnc_side.start()
+    if client is None:
+        # Pins the CNC side but presents no certificate of its own
+        controller_side = TunnelEndpoint('controller-side', '127.0.0.1', 0, '127.0.0.1',
+                                         cnc_side.listen_port,
+                                         target_ssl=ssl.create_default_context(cafile=tunnel_cert),
+                                         server_hostname='cnc-tunnel')
+    else:
+        client_cert, client_key = certs[client]
+        controller_side = controller_endpoint('127.0.0.1', tunnel_cert, client_cert, client_key,
+                                              cnc_side.listen_port, listen_port=0,
+                                              listen_host='127.0.0.1')
+    await controller_side.start()
+    return cnc_side, controller_side
+
+
+def test_stand_in_answers_lines_and_status():
+    async def run():
+        cnc = StandInCNC()
+        await cnc.start()
+        reader, writer, greeting = await connect(cnc.port)
+        assert greeting == GRBL_GREETING
+
+        # A line split across writes is only acknowledged once complete
+        writer.write(b'G1 X1\nG1 ')
+        await writer.drain()
+        assert await asyncio.wait_for(reader.readuntil(b'ok\r\n'), 5) == b'ok\r\n'
+        writer.write(b'X2\n?\n')
+        await writer.drain()
+        data = b''
+        while data.count(b'ok') < 1 or b'<Idle' not in data:
+            data += await asyncio.wait_for(reader.read(1024), 5)
+        assert data.count(b'ok') == 1
+        await close(writer)
+        await cnc.close()
+        return cnc.lines_received
+
+    assert asyncio.run(run()) == 2
+
+
+def test_plain_relay_pair_counts_bytes():
+    async def run():
+        cnc = StandInCNC()
+        await cnc.start()
+        cnc_side = TunnelEndpoint('cnc-side', '127.0.0.1', 0, '127.0.0.1', cnc.port)
+        await cnc_side.start()
+        controller_side = TunnelEndpoint('controller-side', '127.0.0.1', 0, '127.0.0.1',
+                                         cnc_side.listen_port)
+        await controller_side.start()
+
+        reader, writer, greeting = await connect(controller_side.listen_port)
+        writer.write(b'G1 X1\nG1 X2\n')
+        await writer.drain()
+        data = b''
+        while data.count(b'ok') < 2:
+            data += await asyncio.wait_for(reader.read(1024), 5)
+        await close(writer)
+        await stop(controller_side, cnc_side, cnc)
+        return greeting, controller_side.stats
+
+    greeting, stats = asyncio.run(run())
+    assert greeting == GRBL_GREETING
+    assert stats['connections'] == 1 and stats['active'] == 0
+    assert stats['bytes_up'] == len(b'G1 X1\nG1 X2\n')
+    assert stats['bytes_down'] == len(GRBL_GREETING) + 2 * len(b'ok\r\n')
+    assert stats['full_handshakes'] == stats['resumed_handshakes'] == 0
+
+
+def test_relay_filters_through_gcode_proxy():
+    class BlockSpindle:
+        def process_gcode(self, data, context):
+            lines = data.split(b'\n')
+            kept = [line for line in lines if not line.startswith(b'M3')]
+            return b'\n'.join(kept), len(lines) - len(kept)
+
+    async def run():
+        cnc = StandInCNC()
+        await cnc.start()
+        relay = TunnelEndpoint('controller-side', '127.0.0.1', 0, '127.0.0.1', cnc.port,
+                               gcode_proxy=BlockSpindle())
+        await relay.start()
+        reader, writer, _ = await connect(relay.listen_port)
+        writer.write(b'M3 S20000\nG1 X1\n')
+        await writer.drain()
+        data = b''
+        while b'ok' not in data or b'error' not in data:
+            data += await asyncio.wait_for(reader.read(1024), 5)
+        await close(writer)
+        await stop(relay, cnc)
+        return data, cnc.lines_received
+
+    data, lines_received = asyncio.run(run())
+    assert b'error:Blocked by defense' in data
+    assert lines_received == 1
+
+
+def test_tls_tunnel_resumes_sessions(certs):
+    async def run():
+        cnc = StandInCNC()
+        await cnc.start()
+        cnc_side, controller_side = await start_tls_pair(certs, cnc.port)
+        for _ in range(3):
+            reader, writer, greeting = await connect(controller_side.listen_port)
+            assert greeting == GRBL_GREETING
+            writer.write(b'G1 X1\n')
+            await writer.drain()
+            await asyncio.wait_for(reader.readuntil(b'ok\r\n'), 5)
+            await close(writer)
+        await stop(controller_side, cnc_side, cnc)
+        return controller_side.stats, cnc.lines_received
+
+    stats, lines_received = asyncio.run(run())
+    assert lines_received == 3
+    assert stats['full_handshakes'] == 1
+    assert stats['resumed_handshakes'] == 2
+    assert stats['errors'] == 0
+
+
+@pytest.mark.parametrize('client', ['rogue', None])
+def test_cnc_side_requires_the_pinned_controller(certs, client):
+    async def run():
+        cnc = StandInCNC()
+        await cnc.start()
+        cnc_side, controller_side = await start_tls_pair(certs, cnc.port, client=client)
+        reader, writer = await asyncio.open_connection('127.0.0.1', controller_side.listen_port)
+        data = await asyncio.wait_for(reader.read(1024), 5)
+        await close(writer)
+        await stop(controller_side, cnc_side, cnc)
+        return data, cnc_side.stats, cnc.lines_received
+
+    data, cnc_stats, lines_received = asyncio.run(run())
+    assert data == b''
+    assert cnc_stats['connections'] == 0
+    assert lines_received == 0
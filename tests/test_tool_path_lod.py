@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for server-side tool path decimation and zoom level selection
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'analysis', 'frontend'))
+
+arp_dashboard = pytest.importorskip('arp_dashboard')
+
+
+def zigzag(count, amplitude):
+    x = np.arange(count, dtype=float)
+    y = np.where(np.arange(count) % 2, amplitude, 0.0)
+    return np.column_stack([x, y, np.zeros(count)])
+
+
+def test_rdp_keeps_endpoints_and_drops_collinear_points():
+    line = np.column_stack([np.arange(100.0), np.arange(100.0) * 2, np.zeros(100)])
+    result = arp_dashboard.decimate_path_rdp(line, 0.01)
+    assert result.tolist() == [line[0].tolist(), line[-1].tolist()]
+
+
+def test_rdp_keeps_points_above_tolerance():
+    path = zigzag(50, 1.0)
+    assert len(arp_dashboard.decimate_path_rdp(path, 0.5)) == 50
+    assert len(arp_dashboard.decimate_path_rdp(path, 2.0)) == 2
+
+
+def test_rdp_result_stays_within_tolerance():
+    rng = np.random.default_rng(1)
+    path = np.cumsum(rng.normal(size=(500, 3)), axis=0)
+    epsilon = 0.5
+    kept = arp_dashboard.decimate_path_rdp(path, epsilon)
+    assert len(kept) < len(path)
+    # Every original point lies within epsilon of the simplified polyline
+    for point in path:
+        distances = []
+        for a, b in zip(kept[:-1], kept[1:]):
+            ab = b - a
+            t = np.clip(np.dot(point - a, ab) / max(np.dot(ab, ab), 1e-12), 0, 1)
+            distances.append(np.linalg.norm(point - (a + t * ab)))
+        assert min(distances) <= epsilon + 1e-9
+
+
+def test_zoom_level_from_camera_distance():
+    default = {'scene.camera': {'eye': {'x': 1.5, 'y': 1.5, 'z': 1.5}}}
+    closer = {'scene.camera': {'eye': {'x': 0.375, 'y': 0.375, 'z': 0.375}}}
+    assert arp_dashboard.zoom_level_from_relayout(default) == 0
+    assert arp_dashboard.zoom_level_from_relayout(closer) == 2
+    assert arp_dashboard.zoom_level_from_relayout(None, current_level=3) == 3
+    far = {'scene.camera': {'eye': {'x': 100, 'y': 100, 'z': 100}}}
+    assert arp_dashboard.zoom_level_from_relayout(far) == 0
+
+
+def test_decimation_cache_depends_on_extent():
+    path = zigzag(50, 1.0)
+    arp_dashboard._decimation_cache.clear()
+    # With a 500 mm extent the 1 mm zigzag is below tolerance at level 0 ...
+    coarse = arp_dashboard.decimated_path(path, 0, 500.0)
+    # ... but once the other path shrinks the extent it must be redrawn
+    fine = arp_dashboard.decimated_path(path, 0, 50.0)
+    assert len(coarse) == 2
+    assert len(fine) == 50